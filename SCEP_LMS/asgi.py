@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SCEP_LMS.settings')
 
 application = get_asgi_application()
+
+# Import the views and compile templates now, not on the first request after a cold start
+from core import warmup  # noqa: E402
+
+if warmup.enabled():
+    warmup.warm_up()
@@ -1,6 +1,5 @@
 import os
 from pathlib import Path
-import cloudinary
 from dotenv import load_dotenv
 
 # Load .env file
@@ -41,7 +40,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -63,6 +62,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.idempotency',
             ],
         },
     },
@@ -88,12 +88,8 @@ DATABASES = {
         },
     }
 }
-cloudinary.config(
-    cloud_name=os.getenv('CLOUD_NAME'),
-    api_key=os.getenv('API_KEY'),
-    api_secret=os.getenv('API_SECRET'),
-)
-
+# The Cloudinary SDK is configured from these in CoreConfig.ready(), not here, so that
+# importing settings doesn't load the SDK (and urllib3 with it)
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.getenv('CLOUD_NAME'),
     'API_KEY': os.getenv('API_KEY'),
@@ -111,6 +107,48 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = f"LMS Support <{EMAIL_HOST_USER}>"
 ADMIN_URL = 'scep-lms-admin/'
+
+# How long a stored response replays for a retried POST (core.idempotency)
+IDEMPOTENCY_TTL_SECONDS = 60 * 60
+
+# Largest roster CSV the web import accepts; initial passwords are hashed inside the request
+# (~0.5s each on one core), so bigger intakes go through `manage.py import_roster`.
+ROSTER_WEB_MAX_ROWS = int(os.getenv('ROSTER_WEB_MAX_ROWS', 40))
+
+# Offline recommendation matrices (books.recommendations), shared by all workers
+RECOMMENDER_DIR = Path(os.getenv('RECOMMENDER_DIR', BASE_DIR / 'var' / 'recommender'))
+
+# Per-client token buckets for the chatbot and login views (core.ratelimit); "N/period" or None.
+# The only source of rates: every scope passed to @rate_limit must be listed here.
+# Keep buckets in a cache every worker shares by pointing the backend at core.ratelimit.CacheBackend.
+RATE_LIMITS = {
+    'chat_start': '10/m',
+    'chat': '30/m',
+    'login_ip': '30/m',
+    'login': '5/m',
+}
+RATELIMIT_BACKEND = os.getenv('RATELIMIT_BACKEND', 'core.ratelimit.LocalBackend')
+RATELIMIT_CACHE = 'default'
+# Render's proxy appends the client address to X-Forwarded-For
+RATELIMIT_PROXY_COUNT = int(os.getenv('RATELIMIT_PROXY_COUNT', 1))
+
+# Optional generative chatbot replies (chatbot.llm): unset for rule-based replies,
+# 'openai' (needs OPENAI_API_KEY) or 'local' for the offline stand-in.
+CHATBOT_LLM_PROVIDER = os.getenv('CHATBOT_LLM_PROVIDER') or None
+CHATBOT_LLM_MODEL = os.getenv('CHATBOT_LLM_MODEL', 'gpt-4o-mini')
+CHATBOT_LLM_TIMEOUT = 8
+CHATBOT_LLM_MAX_CONCURRENCY = 4
+CHATBOT_LLM_CACHE_SIZE = 1024
+
+# Upstream for the home page quote (core.views.home, fetched through core.outbound)
+QUOTE_API_URL = os.getenv('QUOTE_API_URL', 'https://zenquotes.io/api/random')
+
+# Run by SCEP_LMS.wsgi/asgi before a worker takes traffic (core.warmup); DJANGO_WARMUP=0 skips them.
+# Add 'chatbot.intents.get_model' to also preload the intent model (~300 ms, loads numpy and scipy).
+WARMUP_HOOKS = [
+    'core.warmup.load_urlconf',
+    'core.warmup.compile_templates',
+]
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
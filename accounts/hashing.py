@@ -0,0 +1,54 @@
+"""
+Parallel password hashing for bulk account creation.
+
+PBKDF2 is deliberately slow, so hashing a few thousand initial passwords
+one by one inside a request takes minutes. These helpers fan the work out
+over a process pool. This module must stay free of model imports: worker
+processes import it before Django is set up.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+HASH_CHUNK_SIZE = 64
+
+
+def _init_worker():
+    """Configure Django inside a freshly spawned worker process."""
+    import django
+    from django.apps import apps
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "SCEP_LMS.settings")
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_chunk(passwords):
+    from django.contrib.auth.hashers import make_password
+
+    return [make_password(p) for p in passwords]
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hash raw passwords with the default hasher, preserving order.
+
+    Small batches are hashed in-process; larger ones are split into chunks
+    and spread across ``workers`` processes (all cores by default).
+    """
+    passwords = list(passwords)
+    if not passwords:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) <= HASH_CHUNK_SIZE:
+        return _hash_chunk(passwords)
+
+    chunks = [
+        passwords[i:i + HASH_CHUNK_SIZE]
+        for i in range(0, len(passwords), HASH_CHUNK_SIZE)
+    ]
+    hashed = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker) as pool:
+        for result in pool.map(_hash_chunk, chunks):
+            hashed.extend(result)
+    return hashed
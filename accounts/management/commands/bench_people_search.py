@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from accounts.models import CustomUser
+from accounts.search import build_search_text, search_users
+from core.bench import format_stats, measure, rolled_back
+
+FIRST_NAMES = ["Aarav", "Diya", "Kabir", "Isha", "Rohan", "Sneha", "Arjun", "Meera", "Vihaan", "Anaya"]
+LAST_NAMES = ["Patil", "Sharma", "Deshmukh", "Kulkarni", "Nandagouli", "Joshi", "Rao", "Gupta"]
+BRANCHES = ["CSE", "ME", "CE", "MI", "EE"]
+
+
+class Command(BaseCommand):
+    help = "Benchmark people search against legacy icontains filtering on synthetic users (rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50_000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        count, repeat = options["users"], options["repeat"]
+
+        with rolled_back():
+            self.stdout.write(f"Seeding {count} users...")
+            users = []
+            for i in range(count):
+                user = CustomUser(
+                    username=f"bench{i:06d}",
+                    first_name=FIRST_NAMES[i % len(FIRST_NAMES)],
+                    last_name=LAST_NAMES[i % len(LAST_NAMES)],
+                    email=f"bench{i:06d}@example.com",
+                    role="student",
+                    is_approved=True,
+                    roll_number=f"BR{i:07d}",
+                    library_card=f"BENCH-{i:08d}",
+                    branch=BRANCHES[i % len(BRANCHES)],
+                    mobile_number=f"9{i:09d}",
+                    password="!",
+                )
+                user.search_text = build_search_text(user)
+                users.append(user)
+            CustomUser.objects.bulk_create(users, batch_size=2000)
+
+            base = CustomUser.objects.filter(role="student", is_approved=True)
+            probe = count // 2
+            cases = [
+                ("library card", f"BENCH-{probe:08d}"),
+                ("roll number", f"BR{probe:07d}"),
+                ("name", "meera kulkarni"),
+                ("mobile", f"9{probe:09d}"),
+            ]
+
+            for label, query in cases:
+                legacy = measure(lambda: list(base.filter(
+                    Q(username__icontains=query) | Q(email__icontains=query)
+                )[:10]), repeat)
+                indexed = measure(lambda: list(search_users(base, query)[:10]), repeat)
+                hits = search_users(base, query).count()
+                self.stdout.write(format_stats(f"legacy   {label}", legacy))
+                self.stdout.write(format_stats(f"search   {label} ({hits} hits)", indexed))
+
+        self.stdout.write(self.style.SUCCESS("Done; all benchmark rows rolled back."))
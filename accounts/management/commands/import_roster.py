@@ -0,0 +1,45 @@
+import csv
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.roster import read_roster, import_roster
+
+
+class Command(BaseCommand):
+    help = "Import a student roster CSV, creating approved student accounts in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Roster CSV (roll_number,branch,academic_session,mobile_number,...)")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Password hashing processes (default: all cores)")
+        parser.add_argument("--credentials", default=None,
+                            help="Write created usernames and initial passwords to this CSV")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["csv_path"], "rb") as fh:
+                rows = read_roster(fh)
+        except (OSError, ValidationError, UnicodeDecodeError) as e:
+            raise CommandError(f"Could not read roster: {e}")
+
+        started = time.perf_counter()
+        result = import_roster(rows, workers=options["workers"])
+        elapsed = time.perf_counter() - started
+
+        for line, roll_number, reason in result.duplicates:
+            self.stdout.write(self.style.WARNING(f"Line {line} ({roll_number}): {reason}"))
+        for line, error in result.errors:
+            self.stdout.write(self.style.ERROR(f"Line {line}: {error}"))
+
+        if options["credentials"] and result.created:
+            with open(options["credentials"], "w", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["username", "initial_password"])
+                writer.writerows(result.created)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(result.created)} student(s) in {elapsed:.1f}s; "
+            f"{len(result.duplicates)} duplicate(s), {len(result.errors)} invalid row(s)."
+        ))
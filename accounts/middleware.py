@@ -1,13 +1,29 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.shortcuts import redirect
 from django.urls import reverse, NoReverseMatch
 from django.contrib import messages
 
 class ProfileCompletionMiddleware:
+    # Runs natively in both modes, so async views (the chatbot stream) aren't pushed onto a thread
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        if request.user.is_authenticated:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.incomplete_profile_redirect(request, request.user) or self.get_response(request)
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        return self.incomplete_profile_redirect(request, user) or await self.get_response(request)
+
+    def incomplete_profile_redirect(self, request, user):
+        if user.is_authenticated:
             try:
                 allowed_paths = [
                     reverse("profile_update"),
@@ -17,12 +33,11 @@ class ProfileCompletionMiddleware:
                 allowed_paths = []
 
             if (
-                hasattr(request.user, "is_student")
-                and request.user.is_student()
-                and not request.user.profile_completed
+                hasattr(user, "is_student")
+                and user.is_student()
+                and not user.profile_completed
                 and request.path not in allowed_paths
             ):
                 messages.warning(request, "⚠️ Please complete your profile to access other pages.")
                 return redirect("profile_update")
-
-        return self.get_response(request)
+        return None
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:45
+
+from django.db import migrations, models
+
+
+def create_sequence(apps, schema_editor):
+    LibraryCardSequence = apps.get_model('accounts', 'LibraryCardSequence')
+    LibraryCardSequence.objects.get_or_create(name='library_card', defaults={'next_value': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_customuser_is_deleted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LibraryCardSequence',
+            fields=[
+                ('name', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='library_card',
+            field=models.CharField(blank=True, help_text='Auto-generated unique library card ID', max_length=50, null=True, unique=True),
+        ),
+        migrations.RunPython(create_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:46
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of accounts.search.build_search_text as of this migration; later changes to
+# the live function must not change what the backfill wrote
+SEARCH_FIELDS = (
+    'username', 'first_name', 'last_name', 'email',
+    'roll_number', 'library_card', 'mobile_number',
+)
+WHITESPACE = re.compile(r'\s+')
+
+
+def build_search_text(user):
+    text = ' '.join(str(getattr(user, f) or '') for f in SEARCH_FIELDS)
+    return WHITESPACE.sub(' ', text.lower()).strip()[:512]
+
+
+def registration_names(apps):
+    """Registration full names of users with no first or last name, which registering now copies."""
+    names = {}
+    for model in ('StudentRegistration', 'TeacherRegistration'):
+        names.update(
+            apps.get_model('accounts', model).objects
+            .filter(user__first_name='', user__last_name='').exclude(full_name='')
+            .values_list('user_id', 'full_name')
+        )
+    return names
+
+
+def backfill_search_text(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    names = registration_names(apps)
+    fields = ['first_name', 'last_name', 'search_text']
+    batch = []
+    for user in CustomUser.objects.only(*SEARCH_FIELDS).iterator(chunk_size=2000):
+        if user.pk in names:
+            user.first_name, _, user.last_name = names[user.pk].strip().partition(' ')
+        user.search_text = build_search_text(user)
+        batch.append(user)
+        if len(batch) >= 2000:
+            CustomUser.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        CustomUser.objects.bulk_update(batch, fields)
+
+
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX accounts_customuser_search_ft ON accounts_customuser (search_text)'
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX accounts_customuser_search_ft ON accounts_customuser')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_library_card_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=512),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='roll_number',
+            field=models.CharField(blank=True, db_index=True, max_length=20, null=True),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+    ]
@@ -1,15 +1,82 @@
 from django.contrib.auth.models import AbstractUser, Group, Permission
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import slugify
+import threading
 import uuid
 from django.conf import settings
 from cloudinary.models import CloudinaryField
+from .search import SEARCH_FIELDS, build_search_text
 
 def generate_library_id():
-    """Generate a unique library card ID"""
+    """Legacy random library card ID (kept for old migrations; use next_library_card)."""
     return f"LMS-{uuid.uuid4().hex[:8].upper()}"
 
 
+# ---------------------
+# Library card allocator
+# ---------------------
+# Cards are numbered from a database-backed sequence. Each worker process
+# reserves a block of numbers in one short transaction and hands them out
+# locally, so single registrations rarely touch the sequence row while bulk
+# imports can take a whole range at once. The "LIB-" prefix keeps the new
+# numbers disjoint from the legacy random "LMS-" IDs.
+CARD_PREFIX = "LIB-"
+CARD_BLOCK_SIZE = 20
+
+
+def format_library_card(number):
+    return f"{CARD_PREFIX}{number:08d}"
+
+
+class LibraryCardSequence(models.Model):
+    name = models.CharField(max_length=30, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    DEFAULT = "library_card"
+
+    def __str__(self):
+        return f"{self.name}: next {self.next_value}"
+
+    @classmethod
+    def reserve(cls, count, name=DEFAULT):
+        """Atomically take ``count`` consecutive numbers and return the first one."""
+        with transaction.atomic():
+            seq, _ = cls.objects.select_for_update().get_or_create(name=name)
+            start = seq.next_value
+            seq.next_value = start + count
+            seq.save(update_fields=["next_value"])
+        return start
+
+
+_card_block_lock = threading.Lock()
+_card_block = iter(())
+
+
+def next_library_card():
+    """Return one guaranteed-unique library card ID."""
+    global _card_block
+    # Inside a caller's transaction a cached block could outlive a rollback of
+    # its reservation, so take exactly one number that rolls back with it.
+    if transaction.get_connection().in_atomic_block:
+        return format_library_card(LibraryCardSequence.reserve(1))
+
+    with _card_block_lock:
+        number = next(_card_block, None)
+        if number is None:
+            start = LibraryCardSequence.reserve(CARD_BLOCK_SIZE)
+            _card_block = iter(range(start, start + CARD_BLOCK_SIZE))
+            number = next(_card_block)
+    return format_library_card(number)
+
+
+def allocate_library_cards(count):
+    """Return ``count`` consecutive library card IDs from a single reservation."""
+    if count <= 0:
+        return []
+    start = LibraryCardSequence.reserve(count)
+    return [format_library_card(n) for n in range(start, start + count)]
+
+
 class CustomUser(AbstractUser):
     # Role field with choices for better clarity and extensibility
     ROLE_CHOICES = (
@@ -28,12 +95,11 @@ class CustomUser(AbstractUser):
     is_deleted = models.BooleanField(default=False)
 
 
-    # Auto-generated unique library card ID
+    # Unique library card ID, allocated on first save for students and teachers
     library_card = models.CharField(
         max_length=50,
         blank=True,
         null=True,
-        default=generate_library_id,
         unique=True,
         help_text="Auto-generated unique library card ID"
     )
@@ -49,10 +115,13 @@ class CustomUser(AbstractUser):
 
     # Additional Student Profile Info
     branch = models.CharField(max_length=100, blank=True, null=True)
-    roll_number = models.CharField(max_length=20, blank=True, null=True)
+    roll_number = models.CharField(max_length=20, blank=True, null=True, db_index=True)
     academic_session = models.CharField(max_length=20, blank=True, null=True)
     mobile_number = models.CharField(max_length=10, blank=True, null=True)
 
+    # Normalised copy of the searchable fields, see accounts.search
+    search_text = models.CharField(max_length=512, blank=True, default="", editable=False)
+
     # Avoid conflicts with auth.User reverse relationships
     groups = models.ManyToManyField(
         Group,
@@ -94,16 +163,25 @@ class CustomUser(AbstractUser):
         return self.role == 'librarian'
 
     def save(self, *args, **kwargs):
+        filled = []
         if not self.slug:
             self.slug = slugify(self.username)  # or any unique field
-        super().save(*args, **kwargs)
+            filled.append("slug")
 
-        # Generate Library Card ID for students and teachers only
+        # Library Card ID for students and teachers only, assigned before the single write
         if self.role in ['student', 'teacher'] and not self.library_card:
-            new_id = generate_library_id()
-            while CustomUser.objects.filter(library_card_id=new_id).exists():
-                new_id = generate_library_id()
-            self.library_card_id = new_id
+            self.library_card = next_library_card()
+            filled.append("library_card")
+
+        update_fields = kwargs.get("update_fields")
+        search_text = build_search_text(self)
+        if search_text != self.search_text:
+            self.search_text = search_text
+            if update_fields is None or (set(update_fields) | set(filled)) & set(SEARCH_FIELDS):
+                filled.append("search_text")
+
+        if update_fields is not None and filled:
+            kwargs["update_fields"] = set(update_fields) | set(filled)
 
         super().save(*args, **kwargs)
 
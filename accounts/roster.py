@@ -0,0 +1,196 @@
+"""
+Bulk student roster import.
+
+A roster is a CSV with one student per row. Required columns are
+``roll_number``, ``branch``, ``academic_session`` and ``mobile_number``;
+``full_name``, ``email``, ``course``, ``year_of_study``, ``address`` and
+``password`` are optional. The roll number doubles as the username.
+
+Rows are validated up front, initial passwords are hashed in a process pool
+(see ``accounts.hashing``), and users plus their ``StudentRegistration`` rows
+are written with ``bulk_create`` in chunks inside one transaction.
+"""
+import csv
+import io
+from dataclasses import dataclass, field
+
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils.crypto import get_random_string
+from django.utils.text import slugify
+
+from core import live
+from core.bulk import bulk_create_with_pks
+from core.facets import invalidate_user_facets
+from .hashing import hash_passwords
+from .models import CustomUser, StudentRegistration, allocate_library_cards
+from .search import build_search_text
+
+REQUIRED_COLUMNS = ("roll_number", "branch", "academic_session", "mobile_number")
+BATCH_SIZE = 500
+INITIAL_PASSWORD_LENGTH = 10
+
+username_validator = UnicodeUsernameValidator()
+
+
+@dataclass
+class RosterResult:
+    created: list = field(default_factory=list)      # [(username, initial_password)]
+    duplicates: list = field(default_factory=list)   # [(line, roll_number, reason)]
+    errors: list = field(default_factory=list)       # [(line, message)]
+
+
+def read_roster(uploaded_file):
+    """Decode an uploaded CSV and return its rows as dicts with normalised headers."""
+    text = uploaded_file.read()
+    if isinstance(text, bytes):
+        text = text.decode("utf-8-sig")
+    reader = csv.DictReader(io.StringIO(text))
+    reader.fieldnames = [(name or "").strip().lower() for name in (reader.fieldnames or [])]
+    missing = [col for col in REQUIRED_COLUMNS if col not in reader.fieldnames]
+    if missing:
+        raise ValidationError(f"Missing column(s): {', '.join(missing)}")
+    return list(reader)
+
+
+def _clean_row(row):
+    """Return a dict of cleaned values for one CSV row, or raise ValidationError."""
+    def value(key):
+        return (row.get(key) or "").strip()
+
+    roll_number = value("roll_number")
+    if not roll_number:
+        raise ValidationError("roll_number is required.")
+    if len(roll_number) > 20:
+        raise ValidationError("roll_number is longer than 20 characters.")
+    username_validator(roll_number)
+
+    mobile = value("mobile_number")
+    if not mobile.isdigit() or len(mobile) > 10:
+        raise ValidationError("mobile_number must be up to 10 digits.")
+
+    branch, session = value("branch"), value("academic_session")
+    if not branch or not session:
+        raise ValidationError("branch and academic_session are required.")
+    if len(branch) > 100 or len(session) > 20:
+        raise ValidationError("branch or academic_session is too long.")
+
+    course = value("course").upper() or "BTECH"
+    if course not in dict(StudentRegistration.COURSE_CHOICES):
+        raise ValidationError(f"Unknown course '{course}'.")
+
+    try:
+        year = int(value("year_of_study") or 1)
+    except ValueError:
+        raise ValidationError("year_of_study must be a number.")
+    if year not in dict(StudentRegistration.YEAR_CHOICES):
+        raise ValidationError("year_of_study must be between 1 and 4.")
+
+    full_name = value("full_name")[:100] or roll_number
+    first_name, _, last_name = full_name.partition(" ")
+    return {
+        "roll_number": roll_number,
+        "branch": branch,
+        "academic_session": session,
+        "mobile_number": mobile,
+        "full_name": full_name,
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": value("email"),
+        "course": course,
+        "year_of_study": year,
+        "address": value("address"),
+        "password": value("password") or get_random_string(INITIAL_PASSWORD_LENGTH),
+    }
+
+
+def import_roster(rows, workers=None, batch_size=BATCH_SIZE):
+    """
+    Create approved student accounts for every valid, non-duplicate row.
+
+    Duplicates are reported both within the file and against existing
+    ``roll_number``/``username`` values; they are skipped, not updated.
+    """
+    result = RosterResult()
+
+    # 1. Validate rows and drop in-file duplicates
+    cleaned, seen = [], set()
+    for line, row in enumerate(rows, start=2):  # header = line 1
+        try:
+            data = _clean_row(row)
+        except ValidationError as e:
+            result.errors.append((line, "; ".join(e.messages)))
+            continue
+        key = data["roll_number"].lower()
+        if key in seen:
+            result.duplicates.append((line, data["roll_number"], "repeated in file"))
+            continue
+        seen.add(key)
+        cleaned.append((line, data))
+
+    # 2. One query for roster entries that already exist
+    rolls = [data["roll_number"] for _, data in cleaned]
+    existing = set()
+    for i in range(0, len(rolls), batch_size):
+        chunk = rolls[i:i + batch_size]
+        taken = CustomUser.objects.filter(
+            Q(roll_number__in=chunk) | Q(username__in=chunk)
+        ).values_list("roll_number", "username")
+        for roll_number, username in taken:
+            existing.update(v.lower() for v in (roll_number, username) if v)
+    fresh = []
+    for line, data in cleaned:
+        if data["roll_number"].lower() in existing:
+            result.duplicates.append((line, data["roll_number"], "already registered"))
+        else:
+            fresh.append(data)
+    if not fresh:
+        return result
+
+    # 3. Slow part first, outside the transaction
+    hashed = hash_passwords([data["password"] for data in fresh], workers=workers)
+
+    with transaction.atomic():
+        cards = allocate_library_cards(len(fresh))
+        for start in range(0, len(fresh), batch_size):
+            batch = fresh[start:start + batch_size]
+            users = [
+                CustomUser(
+                    username=data["roll_number"],
+                    first_name=data["first_name"],
+                    last_name=data["last_name"],
+                    slug=slugify(data["roll_number"]),
+                    email=data["email"],
+                    password=hashed[start + i],
+                    role="student",
+                    is_active=True,
+                    is_approved=True,
+                    library_card=cards[start + i],
+                    branch=data["branch"],
+                    roll_number=data["roll_number"],
+                    academic_session=data["academic_session"],
+                    mobile_number=data["mobile_number"],
+                )
+                for i, data in enumerate(batch)
+            ]
+            for user in users:  # bulk_create skips save()
+                user.search_text = build_search_text(user)
+            bulk_create_with_pks(CustomUser, users, key=("username",), batch_size=batch_size)
+            StudentRegistration.objects.bulk_create([
+                StudentRegistration(
+                    user=user,
+                    full_name=data["full_name"],
+                    mobile_number=data["mobile_number"],
+                    course=data["course"],
+                    year_of_study=data["year_of_study"],
+                    address=data["address"],
+                )
+                for user, data in zip(users, batch)
+            ], batch_size=batch_size)
+
+    invalidate_user_facets()  # bulk_create sends no post_save
+    transaction.on_commit(live.notify)
+    result.created = [(data["roll_number"], data["password"]) for data in fresh]
+    return result
@@ -0,0 +1,91 @@
+"""
+People search shared by every user list (librarian and faculty views).
+
+Each ``CustomUser`` carries a ``search_text`` column: a lower-cased,
+whitespace-collapsed copy of its username, name, email, roll number,
+library card and mobile number, kept in sync by ``CustomUser.save()``.
+On MySQL the column has a FULLTEXT index and is queried with
+``MATCH ... AGAINST``; other backends fall back to substring matching on
+the pre-normalised column, which at least avoids ``LOWER()`` per row.
+
+Single-token queries first try exact matches on ``library_card`` and
+``roll_number`` (both indexed), which is what a scanner or a librarian
+reading an ID card types.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_FIELDS = (
+    "username", "first_name", "last_name", "email",
+    "roll_number", "library_card", "mobile_number",
+)
+
+# InnoDB ignores FULLTEXT tokens shorter than innodb_ft_min_token_size (3)
+FULLTEXT_MIN_TOKEN = 3
+
+_whitespace = re.compile(r"\s+")
+# InnoDB's parser splits words on anything but letters, digits and "_"; so do we, which also drops
+# every boolean-mode operator from the terms
+_word_delimiters = re.compile(r"[^\w]+")
+
+
+def normalize(text):
+    return _whitespace.sub(" ", (text or "").lower()).strip()
+
+
+def build_search_text(user):
+    """Return the normalised search column value for ``user``."""
+    return normalize(" ".join(str(getattr(user, f) or "") for f in SEARCH_FIELDS))[:512]
+
+
+def _exact_matches(queryset, raw):
+    variants = {raw, raw.upper()}
+    return queryset.filter(Q(library_card__in=variants) | Q(roll_number__in=variants))
+
+
+def _fulltext_filter(queryset, tokens):
+    """
+    Require every indexed word of every token through ``MATCH ... AGAINST``;
+    tokens the index can't answer alone ("alice@example.com", "21-cse-04",
+    short ones) are also matched as substrings, on the rows the index left.
+    """
+    terms, substrings = [], []
+    for token in tokens:
+        words = [w for w in _word_delimiters.split(token) if len(w) >= FULLTEXT_MIN_TOKEN]
+        terms += words
+        if words != [token]:
+            substrings.append(token)
+    if terms:
+        column = f"{queryset.model._meta.db_table}.search_text"
+        queryset = queryset.alias(
+            search_rank=RawSQL(
+                f"MATCH({column}) AGAINST (%s IN BOOLEAN MODE)",
+                (" ".join(f"+{w}*" for w in dict.fromkeys(terms)),),
+                output_field=FloatField(),
+            )
+        ).filter(search_rank__gt=0)
+    for token in substrings:
+        queryset = queryset.filter(search_text__contains=token)
+    return queryset
+
+
+def search_users(queryset, query):
+    """Filter a ``CustomUser`` queryset by a free-text people search."""
+    raw = (query or "").strip()
+    tokens = normalize(raw).split()
+    if not tokens:
+        return queryset
+
+    if len(tokens) == 1:
+        exact = _exact_matches(queryset, raw)
+        if exact.exists():
+            return exact
+
+    if connection.vendor == "mysql":
+        return _fulltext_filter(queryset, tokens)
+    for token in tokens:
+        queryset = queryset.filter(search_text__contains=token)
+    return queryset
@@ -1,3 +1,110 @@
-from django.test import TestCase
+from importlib import import_module
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .models import CustomUser, StudentRegistration
+from .search import _fulltext_filter, search_users
+
+
+def make_student(username, **fields):
+    return CustomUser.objects.create_user(username=username, password="x", role="student", **fields)
+
+
+class PeopleSearchTests(TestCase):
+    def setUp(self):
+        self.alice = make_student(
+            "alice", first_name="Alice", last_name="Rao", email="alice@example.com", roll_number="21-CSE-04",
+        )
+        self.bob = make_student("bob", first_name="Bob", email="bob@example.org", roll_number="21-CSE-05")
+
+    def test_matches_email_and_partial_roll_number(self):
+        users = CustomUser.objects.all()
+        self.assertEqual(list(search_users(users, "alice@example.com")), [self.alice])
+        self.assertCountEqual(search_users(users, "21-cse-0"), [self.alice, self.bob])
+        self.assertEqual(list(search_users(users, "ALICE rao")), [self.alice])
+
+    def test_exact_roll_number_wins(self):
+        self.assertEqual(list(search_users(CustomUser.objects.all(), "21-cse-05")), [self.bob])
+
+    def test_fulltext_terms_split_like_innodb(self):
+        queryset = _fulltext_filter(CustomUser.objects.all(), ["alice@example.com", "21-cse-04", "ra"])
+        _, params = queryset.query.sql_with_params()
+        self.assertIn("+alice* +example* +com* +cse*", params)
+        # What the index can't answer alone is still checked as a substring
+        self.assertIn("%alice@example.com%", params)
+        self.assertIn("%21-cse-04%", params)
+        self.assertIn("%ra%", params)
+
+    def test_backfill_copies_registration_names(self):
+        migration = import_module("accounts.migrations.0006_customuser_search_text")
+        carol = make_student("carol")
+        StudentRegistration.objects.create(
+            user=carol, full_name="Carol Dsouza", mobile_number="9000000000", course="BTECH", year_of_study=2,
+            address="-",
+        )
+        CustomUser.objects.filter(pk=carol.pk).update(search_text="")
+
+        migration.backfill_search_text(apps, None)
+
+        carol.refresh_from_db()
+        self.assertEqual((carol.first_name, carol.last_name), ("Carol", "Dsouza"))
+        self.assertEqual(list(search_users(CustomUser.objects.all(), "dsouza")), [carol])
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.first_name, "Alice")
+
+
+class SessionFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i, session in enumerate(["2021-2025", "2021-2025", "2022-2026"]):
+            make_student(f"s{i}", academic_session=session, is_approved=True)
+        self.client.force_login(CustomUser.objects.create_user(username="lib", password="x", role="librarian"))
+
+    def test_dashboard_lists_sessions_with_counts(self):
+        response = self.client.get(reverse("librarian_dashboard"))
+        self.assertContains(response, "2021-2025 (2)")
+        self.assertContains(response, "2022-2026 (1)")
+
+    def test_registered_students_filter_by_session(self):
+        response = self.client.get(reverse("registered_students"), {"session": "2022-2026"})
+        self.assertEqual([s.username for s in response.context["page_obj"]], ["s2"])
+
+
+ROSTER = (
+    "roll_number,branch,academic_session,mobile_number,full_name\n"
+    "21CSE01,CSE,2021-2025,9000000001,Asha Patil\n"
+    "21CSE02,CSE,2021-2025,9000000002,Ravi Kumar\n"
+)
+
+
+class RosterImportViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(CustomUser.objects.create_user(username="lib", password="x", role="librarian"))
+        self.url = reverse("import_student_roster")
+
+    def upload(self):
+        return self.client.post(self.url, {"roster_file": SimpleUploadedFile("roster.csv", ROSTER.encode())})
+
+    def test_credentials_are_a_one_time_download(self):
+        self.assertRedirects(self.upload(), self.url)
+        page = self.client.get(self.url)
+        self.assertContains(page, reverse("roster_credentials_csv"))
+        self.assertNotContains(page, "Initial Password")
+
+        download = self.client.get(reverse("roster_credentials_csv"))
+        self.assertEqual(download["Content-Type"], "text/csv")
+        rows = download.content.decode().splitlines()
+        self.assertEqual([row.split(",")[0] for row in rows], ["Username", "21CSE01", "21CSE02"])
+        self.assertTrue(CustomUser.objects.get(username="21CSE01").check_password(rows[1].split(",")[1]))
+
+        self.assertRedirects(self.client.get(reverse("roster_credentials_csv")), self.url)
+
+    @override_settings(ROSTER_WEB_MAX_ROWS=1)
+    def test_large_rosters_are_sent_to_the_command(self):
+        self.assertRedirects(self.upload(), self.url)
+        self.assertContains(self.client.get(self.url), "manage.py import_roster")
+        self.assertFalse(CustomUser.objects.filter(role="student").exists())
@@ -26,6 +26,8 @@ urlpatterns = [
     path('librarian/approve/<int:user_id>/', views.approve_user, name='approve_user'),
     path('librarian/reject/<int:user_id>/', views.reject_user, name='reject_user'),
     path('librarian/export/', views.export_users_csv, name='export_users_csv'),
+    path('librarian/import-roster/', views.import_student_roster, name='import_student_roster'),
+    path('librarian/import-roster/credentials.csv', views.roster_credentials_csv, name='roster_credentials_csv'),
     path('librarian/registered-students/', views.registered_students, name='registered_students'),
     path('librarian/registered-teachers/', views.registered_teachers, name='registered_teachers'),
     path('librarian/students/', views.student_management, name='student_management'),
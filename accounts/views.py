@@ -1,6 +1,6 @@
 import csv
+from django.conf import settings
 from django.http import HttpResponse
-from django.db.models import Q
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib import messages
@@ -9,8 +9,21 @@ from django.core.paginator import Paginator
 from .forms import ProfileForm, LibrarianProfileUpdateForm
 from .forms import CustomUserCreationForm, StudentRegisterForm, TeacherRegisterForm
 from .models import CustomUser, StudentRegistration
+from .roster import read_roster, import_roster
+from .search import search_users
+from django.core.exceptions import ValidationError
 from books.models import Book, IssuedBook
 from django.utils.timezone import now
+from core import live
+from core.facets import get_facets
+from core.ratelimit import rate_limit
+
+def _too_many_logins(template):
+    def respond(request, retry_after):
+        messages.error(request, f"⏳ Too many login attempts. Try again in {retry_after} seconds.")
+        return render(request, template, status=429)
+    return respond
+
 
 def register(request):
     return render(request, 'accounts/register.html')
@@ -22,6 +35,7 @@ def student_register(request):
         if user_form.is_valid() and profile_form.is_valid():
             user = user_form.save(commit=False)
             user.role = 'student'
+            user.first_name, _, user.last_name = profile_form.cleaned_data['full_name'].partition(' ')
             user.course = profile_form.cleaned_data['course']
             user.year_of_study = profile_form.cleaned_data['year_of_study']
             user.is_active = False  # wait for librarian approval
@@ -53,6 +67,7 @@ def teacher_register(request):
             # Step 1: Create user
             user = user_form.save(commit=False)
             user.role = 'teacher'
+            user.first_name, _, user.last_name = profile_form.cleaned_data['full_name'].partition(' ')
             user.is_approved = False  # Pending approval
             user.save()
 
@@ -76,6 +91,8 @@ def teacher_register(request):
 
 
 # 🔐 General Login
+@rate_limit('login_ip', key='ip', on_limit=_too_many_logins('accounts/login.html'))
+@rate_limit('login', key='username', on_limit=_too_many_logins('accounts/login.html'))
 def login_user(request):
     if request.method == 'POST':
         username = request.POST['username']
@@ -183,17 +200,18 @@ def librarian_dashboard(request):
 
     users = CustomUser.objects.filter(is_approved=False)
     if query:
-        users = users.filter(Q(username__icontains=query) | Q(email__icontains=query))
+        users = search_users(users, query)
     if session_filter:
         users = users.filter(academic_session=session_filter)
 
-    sessions = CustomUser.objects.values_list('academic_session', flat=True).distinct()
+    sessions = get_facets()['academic_session']  # [(session, user count)]
 
     return render(request, 'accounts/librarian_dashboard.html', {
         'users': users,
         'query': query,
         'sessions': sessions,
         'session_filter': session_filter,
+        'activity': live.today_counts(),
     })
 
 # ➕ View all registered students
@@ -201,10 +219,13 @@ def librarian_dashboard(request):
 @user_passes_test(is_librarian)
 def registered_students(request):
     query = request.GET.get('q', '')
+    session_filter = request.GET.get('session', '')
     students = CustomUser.objects.filter(role='student', is_approved=True)
 
     if query:
-        students = students.filter(Q(username__icontains=query) | Q(email__icontains=query))
+        students = search_users(students, query)
+    if session_filter:
+        students = students.filter(academic_session=session_filter)
 
     paginator = Paginator(students, 10)
     page_number = request.GET.get('page')
@@ -213,6 +234,7 @@ def registered_students(request):
     return render(request, 'accounts/registered_students.html', {
         'page_obj': page_obj,
         'query': query,
+        'session_filter': session_filter,
     })
 
 # ➕ View all registered teachers
@@ -223,7 +245,7 @@ def registered_teachers(request):
     teachers = CustomUser.objects.filter(role='teacher', is_approved=True)
 
     if query:
-        teachers = teachers.filter(Q(username__icontains=query) | Q(email__icontains=query))
+        teachers = search_users(teachers, query)
 
     paginator = Paginator(teachers, 10)
     page_number = request.GET.get('page')
@@ -273,6 +295,69 @@ def export_users_csv(request):
 
     return response
 
+# 📥 Import a student roster (CSV) in bulk
+ROSTER_CREDENTIALS_KEY = 'roster_credentials'
+ROSTER_REPORT_KEY = 'roster_report'
+
+
+@login_required
+@user_passes_test(is_librarian)
+def import_student_roster(request):
+    max_rows = settings.ROSTER_WEB_MAX_ROWS
+    if request.method == "POST":
+        roster_file = request.FILES.get("roster_file")
+        if not roster_file:
+            messages.error(request, "Please upload the roster CSV file.")
+            return redirect("import_student_roster")
+        try:
+            rows = read_roster(roster_file)
+        except (ValidationError, UnicodeDecodeError) as e:
+            messages.error(request, f"Could not read roster: {e}")
+            return redirect("import_student_roster")
+        if len(rows) > max_rows:
+            messages.error(
+                request,
+                f"⚠️ {len(rows)} rows is too many to import here (limit {max_rows}). Ask an administrator to run "
+                f"`python manage.py import_roster <file> --credentials <output.csv>`, or split the file."
+            )
+            return redirect("import_student_roster")
+
+        result = import_roster(rows)
+        # Credentials are handed out once, as a download; the page never shows them
+        request.session[ROSTER_CREDENTIALS_KEY] = result.created
+        request.session[ROSTER_REPORT_KEY] = {'duplicates': result.duplicates, 'errors': result.errors}
+        messages.success(
+            request,
+            f"✅ Imported {len(result.created)} student(s); "
+            f"{len(result.duplicates)} duplicate(s) and {len(result.errors)} invalid row(s) skipped."
+        )
+        return redirect("import_student_roster")
+
+    return render(request, "accounts/import_roster.html", {
+        "report": request.session.pop(ROSTER_REPORT_KEY, None),
+        "credentials_ready": len(request.session.get(ROSTER_CREDENTIALS_KEY) or []),
+        "max_rows": max_rows,
+    })
+
+
+# 🔑 One-time download of the initial passwords from the last roster import
+@login_required
+@user_passes_test(is_librarian)
+def roster_credentials_csv(request):
+    credentials = request.session.pop(ROSTER_CREDENTIALS_KEY, None)
+    if not credentials:
+        messages.error(request, "⚠️ No credentials to download; they can only be downloaded once.")
+        return redirect("import_student_roster")
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="roster-credentials.csv"'
+    response['Cache-Control'] = 'no-store'
+
+    writer = csv.writer(response)
+    writer.writerow(['Username', 'Initial Password'])
+    writer.writerows(credentials)
+    return response
+
 #  Teacher Role Check
 def is_teacher(user):
     return user.is_authenticated and user.role == 'teacher'
@@ -307,6 +392,8 @@ def suspend_student(request, user_id):
     return redirect('teacher_dashboard')
 
 # 🔐 Librarian Login Page
+@rate_limit('login_ip', key='ip', on_limit=_too_many_logins('accounts/librarian_login.html'))
+@rate_limit('login', key='username', on_limit=_too_many_logins('accounts/librarian_login.html'))
 def librarian_login(request):
     if request.method == 'POST':
         username = request.POST['username']
@@ -321,6 +408,8 @@ def librarian_login(request):
     return render(request, 'accounts/librarian_login.html')
 
 # 🔐 Teacher Login Page
+@rate_limit('login_ip', key='ip', on_limit=_too_many_logins('accounts/teacher_login.html'))
+@rate_limit('login', key='username', on_limit=_too_many_logins('accounts/teacher_login.html'))
 def teacher_login(request):
     if request.method == 'POST':
         username = request.POST['username']
@@ -345,10 +434,7 @@ def pending_approvals(request):
     users = CustomUser.objects.filter(is_approved=False, role="student" or "teacher")
 
     if query:
-        users = users.filter(
-            Q(username__icontains=query) |
-            Q(email__icontains=query)
-        )
+        users = search_users(users, query)
 
     # Pagination (10 users per page)
     paginator = Paginator(users, 10)
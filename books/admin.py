@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import Book
+from .models import Book, BookCopy, CirculationEvent, Hold
+
+
+class BookCopyInline(admin.TabularInline):
+    model = BookCopy
+    extra = 0
+    fields = ('barcode', 'status', 'location')
+
 
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
@@ -7,3 +14,29 @@ class BookAdmin(admin.ModelAdmin):
     search_fields = ('title', 'author', 'category')
     list_filter = ('category', 'available')
     prepopulated_fields = {'slug': ('title',)}
+    inlines = [BookCopyInline]
+
+
+@admin.register(Hold)
+class HoldAdmin(admin.ModelAdmin):
+    list_display = ('book', 'student', 'position', 'status', 'expires_at')
+    list_filter = ('status',)
+    search_fields = ('book__title', 'student__username')
+    raw_id_fields = ('book', 'student', 'copy')
+
+
+@admin.register(CirculationEvent)
+class CirculationEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'occurred_at', 'book_id', 'student_id', 'quantity', 'amount')
+    list_filter = ('kind',)
+    date_hierarchy = 'occurred_at'
+
+    # The ledger is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
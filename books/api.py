@@ -0,0 +1,104 @@
+"""
+JSON circulation-desk API for barcode scanners.
+
+Body for issue/return: { "library_card": "LIB-00000042", "isbns": ["978...", ...] }
+Send an ``Idempotency-Key`` header so a re-sent scan replays instead of re-issuing.
+"""
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+
+from core.idempotency import idempotent
+from .circulation import BorrowerNotFound, CirculationError, find_borrower, issue_by_isbn, return_by_isbn
+from .models import IssuedBook
+
+
+class IsLibrarian(BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role == "librarian"
+
+
+def _borrower_payload(borrower):
+    return {
+        "id": borrower.id,
+        "username": borrower.username,
+        "name": borrower.get_full_name(),
+        "library_card": borrower.library_card,
+        "role": borrower.role,
+    }
+
+
+def _loan_payload(loan):
+    return {
+        "loan_id": loan.id,
+        "isbn": loan.book.isbn,
+        "title": loan.book.title,
+        "copy_id": loan.copy_id,
+        "issue_date": loan.issue_date,
+        "due_date": loan.due_date,
+        "return_date": loan.return_date,
+        "fine": loan.fine,
+    }
+
+
+def _error_response(error):
+    if isinstance(error, BorrowerNotFound):
+        code = status.HTTP_404_NOT_FOUND
+    elif error.errors:
+        code = status.HTTP_409_CONFLICT
+    else:
+        code = status.HTTP_400_BAD_REQUEST
+    return Response({"error": str(error), "items": error.errors}, status=code)
+
+
+@api_view(["GET"])
+@permission_classes([IsLibrarian])
+def desk_lookup(request, library_card):
+    """Borrower details and open loans for a scanned library card."""
+    try:
+        borrower = find_borrower(library_card)
+    except CirculationError as e:
+        return _error_response(e)
+
+    loans = IssuedBook.objects.filter(student=borrower, return_date__isnull=True).select_related("book")
+    return Response({
+        "borrower": _borrower_payload(borrower),
+        "loans": [_loan_payload(loan) for loan in loans],
+    })
+
+
+@api_view(["POST"])
+@permission_classes([IsLibrarian])
+@idempotent
+def desk_issue(request):
+    """Issue every scanned ISBN to one borrower in a single transaction."""
+    try:
+        borrower = find_borrower(request.data.get("library_card"))
+        loans = issue_by_isbn(borrower, request.data.get("isbns"))
+    except CirculationError as e:
+        return _error_response(e)
+
+    return Response({
+        "borrower": _borrower_payload(borrower),
+        "issued": [_loan_payload(loan) for loan in loans],
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(["POST"])
+@permission_classes([IsLibrarian])
+@idempotent
+def desk_return(request):
+    """Return every scanned ISBN for one borrower and report the fines due."""
+    try:
+        borrower = find_borrower(request.data.get("library_card"))
+        loans = return_by_isbn(borrower, request.data.get("isbns"))
+    except CirculationError as e:
+        return _error_response(e)
+
+    returned = [_loan_payload(loan) for loan in loans]
+    return Response({
+        "borrower": _borrower_payload(borrower),
+        "returned": returned,
+        "total_fine": sum(item["fine"] for item in returned),
+    })
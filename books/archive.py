@@ -0,0 +1,78 @@
+"""
+Archival of long-returned loans.
+
+``IssuedBook`` only needs open and recently returned loans; everything else
+is history. ``archive_returned`` moves loans returned before a cutoff into
+``IssuedBookArchive`` in small batches, each its own transaction (copy the
+rows, then delete them from the hot table), walking the primary key so a
+batch never rescans what came before it. Stopping at any point is safe and
+rerunning simply carries on: moved rows are gone from ``IssuedBook``, and a
+row copied twice is ignored because the archive keeps the original loan id.
+
+Anything showing a student's full history reads ``loan_history``, so the
+archive's storage can change without touching the views.
+"""
+import time
+from itertools import chain
+from operator import attrgetter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import IssuedBook, IssuedBookArchive
+
+ARCHIVE_AFTER_MONTHS = 12
+BATCH_SIZE = 1000
+ARCHIVED_FIELDS = ("student_id", "book_id", "copy_id", "issue_date", "due_date", "return_date")
+
+
+def months_ago(months, now=None):
+    now = now or timezone.now()
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    return now.replace(year=year, month=month + 1, day=min(now.day, 28))
+
+
+def archive_returned(months=ARCHIVE_AFTER_MONTHS, batch_size=BATCH_SIZE, max_batches=None, pause=0):
+    """
+    Move loans returned more than ``months`` ago into the archive; return how
+    many moved. ``max_batches`` and ``pause`` (seconds between batches) keep
+    a daytime run short and gentle on the live tables.
+    """
+    cutoff = months_ago(months)
+    moved, last, batches = 0, 0, 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            loans = list(
+                IssuedBook.objects.select_for_update(skip_locked=True)
+                .filter(pk__gt=last, issue_date__lt=cutoff, return_date__lt=cutoff)
+                .order_by("pk")[:batch_size]
+            )
+            if not loans:
+                break
+            now = timezone.now()
+            IssuedBookArchive.objects.bulk_create([
+                IssuedBookArchive(id=loan.pk, archived_at=now, **{f: getattr(loan, f) for f in ARCHIVED_FIELDS})
+                for loan in loans
+            ], ignore_conflicts=True)
+            IssuedBook.objects.filter(pk__in=[loan.pk for loan in loans]).delete()
+        moved += len(loans)
+        last = loans[-1].pk
+        batches += 1
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+def loan_history(student):
+    """All of a student's loans, live and archived, newest first."""
+    live = IssuedBook.objects.filter(student=student).select_related("book")
+    archived = IssuedBookArchive.objects.filter(student=student).select_related("book")
+    return sorted(chain(live, archived), key=attrgetter("issue_date"), reverse=True)
+
+
+def loan_pairs():
+    """``(student_id, book_id)`` for every loan ever made, live or archived."""
+    return chain(
+        IssuedBook.objects.values_list("student_id", "book_id").iterator(chunk_size=10000),
+        IssuedBookArchive.objects.values_list("student_id", "book_id").iterator(chunk_size=10000),
+    )
@@ -0,0 +1,523 @@
+"""
+Circulation: issuing and returning physical copies.
+
+All issue/return paths (librarian form, teacher form and class sets, desk
+API) go through
+this module so stock is adjusted in one place. Every batch runs in a single
+transaction. A free copy is claimed with one indexed ``UPDATE ... LIMIT 1``
+on ``(book, status)``, and ``Book.available_copies`` is kept as a
+precomputed count, adjusted in the same transaction as the copy status.
+If any item in a batch fails validation nothing is written and the caller
+gets a per-item error map instead.
+
+The desk API addresses borrowers by library card and books by ISBN (both
+unique indexes) through ``issue_by_isbn``/``return_by_isbn``.
+
+Copies coming back (returns, cancelled or expired holds) go to the head of
+the book's hold queue before the shelf, so readers are notified instead of
+polling the catalogue.
+
+Every change is also appended to the circulation ledger (``books.ledger``)
+in one batched insert per call, inside the same transaction. Once a loan
+change commits, the borrowers' cached chat context is dropped.
+"""
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from threading import Thread
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db import connection, transaction
+from django.db.models import Case, F, Max, When
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from chatbot.context import invalidate_context
+from core.bulk import bulk_create_with_pks
+from . import ledger
+from .models import Book, BookCopy, CirculationEvent, Hold, IssuedBook
+
+logger = logging.getLogger(__name__)
+
+LOAN_PERIOD = timedelta(days=14)
+HOLD_PICKUP_WINDOW = timedelta(days=3)
+MAX_CLASS_SET_STUDENTS = 200
+# A claimed copy has exactly one open loan, which identifies a new loan's row
+OPEN_LOAN_KEY = {"key": ("copy",), "within": {"return_date__isnull": True}}
+
+
+class CirculationError(Exception):
+    """Raised when a batch cannot be applied; ``errors`` maps item -> reason."""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+class BorrowerNotFound(CirculationError):
+    pass
+
+
+def find_borrower(library_card):
+    card = (library_card or "").strip()
+    borrower = CustomUser.objects.filter(library_card__in={card, card.upper()}, is_active=True).first()
+    if borrower is None:
+        raise BorrowerNotFound(f"No active borrower with library card '{card}'.")
+    return borrower
+
+
+# ---------------------
+# Copies
+# ---------------------
+def claim_copy(book_id):
+    """Mark one available copy of ``book_id`` as on loan and return its id, or None."""
+    table = BookCopy._meta.db_table
+    if connection.vendor == "mysql":
+        # LAST_INSERT_ID(expr) hands the claimed row's id back without a second query
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET status = %s, id = LAST_INSERT_ID(id) "
+                f"WHERE book_id = %s AND status = %s LIMIT 1",
+                [BookCopy.ON_LOAN, book_id, BookCopy.AVAILABLE],
+            )
+            return cursor.lastrowid if cursor.rowcount else None
+
+    # Other backends: lock one candidate, skipping rows other workers hold
+    while True:
+        copy_id = (
+            BookCopy.objects.select_for_update(skip_locked=True)
+            .filter(book_id=book_id, status=BookCopy.AVAILABLE)
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if copy_id is None:
+            return None
+        if BookCopy.objects.filter(pk=copy_id, status=BookCopy.AVAILABLE).update(status=BookCopy.ON_LOAN):
+            return copy_id
+
+
+def claim_copies(book_id, count):
+    """Mark up to ``count`` available copies of ``book_id`` as on loan; return their ids."""
+    copy_ids = list(
+        BookCopy.objects.select_for_update(skip_locked=True)
+        .filter(book_id=book_id, status=BookCopy.AVAILABLE)
+        .values_list("pk", flat=True)[:count]
+    )
+    if copy_ids:
+        BookCopy.objects.filter(pk__in=copy_ids).update(status=BookCopy.ON_LOAN)
+    return copy_ids
+
+
+def _decrement_available(book_ids):
+    Book.objects.filter(pk__in=book_ids).update(
+        available_copies=Case(
+            When(available_copies__gt=0, then=F("available_copies") - 1),
+            default=0,
+        )
+    )
+
+
+def _take_available(book_id, count):
+    Book.objects.filter(pk=book_id).update(
+        available_copies=Case(
+            When(available_copies__gte=count, then=F("available_copies") - count),
+            default=0,
+        )
+    )
+
+
+def _increment_available(book_counts):
+    for book_id, n in book_counts.items():
+        Book.objects.filter(pk=book_id).update(
+            available_copies=Least(F("available_copies") + n, F("total_copies"))
+        )
+
+
+# ---------------------
+# Issue / return
+# ---------------------
+def issue_books(borrower, books, issued_at=None):
+    """Issue one copy of each book to ``borrower``; return the new ``IssuedBook`` rows."""
+    book_ids = list(dict.fromkeys(b.pk if isinstance(b, Book) else int(b) for b in books))
+    if not book_ids:
+        raise CirculationError("No books selected.")
+    issued_at = issued_at or timezone.now()
+
+    with transaction.atomic():
+        locked = {b.pk: b for b in Book.objects.select_for_update().filter(pk__in=book_ids)}
+        errors = {pk: "Unknown book." for pk in book_ids if pk not in locked}
+        already = set(
+            IssuedBook.objects.filter(
+                student=borrower, book_id__in=book_ids, return_date__isnull=True
+            ).values_list("book_id", flat=True)
+        )
+        for pk in already:
+            errors[pk] = f"'{locked[pk].title}' is already issued to {borrower.username}."
+        if errors:
+            raise CirculationError("Nothing was issued.", errors)
+
+        # A copy waiting on the hold shelf for this borrower is used before the shelf stock
+        ready = {
+            hold.book_id: hold
+            for hold in Hold.objects.select_for_update().filter(
+                student=borrower, book_id__in=book_ids, status=Hold.READY, copy__isnull=False
+            )
+        }
+        copies = {}
+        for pk in book_ids:
+            copies[pk] = ready[pk].copy_id if pk in ready else claim_copy(pk)
+            if copies[pk] is None:
+                errors[pk] = f"'{locked[pk].title}' has no available copies."
+        if errors:
+            raise CirculationError("Nothing was issued.", errors)
+
+        if ready:
+            BookCopy.objects.filter(pk__in=[h.copy_id for h in ready.values()]).update(status=BookCopy.ON_LOAN)
+            Hold.objects.filter(pk__in=[h.pk for h in ready.values()]).update(status=Hold.FULFILLED)
+        _decrement_available([pk for pk in book_ids if pk not in ready])
+        loans = bulk_create_with_pks(IssuedBook, [
+            IssuedBook(
+                student=borrower,
+                book=locked[pk],
+                copy_id=copies[pk],
+                issue_date=issued_at,
+                due_date=issued_at + LOAN_PERIOD,
+            )
+            for pk in book_ids
+        ], **OPEN_LOAN_KEY)
+        ledger.record(_loan_events(CirculationEvent.ISSUE, loans, issued_at))
+        _loans_changed(loans)
+    return loans
+
+
+def return_loans(loans, returned_at=None):
+    """Close the given open loans, put their copies back on the shelf and return the rows."""
+    loan_ids = [loan.pk if isinstance(loan, IssuedBook) else int(loan) for loan in loans]
+    returned_at = returned_at or timezone.now()
+
+    with transaction.atomic():
+        open_loans = list(
+            IssuedBook.objects.select_for_update().select_related("book")
+            .filter(pk__in=loan_ids, return_date__isnull=True)
+        )
+        found = {loan.pk for loan in open_loans}
+        errors = {pk: "Loan is not open." for pk in loan_ids if pk not in found}
+        if errors:
+            raise CirculationError("Nothing was returned.", errors)
+
+        for loan in open_loans:
+            loan.return_date = returned_at
+        IssuedBook.objects.bulk_update(open_loans, ["return_date"])
+        returned = defaultdict(list)
+        for loan in open_loans:
+            if loan.copy_id:
+                returned[loan.book_id].append(loan.copy_id)
+        _release_copies(returned, returned_at)
+        # Loans from before per-copy tracking only carry the counter
+        _increment_available(Counter(loan.book_id for loan in open_loans if not loan.copy_id))
+
+        events = _loan_events(CirculationEvent.RETURN, open_loans, returned_at)
+        events += [
+            ledger.event(
+                CirculationEvent.FINE_ASSESSED, loan.book_id, student_id=loan.student_id,
+                loan_id=loan.pk, copy_id=loan.copy_id, occurred_at=returned_at, amount=loan.fine,
+            )
+            for loan in open_loans if loan.fine
+        ]
+        ledger.record(events)
+        _loans_changed(open_loans)
+    return open_loans
+
+
+def renew_loans(loans, renewed_at=None):
+    """Push the due date of open, not yet overdue loans a full loan period past ``renewed_at``."""
+    loan_ids = [loan.pk if isinstance(loan, IssuedBook) else int(loan) for loan in loans]
+    renewed_at = renewed_at or timezone.now()
+
+    with transaction.atomic():
+        open_loans = list(
+            IssuedBook.objects.select_for_update().select_related("book")
+            .filter(pk__in=loan_ids, return_date__isnull=True)
+        )
+        found = {loan.pk for loan in open_loans}
+        errors = {pk: "Loan is not open." for pk in loan_ids if pk not in found}
+        waiting = set(
+            Hold.objects.filter(
+                book_id__in=[loan.book_id for loan in open_loans], status=Hold.WAITING
+            ).values_list("book_id", flat=True)
+        )
+        for loan in open_loans:
+            if loan.due_date < renewed_at:
+                errors[loan.pk] = f"'{loan.book.title}' is overdue; return it at the desk."
+            elif loan.book_id in waiting:
+                errors[loan.pk] = f"'{loan.book.title}' has readers waiting and cannot be renewed."
+        if errors:
+            raise CirculationError("Nothing was renewed.", errors)
+
+        for loan in open_loans:
+            loan.due_date = renewed_at + LOAN_PERIOD
+        IssuedBook.objects.bulk_update(open_loans, ["due_date"])
+        ledger.record(_loan_events(CirculationEvent.RENEW, open_loans, renewed_at))
+        _loans_changed(open_loans)
+    return open_loans
+
+
+def _loan_events(kind, loans, at):
+    return [
+        ledger.event(kind, loan.book_id, student_id=loan.student_id, loan_id=loan.pk,
+                     copy_id=loan.copy_id, occurred_at=at)
+        for loan in loans
+    ]
+
+
+def _loans_changed(loans):
+    student_ids = {loan.student_id for loan in loans}
+    transaction.on_commit(lambda: invalidate_context(student_ids))
+
+
+# ---------------------
+# Class sets
+# ---------------------
+@dataclass
+class ClassSetResult:
+    issued: list = field(default_factory=list)      # new IssuedBook rows
+    already: dict = field(default_factory=dict)     # Book -> [students who already have it]
+    shortfall: dict = field(default_factory=dict)   # Book -> [students left without a copy]
+
+
+def issue_class_set(students, books, issued_at=None, allow_partial=True):
+    """
+    Issue every book to every student in one transaction.
+
+    Students are served in the order given. When a book runs out, the
+    students still waiting for it are listed in ``shortfall``; without
+    ``allow_partial`` nothing is written at all in that case.
+    """
+    students = list(dict.fromkeys(students))
+    book_ids = list(dict.fromkeys(b.pk if isinstance(b, Book) else int(b) for b in books))
+    if not students or not book_ids:
+        raise CirculationError("Choose at least one book and one student.")
+    if len(students) > MAX_CLASS_SET_STUDENTS:
+        raise CirculationError(f"A class set is limited to {MAX_CLASS_SET_STUDENTS} students.")
+    issued_at = issued_at or timezone.now()
+    result = ClassSetResult()
+
+    with transaction.atomic():
+        locked = Book.objects.select_for_update().in_bulk(book_ids)
+        missing = {pk: "Unknown book." for pk in book_ids if pk not in locked}
+        if missing:
+            raise CirculationError("Nothing was issued.", missing)
+
+        # One duplicate check for the whole set
+        held = set(
+            IssuedBook.objects.filter(
+                student__in=students, book_id__in=book_ids, return_date__isnull=True
+            ).values_list("student_id", "book_id")
+        )
+
+        loans = []
+        for pk in book_ids:
+            book = locked[pk]
+            wanting = []
+            for student in students:
+                if (student.pk, pk) in held:
+                    result.already.setdefault(book, []).append(student)
+                else:
+                    wanting.append(student)
+            if not wanting:
+                continue
+
+            copy_ids = claim_copies(pk, len(wanting))
+            if len(copy_ids) < len(wanting):
+                result.shortfall[book] = wanting[len(copy_ids):]
+            if copy_ids:
+                _take_available(pk, len(copy_ids))
+            loans += [
+                IssuedBook(
+                    student=student,
+                    book=book,
+                    copy_id=copy_id,
+                    issue_date=issued_at,
+                    due_date=issued_at + LOAN_PERIOD,
+                )
+                for student, copy_id in zip(wanting, copy_ids)
+            ]
+
+        if result.shortfall and not allow_partial:
+            transaction.set_rollback(True)
+            return result
+        result.issued = bulk_create_with_pks(IssuedBook, loans, batch_size=500, **OPEN_LOAN_KEY)
+        ledger.record(_loan_events(CirculationEvent.ISSUE, result.issued, issued_at))
+        _loans_changed(result.issued)
+    return result
+
+
+# ---------------------
+# Holds
+# ---------------------
+def place_hold(student, book):
+    """Append ``student`` to the hold queue of a book that has no copies on the shelf."""
+    with transaction.atomic():
+        # The book row lock serialises position allocation
+        book = Book.objects.select_for_update().get(pk=book.pk)
+        if book.available_copies > 0:
+            raise CirculationError(f"'{book.title}' is on the shelf; borrow it at the desk.")
+        if Hold.objects.filter(book=book, student=student, status__in=Hold.ACTIVE).exists():
+            raise CirculationError(f"You are already in the queue for '{book.title}'.")
+        if IssuedBook.objects.filter(book=book, student=student, return_date__isnull=True).exists():
+            raise CirculationError(f"'{book.title}' is already issued to you.")
+        last = Hold.objects.filter(book=book).aggregate(last=Max("position"))["last"] or 0
+        return Hold.objects.create(book=book, student=student, position=last + 1)
+
+
+def cancel_hold(hold):
+    """Leave the queue; a copy already set aside passes to the next reader."""
+    with transaction.atomic():
+        hold = Hold.objects.select_for_update().get(pk=hold.pk)
+        if hold.status not in Hold.ACTIVE:
+            raise CirculationError("This hold is no longer active.")
+        was_ready = hold.status == Hold.READY
+        hold.status = Hold.CANCELLED
+        hold.save(update_fields=["status"])
+        if was_ready and hold.copy_id:
+            _release_copies({hold.book_id: [hold.copy_id]}, timezone.now())
+    return hold
+
+
+def expire_holds(batch_size=500, now=None):
+    """Expire READY holds past their pickup deadline in batches; return how many expired."""
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Hold.objects.select_for_update(skip_locked=True)
+                .filter(status=Hold.READY, expires_at__lte=now)
+                .order_by("expires_at")[:batch_size]
+            )
+            if not batch:
+                break
+            Hold.objects.filter(pk__in=[h.pk for h in batch]).update(status=Hold.EXPIRED)
+            released = defaultdict(list)
+            for hold in batch:
+                if hold.copy_id:
+                    released[hold.book_id].append(hold.copy_id)
+            _release_copies(released, now)
+        expired += len(batch)
+    return expired
+
+
+def _release_copies(copies_by_book, now):
+    """Put copies back into circulation: the head of each book's queue first, then the shelf."""
+    held = _hand_to_holds(copies_by_book, now)
+    shelved, shelved_ids = Counter(), []
+    for book_id, copy_ids in copies_by_book.items():
+        for copy_id in copy_ids:
+            if copy_id not in held:
+                shelved[book_id] += 1
+                shelved_ids.append(copy_id)
+    if shelved_ids:
+        BookCopy.objects.filter(pk__in=shelved_ids).update(status=BookCopy.AVAILABLE)
+    _increment_available(shelved)
+
+
+def _hand_to_holds(copies_by_book, now):
+    """Set copies aside for the first waiting holds of their books; return the held copy ids."""
+    ready = []
+    for book_id, copy_ids in copies_by_book.items():
+        waiting = (
+            Hold.objects.select_for_update()
+            .filter(book_id=book_id, status=Hold.WAITING)
+            .order_by("position")[:len(copy_ids)]
+        )
+        for hold, copy_id in zip(waiting, copy_ids):
+            hold.status, hold.copy_id = Hold.READY, copy_id
+            hold.ready_at, hold.expires_at = now, now + HOLD_PICKUP_WINDOW
+            ready.append(hold)
+    if not ready:
+        return set()
+
+    Hold.objects.bulk_update(ready, ["status", "copy", "ready_at", "expires_at"])
+    BookCopy.objects.filter(pk__in=[h.copy_id for h in ready]).update(status=BookCopy.ON_HOLD)
+    hold_ids = [h.pk for h in ready]
+    transaction.on_commit(lambda: Thread(target=_send_ready_notices, args=(hold_ids,), daemon=True).start())
+    return {h.copy_id for h in ready}
+
+
+def _send_ready_notices(hold_ids):
+    try:
+        holds = Hold.objects.select_related("book", "student").filter(pk__in=hold_ids)
+        notices = [
+            (
+                f"'{hold.book.title}' is ready for pickup",
+                f"Hi {hold.student.get_full_name() or hold.student.username},\n\n"
+                f"A copy of '{hold.book.title}' is being held for you at the library desk until "
+                f"{timezone.localtime(hold.expires_at):%d %b %Y, %H:%M}. "
+                f"After that it goes to the next reader in the queue.",
+                settings.DEFAULT_FROM_EMAIL,
+                [hold.student.email],
+            )
+            for hold in holds if hold.student.email
+        ]
+        if notices:
+            send_mass_mail(notices, fail_silently=False)
+            logger.info(f"Sent {len(notices)} hold pickup notices.")
+    except Exception as e:
+        logger.error(f"Failed to send hold pickup notices: {str(e)}")
+    finally:
+        connection.close()
+
+
+# ---------------------
+# Desk (ISBN) wrappers
+# ---------------------
+def _normalize_isbns(isbns):
+    if isinstance(isbns, str):
+        isbns = [isbns]
+    seen = []
+    for isbn in isbns or []:
+        isbn = str(isbn).replace("-", "").strip()
+        if isbn and isbn not in seen:
+            seen.append(isbn)
+    if not seen:
+        raise CirculationError("No ISBNs were scanned.")
+    return seen
+
+
+def _books_by_isbn(isbns):
+    books = {b.isbn: b for b in Book.objects.filter(isbn__in=isbns)}
+    missing = {isbn: "Unknown ISBN." for isbn in isbns if isbn not in books}
+    if missing:
+        raise CirculationError("Nothing was changed.", missing)
+    return books
+
+
+def issue_by_isbn(borrower, isbns, issued_at=None):
+    isbns = _normalize_isbns(isbns)
+    books = _books_by_isbn(isbns)
+    try:
+        return issue_books(borrower, [books[isbn] for isbn in isbns], issued_at)
+    except CirculationError as e:
+        by_pk = {b.pk: isbn for isbn, b in books.items()}
+        raise CirculationError(str(e), {by_pk.get(k, k): v for k, v in e.errors.items()})
+
+
+def return_by_isbn(borrower, isbns, returned_at=None):
+    isbns = _normalize_isbns(isbns)
+    books = _books_by_isbn(isbns)
+    open_loans = {
+        loan.book_id: loan
+        for loan in IssuedBook.objects.filter(
+            student=borrower, book__in=books.values(), return_date__isnull=True
+        )
+    }
+    errors = {
+        isbn: f"'{book.title}' is not on loan to {borrower.username}."
+        for isbn, book in books.items() if book.pk not in open_loans
+    }
+    if errors:
+        raise CirculationError("Nothing was returned.", errors)
+    return return_loans([open_loans[books[isbn].pk] for isbn in isbns], returned_at)
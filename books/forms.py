@@ -1,5 +1,6 @@
 from django import forms
-from .models import Book, IssuedBook
+from django.db.models import Q
+from .models import Book, Hold, IssuedBook
 from django.forms import modelformset_factory
 from django.contrib.auth import get_user_model
 from datetime import timedelta
@@ -65,7 +66,10 @@ ManualBulkBookFormSet = modelformset_factory(
 
 class IssueBookForm(forms.ModelForm):
     student = forms.ModelChoiceField(queryset=User.objects.all())
-    book = forms.ModelChoiceField(queryset=Book.objects.filter(available_copies__gt=0))
+    # Books whose only free copy is on the hold shelf are still issuable to the holder
+    book = forms.ModelChoiceField(
+        queryset=Book.objects.filter(Q(available_copies__gt=0) | Q(holds__status=Hold.READY)).distinct()
+    )
 
     class Meta:
         model = IssuedBook
@@ -0,0 +1,74 @@
+"""
+Circulation ledger: append-only ``CirculationEvent`` rows.
+
+Writers hand over whole batches (``record``) inside the transaction that
+made the change, so an event exists exactly when its change committed.
+Consumers (rollups, counters, reminders, dashboards) keep their position in
+a ``LedgerCursor`` and read forward by id with ``tail``.
+
+Ids are allocated at insert time but become visible at commit, so a
+long-running transaction can commit an id lower than one a consumer has
+already seen. ``tail`` therefore stops at events younger than ``SETTLE``;
+anything older is assumed to have committed in order.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CirculationEvent, LedgerCursor
+
+BATCH_SIZE = 1000
+SETTLE = timedelta(seconds=5)
+
+
+def event(kind, book_id, **fields):
+    return CirculationEvent(kind=kind, book_id=book_id, **fields)
+
+
+def _notify_live():
+    from core import live  # core.live reads the ledger
+
+    live.notify()
+
+
+def record(events):
+    """Append ``events`` in batched inserts; the live dashboard feed hears of them on commit."""
+    if events:
+        CirculationEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+        transaction.on_commit(_notify_live)
+
+
+def tail(after_id=0, kinds=None, limit=BATCH_SIZE, settle=SETTLE):
+    """Return up to ``limit`` settled events with id > ``after_id``, oldest first."""
+    events = CirculationEvent.objects.filter(pk__gt=after_id).order_by("pk")
+    if kinds:
+        events = events.filter(kind__in=kinds)
+    cutoff = timezone.now() - settle
+    settled = []
+    for e in events[:limit]:
+        if e.occurred_at > cutoff:
+            break
+        settled.append(e)
+    return settled
+
+
+def consume(name, handler, kinds=None, limit=BATCH_SIZE):
+    """
+    Feed settled events after ``name``'s cursor to ``handler(events)`` in
+    batches, advancing the cursor in the same transaction as each batch.
+    Returns the number of events handled.
+    """
+    handled = 0
+    while True:
+        with transaction.atomic():
+            cursor, _ = LedgerCursor.objects.select_for_update().get_or_create(name=name)
+            events = tail(cursor.position, kinds=kinds, limit=limit)
+            if not events:
+                return handled
+            handler(events)
+            cursor.position = events[-1].pk
+            cursor.save(update_fields=["position", "updated_at"])
+        handled += len(events)
+        if len(events) < limit:
+            return handled
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from books import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move loans returned more than --months ago from IssuedBook into IssuedBookArchive, "
+        "in small batches. Safe to stop and rerun; it picks up where it left off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=archive.ARCHIVE_AFTER_MONTHS)
+        parser.add_argument("--batch-size", type=int, default=archive.BATCH_SIZE)
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches")
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        moved = archive.archive_returned(
+            months=options["months"],
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+            pause=options["pause"],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} returned loan(s) in {elapsed:.1f}s."))
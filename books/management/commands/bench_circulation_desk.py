@@ -0,0 +1,78 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from books.models import Book, BookCopy
+from core.bench import format_stats, measure, rolled_back
+
+TARGET_MS = 50
+
+
+class Command(BaseCommand):
+    help = "Benchmark the circulation desk API end to end on synthetic data (rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=20_000)
+        parser.add_argument("--borrowers", type=int, default=5_000)
+        parser.add_argument("--scans", type=int, default=200, help="Issue/return round trips to time")
+        parser.add_argument("--per-scan", type=int, default=3, help="Books per issue/return request")
+
+    @override_settings(ALLOWED_HOSTS=["testserver"])
+    def handle(self, *args, **options):
+        per_scan = options["per_scan"]
+
+        with rolled_back():
+            self.stdout.write(f"Seeding {options['books']} books and {options['borrowers']} borrowers...")
+            Book.objects.bulk_create([
+                Book(title=f"Bench Book {i}", slug=f"bench-book-{i}", author="Bench",
+                     isbn=f"97{i:011d}", total_copies=5, available_copies=5)
+                for i in range(options["books"])
+            ], batch_size=2000)
+            BookCopy.objects.bulk_create([
+                BookCopy(book_id=book_id, barcode=BookCopy.make_barcode(book_id, n), status=BookCopy.AVAILABLE)
+                for book_id in Book.objects.filter(slug__startswith="bench-book-").values_list("pk", flat=True)
+                for n in range(1, 6)
+            ], batch_size=5000)
+            CustomUser.objects.bulk_create([
+                CustomUser(username=f"deskbench{i}", slug=f"deskbench{i}", role="student",
+                           is_approved=True, library_card=f"DESK-{i:08d}", password="!")
+                for i in range(options["borrowers"])
+            ], batch_size=2000)
+            librarian = CustomUser.objects.create(username="deskbench-librarian", role="librarian", is_approved=True)
+
+            client = Client()
+            client.force_login(librarian)
+            issue_url, return_url = reverse("books:desk_issue"), reverse("books:desk_return")
+
+            state = {"n": 0}
+
+            def payload():
+                n = state["n"]
+                state["n"] += 1
+                isbns = [f"97{(n * per_scan + k) % options['books']:011d}" for k in range(per_scan)]
+                return {"library_card": f"DESK-{n % options['borrowers']:08d}", "isbns": isbns}
+
+            issued = []
+
+            def scan_issue():
+                body = payload()
+                response = client.post(issue_url, json.dumps(body), content_type="application/json")
+                assert response.status_code == 201, response.content
+                issued.append(body)
+
+            def scan_return():
+                body = issued.pop(0)
+                response = client.post(return_url, json.dumps(body), content_type="application/json")
+                assert response.status_code == 200, response.content
+
+            issue_stats = measure(scan_issue, options["scans"])
+            return_stats = measure(scan_return, options["scans"])
+
+        self.stdout.write(format_stats(f"issue ({per_scan} books/scan)", issue_stats))
+        self.stdout.write(format_stats(f"return ({per_scan} books/scan)", return_stats))
+        worst = max(issue_stats["p95"], return_stats["p95"])
+        style = self.style.SUCCESS if worst < TARGET_MS else self.style.WARNING
+        self.stdout.write(style(f"p95 {worst:.1f} ms against a {TARGET_MS} ms target; benchmark rows rolled back."))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from books import recommendations
+
+
+class Command(BaseCommand):
+    help = "Update the 'also borrowed' neighbours from new loans (or rebuild them from all loan history)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute from every IssuedBook row")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options["rebuild"]:
+            books = recommendations.rebuild()
+            verb = "Rebuilt neighbours for"
+        else:
+            books = recommendations.update()
+            verb = "Refreshed neighbours for"
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"{verb} {books} book(s) in {elapsed:.1f}s."))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from books import similarity
+
+
+class Command(BaseCommand):
+    help = "Rebuild the TF-IDF content index and the top-K similar books for the whole catalogue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=similarity.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stored = similarity.rebuild(batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Stored {stored} similar-book rows in {elapsed:.1f}s."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from books.circulation import expire_holds
+
+
+class Command(BaseCommand):
+    help = "Expire holds past their pickup deadline in batches and pass the copies down the queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        expired = expire_holds(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} hold(s)."))
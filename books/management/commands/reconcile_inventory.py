@@ -0,0 +1,109 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from books import ledger
+from books.models import Book, BookCopy, CirculationEvent, IssuedBook
+
+COLUMNS = ("pk", "title", "total_copies", "available_copies", "available")
+
+
+def _counts(book_ids=None):
+    """``(open loans, copies off the shelf)`` per book id, for every book or just ``book_ids``."""
+    loans = IssuedBook.objects.filter(return_date__isnull=True)
+    # Lost copies and copies set aside for holds are neither on loan nor on the shelf
+    copies = BookCopy.objects.filter(status__in=[BookCopy.LOST, BookCopy.ON_HOLD])
+    if book_ids is not None:
+        loans, copies = loans.filter(book_id__in=book_ids), copies.filter(book_id__in=book_ids)
+    # One grouped aggregate each instead of a query per book
+    return (
+        dict(loans.values_list("book_id").annotate(n=Count("pk")).order_by()),
+        dict(copies.values_list("book_id").annotate(n=Count("pk")).order_by()),
+    )
+
+
+def _mismatches(rows, open_loans, off_shelf):
+    """``(row, on loan, expected available_copies)`` for each row whose counters are wrong."""
+    for row in rows:
+        pk, _, total, available_copies, available = row
+        on_loan = open_loans.get(pk, 0)
+        expected = max(total - on_loan - off_shelf.get(pk, 0), 0)
+        if expected != available_copies or (expected > 0) != available:
+            yield row, on_loan, expected
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Book.available_copies from open loans (total - open loans - copies off the shelf) "
+        "and resync the available flag, fixing mismatches in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report mismatches without writing")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--show", type=int, default=20, help="How many mismatches to list")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        # Find candidates from an unlocked snapshot; circulation keeps running meanwhile
+        open_loans, off_shelf = _counts()
+        candidates, report = [], []
+        rows = Book.objects.values_list(*COLUMNS).order_by("pk")
+        for (pk, title, total, available_copies, available), on_loan, expected in _mismatches(
+            rows.iterator(chunk_size=5000), open_loans, off_shelf
+        ):
+            candidates.append(pk)
+            report.append(
+                f"#{pk} {title[:40]!r}: total {total}, on loan {on_loan}, "
+                f"available {available_copies} -> {expected}"
+                + ("" if (expected > 0) == available else f", available flag -> {expected > 0}")
+            )
+
+        for line in report[:options["show"]]:
+            self.stdout.write(line)
+        if len(report) > options["show"]:
+            self.stdout.write(f"...and {len(report) - options['show']} more.")
+
+        fixed = 0
+        if not options["dry_run"]:
+            batch_size = options["batch_size"]
+            for i in range(0, len(candidates), batch_size):
+                fixed += self.fix(candidates[i:i + batch_size])
+
+        elapsed = time.perf_counter() - started
+        if options["dry_run"]:
+            summary = f"Found {len(report)} mismatched book(s)"
+        else:
+            # Circulation can correct a candidate between the scan and its locked recount
+            summary = f"Fixed {fixed} of {len(report)} mismatched book(s)"
+        self.stdout.write(self.style.SUCCESS(f"{summary} in {elapsed:.1f}s."))
+
+    @staticmethod
+    def fix(book_ids):
+        """
+        Lock the books, recount them and write the counters, all in one
+        transaction. Issues lock the same rows and returns update them, so
+        none can land between the recount and the write and be overwritten.
+        """
+        with transaction.atomic():
+            rows = list(Book.objects.select_for_update().filter(pk__in=book_ids).order_by("pk").values_list(*COLUMNS))
+            open_loans, off_shelf = _counts(book_ids)
+
+            # Target available_copies -> book ids; corrected values are few and small,
+            # so plain UPDATE ... WHERE pk IN batches beat bulk_update's per-row CASE.
+            fixes, events = defaultdict(list), []
+            for (pk, _, _, available_copies, _), _, expected in _mismatches(rows, open_loans, off_shelf):
+                fixes[expected].append(pk)
+                if expected != available_copies:
+                    events.append(ledger.event(
+                        CirculationEvent.STOCK_ADJUST, pk, quantity=expected - available_copies,
+                        note="reconcile_inventory",
+                    ))
+            for expected, ids in fixes.items():
+                Book.objects.filter(pk__in=ids).update(available_copies=expected, available=expected > 0)
+            ledger.record(events)
+        return sum(len(ids) for ids in fixes.values())
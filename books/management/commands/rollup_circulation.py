@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.reports import rollup_pending
+
+
+class Command(BaseCommand):
+    help = "Fold complete days of circulation events into the daily report rollups (new days only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--until", help="Last day to process, YYYY-MM-DD (default: yesterday)")
+        parser.add_argument("--since", help="Reprocess from this day, YYYY-MM-DD, e.g. after a backdated import")
+
+    def handle(self, *args, **options):
+        try:
+            until = date.fromisoformat(options["until"]) if options["until"] else None
+            since = date.fromisoformat(options["since"]) if options["since"] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        done = rollup_pending(until=until, since=since)
+        for day, events in done:
+            self.stdout.write(f"{day}: {events} events")
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {len(done)} day(s)."))
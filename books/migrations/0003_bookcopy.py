@@ -0,0 +1,91 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def split_stock_into_copies(apps, schema_editor):
+    """
+    Create one BookCopy per unit of total_copies. Copies are assigned to open
+    loans first, then to available stock; anything left over is unaccounted
+    for and marked lost.
+    """
+    Book = apps.get_model('books', 'Book')
+    BookCopy = apps.get_model('books', 'BookCopy')
+    IssuedBook = apps.get_model('books', 'IssuedBook')
+
+    book_ids = list(Book.objects.order_by('pk').values_list('pk', flat=True))
+    for i in range(0, len(book_ids), BATCH_SIZE):
+        chunk = book_ids[i:i + BATCH_SIZE]
+        open_loans = {}
+        for loan_id, book_id in (
+            IssuedBook.objects.filter(book_id__in=chunk, return_date__isnull=True)
+            .order_by('pk').values_list('pk', 'book_id')
+        ):
+            open_loans.setdefault(book_id, []).append(loan_id)
+
+        copies, loan_barcodes, availability = [], {}, {}
+        for book in Book.objects.filter(pk__in=chunk).only('pk', 'total_copies', 'available_copies'):
+            loans = open_loans.get(book.pk, [])
+            total = max(book.total_copies, len(loans))
+            on_loan = len(loans)
+            available = max(0, min(book.available_copies, total - on_loan))
+            availability[book.pk] = (available, total)
+            for n in range(total):
+                barcode = f"BK{book.pk:07d}-{n + 1:03d}"
+                if n < on_loan:
+                    status = 'on_loan'
+                    loan_barcodes[loans[n]] = barcode
+                elif n < on_loan + available:
+                    status = 'available'
+                else:
+                    status = 'lost'
+                copies.append(BookCopy(book_id=book.pk, barcode=barcode, status=status))
+        BookCopy.objects.bulk_create(copies, batch_size=BATCH_SIZE)
+
+        if loan_barcodes:
+            copy_ids = dict(
+                BookCopy.objects.filter(barcode__in=loan_barcodes.values()).values_list('barcode', 'pk')
+            )
+            loans = list(IssuedBook.objects.filter(pk__in=loan_barcodes.keys()).only('pk'))
+            for loan in loans:
+                loan.copy_id = copy_ids[loan_barcodes[loan.pk]]
+            IssuedBook.objects.bulk_update(loans, ['copy'], batch_size=BATCH_SIZE)
+
+        books = list(Book.objects.filter(pk__in=chunk).only('pk'))
+        for book in books:
+            book.available_copies, book.total_copies = availability[book.pk]
+        Book.objects.bulk_update(books, ['available_copies', 'total_copies'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_issuedbook'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookCopy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('barcode', models.CharField(max_length=32, unique=True)),
+                ('status', models.CharField(choices=[('available', 'Available'), ('on_loan', 'On loan'), ('lost', 'Lost'), ('withdrawn', 'Withdrawn')], default='available', max_length=10)),
+                ('location', models.CharField(blank=True, help_text='Shelf or rack, e.g. CSE-R3-S2', max_length=100)),
+                ('added_at', models.DateTimeField(auto_now_add=True)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='copies', to='books.book')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='issuedbook',
+            name='copy',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loans', to='books.bookcopy'),
+        ),
+        migrations.AddIndex(
+            model_name='bookcopy',
+            index=models.Index(fields=['book', 'status'], name='books_bookc_book_id_b9abc0_idx'),
+        ),
+        migrations.RunPython(split_stock_into_copies, migrations.RunPython.noop),
+    ]
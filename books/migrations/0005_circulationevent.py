@@ -0,0 +1,73 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+FINE_PER_DAY = 10
+
+
+def backfill_from_loans(apps, schema_editor):
+    """Replay existing loans into the ledger: an issue, and a return (plus fine) when closed."""
+    IssuedBook = apps.get_model('books', 'IssuedBook')
+    CirculationEvent = apps.get_model('books', 'CirculationEvent')
+
+    last_id = 0
+    while True:
+        loans = list(
+            IssuedBook.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'book_id', 'student_id', 'copy_id', 'issue_date', 'due_date', 'return_date')[:BATCH_SIZE]
+        )
+        if not loans:
+            break
+        events = []
+        for pk, book_id, student_id, copy_id, issued, due, returned in loans:
+            common = dict(book_id=book_id, student_id=student_id, loan_id=pk, copy_id=copy_id)
+            events.append(CirculationEvent(kind='issue', occurred_at=issued, **common))
+            if returned:
+                events.append(CirculationEvent(kind='return', occurred_at=returned, **common))
+                late_days = (returned.date() - due.date()).days
+                if late_days > 0:
+                    events.append(CirculationEvent(
+                        kind='fine_assessed', occurred_at=returned, amount=late_days * FINE_PER_DAY, **common
+                    ))
+        CirculationEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+        last_id = loans[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_hold'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerCursor',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CirculationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('issue', 'Issue'), ('return', 'Return'), ('renew', 'Renew'), ('fine_assessed', 'Fine assessed'), ('stock_adjust', 'Stock adjust')], max_length=15)),
+                ('occurred_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('quantity', models.IntegerField(default=0, help_text='Change in shelf stock (stock adjustments)')),
+                ('amount', models.PositiveIntegerField(default=0, help_text='Fine in rupees (fine assessments)')),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('book', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='books.book')),
+                ('copy', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='books.bookcopy')),
+                ('loan', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='books.issuedbook')),
+                ('student', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_from_loans, migrations.RunPython.noop),
+    ]
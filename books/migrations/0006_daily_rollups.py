@@ -0,0 +1,86 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_circulationevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupDay',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('processed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyBranchStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('branch', models.CharField(max_length=100)),
+                ('issues', models.PositiveIntegerField(default=0)),
+                ('returns', models.PositiveIntegerField(default=0)),
+                ('late_returns', models.PositiveIntegerField(default=0)),
+                ('fines', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'branch'), name='uniq_branch_stat_day_branch')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCategoryStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=50)),
+                ('issues', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'category'), name='uniq_category_stat_day_category')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyActivityStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('issues', models.PositiveIntegerField(default=0)),
+                ('returns', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'hour'), name='uniq_hourly_stat_day_hour')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyTitleStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('issues', models.PositiveIntegerField(default=0)),
+                ('book', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='books.book')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'book'), name='uniq_title_stat_day_book')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyTitleStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('issues', models.PositiveIntegerField(default=0)),
+                ('book', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='books.book')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('month', 'book'), name='uniq_title_stat_month_book')],
+            },
+        ),
+    ]
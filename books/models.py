@@ -73,6 +73,7 @@ class Book(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
+        creating = self._state.adding
         if not self.slug:  # only set slug if it's not already set
             base_slug = slugify(self.title)
             slug = base_slug
@@ -84,6 +85,36 @@ class Book(models.Model):
             self.slug = slug
         super().save(*args, **kwargs)
 
+        # A new title gets one physical copy per unit of stock
+        if creating and self.total_copies:
+            self.add_copies(self.total_copies, available=min(self.available_copies, self.total_copies))
+
+    def add_copies(self, count, available=None):
+        """Create ``count`` BookCopy rows; any beyond ``available`` are recorded as lost."""
+        available = count if available is None else available
+        start = self.copies.count() + 1
+        BookCopy.objects.bulk_create([
+            BookCopy(
+                book=self,
+                barcode=BookCopy.make_barcode(self.pk, start + n),
+                status=BookCopy.AVAILABLE if n < available else BookCopy.LOST,
+            )
+            for n in range(count)
+        ])
+        CirculationEvent.objects.create(
+            kind=CirculationEvent.STOCK_ADJUST, book=self, quantity=min(available, count),
+            note=f"Added {count} copies",
+        )
+
+    def refresh_availability(self):
+        """Recompute the stock counters from the copies table."""
+        counts = dict(self.copies.values_list("status").annotate(n=models.Count("pk")))
+        self.available_copies = counts.get(BookCopy.AVAILABLE, 0)
+        self.total_copies = sum(n for status, n in counts.items() if status != BookCopy.WITHDRAWN)
+        Book.objects.filter(pk=self.pk).update(
+            available_copies=self.available_copies, total_copies=self.total_copies
+        )
+
     def get_absolute_url(self):
         return reverse("books:book_detail", kwargs={"slug": self.slug})
 
@@ -152,9 +183,89 @@ class Meta:
         return "/static/images/default_cover.jpg"
 
 
+# ---------------------
+# Physical copies
+# ---------------------
+class BookCopy(models.Model):
+    AVAILABLE = "available"
+    ON_LOAN = "on_loan"
+    ON_HOLD = "on_hold"
+    LOST = "lost"
+    WITHDRAWN = "withdrawn"
+    # Every status except WITHDRAWN counts towards Book.total_copies
+    STATUS_CHOICES = [
+        (AVAILABLE, "Available"),
+        (ON_LOAN, "On loan"),
+        (ON_HOLD, "On hold shelf"),
+        (LOST, "Lost"),
+        (WITHDRAWN, "Withdrawn"),
+    ]
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="copies")
+    barcode = models.CharField(max_length=32, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=AVAILABLE)
+    location = models.CharField(max_length=100, blank=True, help_text="Shelf or rack, e.g. CSE-R3-S2")
+    added_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["book", "status"])]
+
+    @staticmethod
+    def make_barcode(book_id, number):
+        return f"BK{book_id:07d}-{number:03d}"
+
+    def __str__(self):
+        return f"{self.barcode} ({self.get_status_display()})"
+
+
+# ---------------------
+# Holds (reservations)
+# ---------------------
+class Hold(models.Model):
+    """
+    A place in a book's FIFO queue. ``position`` only ever grows per book, so
+    the queue is the WAITING rows ordered by position. When a copy comes back
+    it is set aside (BookCopy.ON_HOLD) for the first waiting hold, which
+    becomes READY until ``expires_at``.
+    """
+    WAITING = "waiting"
+    READY = "ready"
+    FULFILLED = "fulfilled"
+    CANCELLED = "cancelled"
+    EXPIRED = "expired"
+    STATUS_CHOICES = [
+        (WAITING, "Waiting"),
+        (READY, "Ready for pickup"),
+        (FULFILLED, "Fulfilled"),
+        (CANCELLED, "Cancelled"),
+        (EXPIRED, "Expired"),
+    ]
+    ACTIVE = (WAITING, READY)
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="holds")
+    student = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="holds")
+    position = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=WAITING)
+    copy = models.ForeignKey(BookCopy, on_delete=models.SET_NULL, null=True, blank=True, related_name="holds")
+    created_at = models.DateTimeField(auto_now_add=True)
+    ready_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["position"]
+        indexes = [
+            models.Index(fields=["book", "position"]),
+            models.Index(fields=["status", "expires_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} waiting for {self.book.title} (#{self.position})"
+
+
 class IssuedBook(models.Model):
     student = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    copy = models.ForeignKey(BookCopy, on_delete=models.SET_NULL, null=True, blank=True, related_name="loans")
     issue_date = models.DateTimeField(default=timezone.now)
     due_date = models.DateTimeField()
     return_date = models.DateTimeField(null=True, blank=True)
@@ -184,3 +295,172 @@ class IssuedBook(models.Model):
         return 0
     def __str__(self):
         return f"{self.book.title} issued to {self.student.username}"
+
+
+class IssuedBookArchive(models.Model):
+    """A returned loan moved out of IssuedBook by books.archive; keeps the original loan id."""
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="archived_loans")
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="archived_loans")
+    copy = models.ForeignKey(BookCopy, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    issue_date = models.DateTimeField()
+    due_date = models.DateTimeField()
+    return_date = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    fine = IssuedBook.fine
+
+    def __str__(self):
+        return f"{self.book.title} issued to {self.student.username} (archived)"
+
+
+# ---------------------
+# Recommendations (see books.recommendations)
+# ---------------------
+class BookNeighbor(models.Model):
+    """One of a book's top-K "also borrowed" titles, precomputed offline."""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    neighbor = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="+")
+    co_borrowers = models.PositiveIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["book", "rank"], name="uniq_book_neighbor_rank")]
+
+
+class SimilarBook(models.Model):
+    """One of a book's top-K content-similar titles (books.similarity)."""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    similar = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["book", "rank"], name="uniq_similar_book_rank")]
+
+
+# ---------------------
+# Circulation ledger
+# ---------------------
+class CirculationEvent(models.Model):
+    """
+    Append-only record of every circulation change. Rows are never updated
+    or deleted, and the foreign keys carry no DB constraint so history
+    survives deleted books and users. Consumers read forward by id (see
+    ``books.ledger``) instead of rescanning ``IssuedBook``.
+    """
+    ISSUE = "issue"
+    RETURN = "return"
+    RENEW = "renew"
+    FINE_ASSESSED = "fine_assessed"
+    STOCK_ADJUST = "stock_adjust"
+    KIND_CHOICES = [
+        (ISSUE, "Issue"),
+        (RETURN, "Return"),
+        (RENEW, "Renew"),
+        (FINE_ASSESSED, "Fine assessed"),
+        (STOCK_ADJUST, "Stock adjust"),
+    ]
+
+    kind = models.CharField(max_length=15, choices=KIND_CHOICES)
+    occurred_at = models.DateTimeField(default=timezone.now, db_index=True)
+    book = models.ForeignKey(Book, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    student = models.ForeignKey(
+        CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+"
+    )
+    loan = models.ForeignKey(
+        IssuedBook, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True,
+        related_name="+",
+    )
+    copy = models.ForeignKey(
+        BookCopy, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True,
+        related_name="+",
+    )
+    quantity = models.IntegerField(default=0, help_text="Change in shelf stock (stock adjustments)")
+    amount = models.PositiveIntegerField(default=0, help_text="Fine in rupees (fine assessments)")
+    note = models.CharField(max_length=255, blank=True)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Circulation events are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Circulation events are append-only.")
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} book={self.book_id} at {self.occurred_at:%Y-%m-%d %H:%M}"
+
+
+class LedgerCursor(models.Model):
+    """Last ``CirculationEvent`` id a named consumer has processed."""
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
+
+
+# ---------------------
+# Daily rollups (see books.reports)
+# ---------------------
+class RollupDay(models.Model):
+    """A day whose ledger events have been folded into the rollup tables."""
+    day = models.DateField(primary_key=True)
+    events = models.PositiveIntegerField(default=0)
+    processed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.day} ({self.events} events)"
+
+
+class DailyTitleStat(models.Model):
+    day = models.DateField()
+    book = models.ForeignKey(Book, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    issues = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["day", "book"], name="uniq_title_stat_day_book")]
+
+
+class MonthlyTitleStat(models.Model):
+    """Per-title issues for a whole month (``month`` is its first day); long ranges read these."""
+    month = models.DateField()
+    book = models.ForeignKey(Book, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    issues = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["month", "book"], name="uniq_title_stat_month_book")]
+
+
+class DailyCategoryStat(models.Model):
+    day = models.DateField()
+    category = models.CharField(max_length=50)
+    issues = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["day", "category"], name="uniq_category_stat_day_category")]
+
+
+class DailyBranchStat(models.Model):
+    day = models.DateField()
+    branch = models.CharField(max_length=100)
+    issues = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+    late_returns = models.PositiveIntegerField(default=0)
+    fines = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["day", "branch"], name="uniq_branch_stat_day_branch")]
+
+
+class HourlyActivityStat(models.Model):
+    day = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    issues = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["day", "hour"], name="uniq_hourly_stat_day_hour")]
@@ -0,0 +1,185 @@
+"""
+"Students who borrowed this also borrowed", computed offline.
+
+Loans form a binary student x book incidence matrix ``X``; the item-item
+co-occurrence matrix is ``C = X.T @ X`` (its diagonal is each book's
+borrower count). Neighbours are ranked by cosine similarity
+``C[a, b] / sqrt(n_a * n_b)`` so bestsellers don't top every list, and the
+best ``TOP_K`` per book are written to ``BookNeighbor``. ``book_detail``
+reads them with one indexed lookup.
+
+Both matrices are kept as ``.npz`` files under ``settings.RECOMMENDER_DIR``,
+indexed by raw student/book ids. ``update`` folds in only the issue events
+the ledger has gained since its cursor: with ``dX`` the new incidences,
+``C += X.T @ dX + dX.T @ X + dX.T @ dX``, and only rows touching a book
+that gained borrowers get their top-K recomputed. Folding the same loan
+twice is a no-op because ``dX`` excludes pairs already in ``X``.
+
+NumPy/SciPy are imported lazily; only the build job needs them.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from . import ledger
+from .archive import loan_pairs
+from .models import Book, BookNeighbor, CirculationEvent, LedgerCursor
+
+TOP_K = 8
+MIN_CO_BORROWERS = 2
+CURSOR = "recommendations:coborrow"
+INCIDENCE_FILE = "coborrow_incidence.npz"
+COOCCURRENCE_FILE = "coborrow_cooccurrence.npz"
+
+
+def also_borrowed(book, limit=6):
+    return [
+        n.neighbor
+        for n in BookNeighbor.objects.filter(book=book).select_related("neighbor").order_by("rank")[:limit]
+    ]
+
+
+# ---------------------
+# Matrix storage
+# ---------------------
+def _path(name):
+    return os.path.join(settings.RECOMMENDER_DIR, name)
+
+
+def _save(name, matrix):
+    from scipy import sparse
+
+    os.makedirs(settings.RECOMMENDER_DIR, exist_ok=True)
+    # Write then rename, so readers never see a half-written file
+    fd, tmp = tempfile.mkstemp(dir=settings.RECOMMENDER_DIR, suffix=".npz")
+    os.close(fd)
+    sparse.save_npz(tmp, matrix)
+    os.replace(tmp, _path(name))
+
+
+def _load(name):
+    from scipy import sparse
+
+    try:
+        return sparse.load_npz(_path(name)).tocsr()
+    except FileNotFoundError:
+        return None
+
+
+def _incidence(students, books, shape):
+    import numpy as np
+    from scipy import sparse
+
+    data = np.ones(len(students), dtype=np.int32)
+    matrix = sparse.csr_matrix((data, (students, books)), shape=shape)
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+# ---------------------
+# Build
+# ---------------------
+def rebuild():
+    """Recompute everything from every loan, live or archived; return the number of books with neighbours."""
+    import numpy as np
+
+    # Events after this point are folded by the next update (harmlessly, if already counted)
+    position = CirculationEvent.objects.aggregate(last=Max("pk"))["last"] or 0
+    pairs = np.array(list(loan_pairs()), dtype=np.int64).reshape(-1, 2)
+    max_book = max(Book.objects.aggregate(last=Max("pk"))["last"] or 0, int(pairs[:, 1].max(initial=0)))
+    shape = (int(pairs[:, 0].max(initial=0)) + 1, max_book + 1)
+
+    X = _incidence(pairs[:, 0], pairs[:, 1], shape)
+    C = (X.T @ X).tocsr()
+    _save(INCIDENCE_FILE, X)
+    _save(COOCCURRENCE_FILE, C)
+    return _store_neighbors(C, rows=None, position=position)
+
+
+def update():
+    """Fold issue events since the last run into the matrices; return the number of books refreshed."""
+    import numpy as np
+
+    X, C = _load(INCIDENCE_FILE), _load(COOCCURRENCE_FILE)
+    if X is None or C is None:
+        return rebuild()
+
+    cursor, _ = LedgerCursor.objects.get_or_create(name=CURSOR)
+    position, pairs = cursor.position, []
+    while True:
+        events = ledger.tail(position, kinds=[CirculationEvent.ISSUE])
+        if not events:
+            break
+        pairs += [(e.student_id, e.book_id) for e in events if e.student_id]
+        position = events[-1].pk
+    if not pairs:
+        return 0
+
+    pairs = np.array(pairs, dtype=np.int64)
+    shape = (max(X.shape[0], int(pairs[:, 0].max()) + 1), max(X.shape[1], int(pairs[:, 1].max()) + 1))
+    X.resize(shape)
+    C.resize((shape[1], shape[1]))
+
+    # Only incidences X doesn't have yet
+    codes = np.unique(pairs[:, 0] * shape[1] + pairs[:, 1])
+    students, books = codes // shape[1], codes % shape[1]
+    new = np.asarray(X[students, books]).ravel() == 0
+    dX = _incidence(students[new], books[new], shape)
+
+    cross = (X.T @ dX).tocsr()
+    dC = (cross + cross.T + dX.T @ dX).tocsr()
+    X = (X + dX).tocsr()
+    C = (C + dC).tocsr()
+    _save(INCIDENCE_FILE, X)
+    _save(COOCCURRENCE_FILE, C)
+
+    # Rows with new co-counts, plus every row pairing with a book whose borrower
+    # count (and so every similarity it takes part in) just changed
+    gained = np.unique(dX.indices)
+    rows = np.union1d(dC.nonzero()[0], C[gained].indices)
+    return _store_neighbors(C, rows=rows, position=position)
+
+
+def _store_neighbors(C, rows, position):
+    """Recompute top-K for ``rows`` of ``C`` (all rows when None) and save them with the cursor."""
+    import numpy as np
+
+    counts = C.diagonal().astype(np.float64)
+    full = rows is None
+    if full:
+        rows = np.arange(C.shape[0])
+    sub = C[rows].tocoo()
+    row_ids, cols, co = rows[sub.row], sub.col, sub.data
+
+    existing = np.fromiter(Book.objects.values_list("pk", flat=True), dtype=np.int64)
+    keep = (
+        (cols != row_ids) & (co >= MIN_CO_BORROWERS)
+        & np.isin(row_ids, existing) & np.isin(cols, existing)
+    )
+    row_ids, cols, co = row_ids[keep], cols[keep], co[keep]
+    score = co / np.sqrt(counts[row_ids] * counts[cols])
+
+    # Sort by book, best score first, then keep each book's first TOP_K
+    order = np.lexsort((cols, -score, row_ids))
+    row_ids, cols, co, score = row_ids[order], cols[order], co[order], score[order]
+    rank = np.arange(len(row_ids)) - np.searchsorted(row_ids, row_ids, side="left")
+    top = rank < TOP_K
+
+    neighbors = [
+        BookNeighbor(book_id=int(b), rank=int(r) + 1, neighbor_id=int(n), co_borrowers=int(c), score=float(s))
+        for b, r, n, c, s in zip(row_ids[top], rank[top], cols[top], co[top], score[top])
+    ]
+    with transaction.atomic():
+        if full:
+            BookNeighbor.objects.all().delete()
+        else:
+            ids = rows.tolist()
+            for i in range(0, len(ids), 1000):
+                BookNeighbor.objects.filter(book_id__in=ids[i:i + 1000]).delete()
+        BookNeighbor.objects.bulk_create(neighbors, batch_size=2000)
+        LedgerCursor.objects.update_or_create(name=CURSOR, defaults={"position": position})
+    return len(set(row_ids[top].tolist()))
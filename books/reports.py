@@ -0,0 +1,225 @@
+"""
+Circulation reports backed by daily rollups.
+
+``rollup_day`` folds one day of ``CirculationEvent`` rows into small tables
+(issues per title and per category, activity per branch and per hour) with
+a handful of grouped queries, and refreshes that month's per-title totals.
+``rollup_pending`` does that for every complete day not processed yet, so
+the nightly job only touches new days. Reports read nothing but the
+rollups; title counts for a long range come from whole months plus the
+days at either edge.
+
+Days and hours follow ``settings.TIME_ZONE``. A "late return" is a return
+that was assessed a fine.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import ExtractHour, TruncMonth
+from django.utils import timezone
+
+from .models import (
+    Book, CirculationEvent, DailyBranchStat, DailyCategoryStat, DailyTitleStat,
+    HourlyActivityStat, MonthlyTitleStat, RollupDay,
+)
+
+UNKNOWN_BRANCH = "Unknown"
+ROLLUP_MODELS = (DailyTitleStat, DailyCategoryStat, DailyBranchStat, HourlyActivityStat)
+
+
+# ---------------------
+# Rollups
+# ---------------------
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+@transaction.atomic
+def rollup_day(day, month_totals=True):
+    """
+    (Re)build the rollup rows for ``day``; return the number of events read.
+    ``month_totals=False`` skips refreshing the month's per-title totals,
+    for callers about to process more days of the same month.
+    """
+    start, end = _day_bounds(day)
+    events = CirculationEvent.objects.filter(occurred_at__gte=start, occurred_at__lt=end)
+    for model in ROLLUP_MODELS:
+        model.objects.filter(day=day).delete()
+
+    issues = dict(
+        events.filter(kind=CirculationEvent.ISSUE)
+        .values_list("book_id").annotate(n=Count("pk")).order_by()
+    )
+    DailyTitleStat.objects.bulk_create([
+        DailyTitleStat(day=day, book_id=book_id, issues=n) for book_id, n in issues.items()
+    ], batch_size=1000)
+    if month_totals:
+        _rollup_month(day.replace(day=1))
+
+    categories = Counter()
+    for book_id, category in Book.objects.filter(pk__in=issues).values_list("pk", "category"):
+        categories[category] += issues[book_id]
+    DailyCategoryStat.objects.bulk_create([
+        DailyCategoryStat(day=day, category=category, issues=n) for category, n in categories.items()
+    ])
+
+    branches = {}
+    for branch, kind, n, amount in (
+        events.filter(kind__in=[CirculationEvent.ISSUE, CirculationEvent.RETURN, CirculationEvent.FINE_ASSESSED])
+        .values_list("student__branch", "kind").annotate(n=Count("pk"), amount=Sum("amount")).order_by()
+    ):
+        branch = branch or UNKNOWN_BRANCH
+        stat = branches.setdefault(branch, DailyBranchStat(day=day, branch=branch))
+        if kind == CirculationEvent.ISSUE:
+            stat.issues += n
+        elif kind == CirculationEvent.RETURN:
+            stat.returns += n
+        else:
+            stat.late_returns += n
+            stat.fines += amount or 0
+    DailyBranchStat.objects.bulk_create(branches.values())
+
+    hours = {}
+    for hour, kind, n in (
+        events.filter(kind__in=[CirculationEvent.ISSUE, CirculationEvent.RETURN])
+        .annotate(hour=ExtractHour("occurred_at"))
+        .values_list("hour", "kind").annotate(n=Count("pk")).order_by()
+    ):
+        stat = hours.setdefault(hour, HourlyActivityStat(day=day, hour=hour))
+        if kind == CirculationEvent.ISSUE:
+            stat.issues += n
+        else:
+            stat.returns += n
+    HourlyActivityStat.objects.bulk_create(hours.values())
+
+    total = events.count()
+    RollupDay.objects.update_or_create(day=day, defaults={"events": total})
+    return total
+
+
+def _rollup_month(month):
+    MonthlyTitleStat.objects.filter(month=month).delete()
+    MonthlyTitleStat.objects.bulk_create([
+        MonthlyTitleStat(month=month, book_id=book_id, issues=n)
+        for book_id, n in (
+            DailyTitleStat.objects.filter(day__gte=month, day__lt=_next_month(month))
+            .values_list("book_id").annotate(n=Sum("issues")).order_by()
+        )
+    ], batch_size=1000)
+
+
+def rollup_pending(until=None, since=None):
+    """
+    Roll up every day after the last processed one up to ``until`` (default
+    yesterday). ``since`` reprocesses from that day instead. Returns
+    ``[(day, events)]``.
+    """
+    until = until or timezone.localdate() - timedelta(days=1)
+    if since is None:
+        last = RollupDay.objects.aggregate(last=Max("day"))["last"]
+        if last:
+            since = last + timedelta(days=1)
+        else:
+            first = CirculationEvent.objects.aggregate(first=Min("occurred_at"))["first"]
+            if first is None:
+                return []
+            since = timezone.localtime(first).date()
+
+    done, day = [], since
+    while day <= until:
+        following = day + timedelta(days=1)
+        done.append((day, rollup_day(day, month_totals=day == until or following.day == 1)))
+        day = following
+    return done
+
+
+def last_rollup_day():
+    return RollupDay.objects.aggregate(last=Max("day"))["last"]
+
+
+# ---------------------
+# Reports: each returns (headers, rows) for the page and CSV export
+# ---------------------
+def _title_counts(start, end):
+    """Issues per book over [start, end]: whole months from the monthly table, edges from the daily one."""
+    first_month = start if start.day == 1 else _next_month(start)
+    end_month = _next_month(end) if (end + timedelta(days=1)).day == 1 else end.replace(day=1)
+    counts = Counter()
+    if first_month < end_month:
+        counts.update(dict(
+            MonthlyTitleStat.objects.filter(month__gte=first_month, month__lt=end_month)
+            .values_list("book_id").annotate(n=Sum("issues")).order_by()
+        ))
+        edges = [(start, first_month - timedelta(days=1)), (end_month, end)]
+    else:
+        edges = [(start, end)]
+    for low, high in edges:
+        if low <= high:
+            counts.update(dict(
+                DailyTitleStat.objects.filter(day__range=(low, high))
+                .values_list("book_id").annotate(n=Sum("issues")).order_by()
+            ))
+    return counts
+
+
+def top_titles(start, end, limit=25):
+    top = _title_counts(start, end).most_common(limit)
+    books = Book.objects.only("title", "author", "category").in_bulk([book_id for book_id, n in top])
+    rows = [
+        (books[book_id].title, books[book_id].author, books[book_id].category, n)
+        for book_id, n in top if book_id in books
+    ]
+    return ["Title", "Author", "Category", "Loans"], rows
+
+
+def loans_by_category_month(start, end):
+    rows = (
+        DailyCategoryStat.objects.filter(day__range=(start, end))
+        .annotate(month=TruncMonth("day"))
+        .values_list("month", "category")
+        .annotate(loans=Sum("issues"))
+        .order_by("month", "category")
+    )
+    return ["Month", "Category", "Loans"], [(month.strftime("%Y-%m"), category, n) for month, category, n in rows]
+
+
+def overdue_by_branch(start, end):
+    rows = (
+        DailyBranchStat.objects.filter(day__range=(start, end))
+        .values_list("branch")
+        .annotate(issues=Sum("issues"), returns=Sum("returns"), late=Sum("late_returns"), fines=Sum("fines"))
+        .order_by("branch")
+    )
+    return (
+        ["Branch", "Loans", "Returns", "Late returns", "Overdue rate %", "Fines ₹"],
+        [
+            (branch, issues, returns, late, round(100 * late / returns, 1) if returns else 0.0, fines)
+            for branch, issues, returns, late, fines in rows
+        ],
+    )
+
+
+def busiest_hours(start, end):
+    rows = (
+        HourlyActivityStat.objects.filter(day__range=(start, end))
+        .values_list("hour")
+        .annotate(issues=Sum("issues"), returns=Sum("returns"))
+        .order_by("hour")
+    )
+    rows = sorted(((f"{hour:02d}:00", i, r, i + r) for hour, i, r in rows), key=lambda row: -row[3])
+    return ["Hour", "Issues", "Returns", "Total"], rows
+
+
+REPORTS = {
+    "titles": ("Most borrowed titles", top_titles),
+    "categories": ("Loans per category per month", loans_by_category_month),
+    "branches": ("Overdue rate by branch", overdue_by_branch),
+    "hours": ("Busiest hours", busiest_hours),
+}
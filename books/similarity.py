@@ -0,0 +1,291 @@
+"""
+Content-based "similar titles", for books with little or no loan history.
+
+Each book becomes a TF-IDF vector over its title (counted twice),
+description, author and category. Vectors are L2-normalised, so a sparse
+product of a batch of rows with the whole matrix gives cosine similarities.
+``rebuild`` scores the catalogue in batches of ``BATCH_SIZE`` rows and keeps
+the best ``TOP_K`` per book in ``SimilarBook``, which ``book_detail`` reads
+with one indexed lookup.
+
+Tokens carried by a large share of the catalogue (a category token is on a
+sixth of all books) would make every row's product touch most of the
+catalogue. They are left out of the sparse product, which then only finds
+candidate pairs sharing a rarer token, and their exact contribution is
+added back for those pairs from a small dense matrix.
+
+The matrix is saved as plain ``.npy`` arrays (CSR data/indices/indptr, row
+book ids, idf) in a fresh directory per build under
+``settings.RECOMMENDER_DIR``, and a ``content_current`` pointer file is
+swapped in once the build is complete; the build it replaced is kept
+until the next one, for workers that read the pointer just before the
+swap. Workers open the arrays with ``mmap_mode="r"``, so every process
+shares one copy through the page cache. Each build also records the highest book id it covered: a book up
+to that id without stored rows simply has no similar titles, and only
+books added since are scored on the fly against the index. Either answer
+is cached per build, so a book page doesn't repeat the work per view.
+"""
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Book, SimilarBook
+
+TOP_K = 8
+MIN_SCORE = 0.1
+BATCH_SIZE = 256
+# A token is "common" when on more than this many books and this share of the catalogue
+COMMON_MIN_BOOKS = 500
+COMMON_SHARE = 0.01
+POINTER_FILE = "content_current"
+META_FILE = "meta.json"
+FALLBACK_TTL = 24 * 60 * 60
+TOKEN_RE = re.compile(r"[a-z0-9]{2,}")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in into is it its of on or that the this to was were with "
+    "book books edition vol volume part".split()
+)
+
+
+def _words(text):
+    return [w for w in TOKEN_RE.findall((text or "").lower()) if w not in STOP_WORDS]
+
+
+def tokens(title, author, category, description):
+    return (
+        _words(title) * 2
+        + _words(description)
+        + [f"author:{w}" for w in _words(author)]
+        + [f"category:{(category or '').lower()}"]
+    )
+
+
+def similar_books(book, limit=6):
+    stored = [
+        s.similar
+        for s in SimilarBook.objects.filter(book=book).select_related("similar").order_by("rank")[:limit]
+    ]
+    if stored:
+        return stored
+    build = _current_build()
+    if build is None:
+        return []
+
+    key = f"similar:{build}:{book.pk}"
+    ids = cache.get(key)
+    if ids is None:
+        built_through = _built_through(build)
+        if built_through is not None and book.pk <= built_through:
+            ids = []  # scored in the build, nothing close enough
+        else:
+            # Added since the last build: score it against the shared index
+            index = load_index()
+            words = tokens(book.title, book.author, book.category, book.description)
+            ranked = index.query(words, limit + 1) if index else []
+            ids = [pk for pk, score in ranked if pk != book.pk]
+        cache.set(key, ids, FALLBACK_TTL)
+    books = Book.objects.in_bulk(ids) if ids else {}
+    return [books[pk] for pk in ids if pk in books][:limit]
+
+
+# ---------------------
+# Shared memory-mapped index
+# ---------------------
+class ContentIndex:
+    def __init__(self, path):
+        import numpy as np
+        from scipy import sparse
+
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        self.book_ids = load("book_ids")
+        self.idf = load("idf")
+        # csr_matrix keeps the memmaps as-is when dtypes already match
+        self.vectors = sparse.csr_matrix(
+            (load("data"), load("indices"), load("indptr")),
+            shape=(len(self.book_ids), len(self.idf)),
+            copy=False,
+        )
+        with open(os.path.join(path, "vocab.json")) as f:
+            self.vocab = json.load(f)
+
+    def vector(self, words):
+        import numpy as np
+
+        counts = Counter(self.vocab[w] for w in words if w in self.vocab)
+        q = np.zeros(len(self.idf), dtype=np.float32)
+        for column, n in counts.items():
+            q[column] = (1 + math.log(n)) * self.idf[column]
+        norm = np.linalg.norm(q)
+        return q / norm if norm else q
+
+    def query(self, words, limit):
+        """Return ``[(book_id, score)]`` of the best matches for a token list."""
+        import numpy as np
+
+        q = self.vector(words)
+        if not q.any():
+            return []
+        scores = self.vectors @ q
+        top = np.argsort(-scores)[:limit]
+        return [(int(self.book_ids[i]), float(scores[i])) for i in top if scores[i] >= MIN_SCORE]
+
+
+_index_lock = threading.Lock()
+_index = (None, None)  # (build directory, ContentIndex)
+
+
+def _path(*parts):
+    return os.path.join(settings.RECOMMENDER_DIR, *parts)
+
+
+def _current_build():
+    try:
+        with open(_path(POINTER_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+_built_through_ids = {}
+
+
+def _built_through(build):
+    """The highest book id in ``build``; None for builds made before this was recorded."""
+    if build not in _built_through_ids:
+        try:
+            with open(_path(build, META_FILE)) as f:
+                _built_through_ids[build] = json.load(f)["built_through"]
+        except (FileNotFoundError, KeyError, ValueError):
+            _built_through_ids[build] = None
+    return _built_through_ids[build]
+
+
+def load_index():
+    """The current build's index, opened once per process and reopened after a rebuild."""
+    global _index
+    # A rebuild may delete the build we just read the pointer to; read it again once
+    for _ in range(2):
+        current = _current_build()
+        if current is None:
+            return None
+        with _index_lock:
+            try:
+                if _index[0] != current:
+                    _index = (current, ContentIndex(_path(current)))
+                return _index[1]
+            except FileNotFoundError:
+                continue
+    return None
+
+
+# ---------------------
+# Build
+# ---------------------
+def _vectorize():
+    """Return (book_ids, vocab, idf, L2-normalised TF-IDF CSR matrix) for the whole catalogue."""
+    import numpy as np
+    from scipy import sparse
+
+    vocab, book_ids, indptr, indices, counts = {}, [], [0], [], []
+    rows = Book.objects.order_by("pk").values_list("pk", "title", "author", "category", "description")
+    for pk, *fields in rows.iterator(chunk_size=5000):
+        for word, n in Counter(tokens(*fields)).items():
+            indices.append(vocab.setdefault(word, len(vocab)))
+            counts.append(n)
+        indptr.append(len(indices))
+        book_ids.append(pk)
+
+    indices = np.array(indices, dtype=np.int32)
+    tf = sparse.csr_matrix(
+        (1 + np.log(np.array(counts, dtype=np.float32)), indices, np.array(indptr, dtype=np.int32)),
+        shape=(len(book_ids), len(vocab)),
+    )
+    df = np.bincount(indices, minlength=len(vocab))
+    idf = (np.log((1 + len(book_ids)) / (1 + df)) + 1).astype(np.float32)
+    tfidf = (tf @ sparse.diags(idf)).tocsr()
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    vectors = (sparse.diags((1 / norms).astype(np.float32)) @ tfidf).tocsr()
+    vectors.sort_indices()
+    return np.array(book_ids, dtype=np.int64), vocab, idf, vectors
+
+
+def _save_index(book_ids, vocab, idf, vectors):
+    import numpy as np
+
+    os.makedirs(settings.RECOMMENDER_DIR, exist_ok=True)
+    build = tempfile.mkdtemp(prefix="content-", dir=settings.RECOMMENDER_DIR)
+    arrays = {
+        "book_ids": book_ids,
+        "idf": idf,
+        "data": vectors.data.astype(np.float32),
+        "indices": vectors.indices.astype(np.int32),
+        "indptr": vectors.indptr.astype(np.int32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(build, f"{name}.npy"), array)
+    with open(os.path.join(build, "vocab.json"), "w") as f:
+        json.dump(vocab, f)
+    with open(os.path.join(build, META_FILE), "w") as f:
+        json.dump({"built_through": int(book_ids[-1]) if len(book_ids) else 0}, f)
+
+    # Swap the pointer, then drop builds older than the one it replaced: a worker
+    # that read the old pointer just before the swap can still open that build
+    keep = {os.path.basename(build), _current_build()}
+    fd, tmp = tempfile.mkstemp(dir=settings.RECOMMENDER_DIR)
+    with os.fdopen(fd, "w") as f:
+        f.write(os.path.basename(build))
+    os.replace(tmp, _path(POINTER_FILE))
+    for name in os.listdir(settings.RECOMMENDER_DIR):
+        if name.startswith("content-") and name not in keep:
+            shutil.rmtree(_path(name), ignore_errors=True)
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Vectorise the catalogue, publish the index and store top-K similar books; return rows stored."""
+    import numpy as np
+    from scipy import sparse
+
+    book_ids, vocab, idf, vectors = _vectorize()
+    _save_index(book_ids, vocab, idf, vectors)
+
+    # Common tokens score candidate pairs but don't produce them
+    df = np.bincount(vectors.indices, minlength=vectors.shape[1])
+    common = df > max(COMMON_MIN_BOOKS, COMMON_SHARE * len(book_ids))
+    rare = (vectors @ sparse.diags((~common).astype(np.float32))).tocsr()
+    rare.eliminate_zeros()
+    dense = vectors[:, np.flatnonzero(common)].toarray()
+
+    stored, transposed = 0, rare.T.tocsr()
+    for start in range(0, len(book_ids), batch_size):
+        stop = min(start + batch_size, len(book_ids))
+        scores = (rare[start:stop] @ transposed).tocoo()
+        rows, cols = scores.row + start, scores.col
+        score = scores.data + np.einsum("ij,ij->i", dense[rows], dense[cols])
+        keep = (rows != cols) & (score >= MIN_SCORE)
+        rows, cols, score = rows[keep], cols[keep], score[keep]
+
+        # Per row, best first (ties by book order); keep each row's first TOP_K
+        order = np.lexsort((cols, -score, rows))
+        rows, cols, score = rows[order], cols[order], score[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+        top = rank < TOP_K
+
+        similar = [
+            SimilarBook(book_id=int(book_ids[r]), rank=int(k) + 1, similar_id=int(book_ids[c]), score=float(s))
+            for r, k, c, s in zip(rows[top], rank[top], cols[top], score[top])
+        ]
+        with transaction.atomic():
+            SimilarBook.objects.filter(book_id__in=book_ids[start:stop].tolist()).delete()
+            SimilarBook.objects.bulk_create(similar, batch_size=2000)
+        stored += len(similar)
+    return stored
@@ -1,3 +1,217 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from core.models import IdempotencyKey
+from . import circulation, similarity
+from .management.commands.reconcile_inventory import Command as ReconcileInventory
+from .models import Book, BookCopy, CirculationEvent, Hold, IssuedBook
+
+
+def make_student(username, **fields):
+    return CustomUser.objects.create_user(username=username, password="x", role="student", **fields)
+
+
+def make_book(title="Operating Systems", copies=2, author="Galvin", **fields):
+    return Book.objects.create(title=title, author=author, total_copies=copies, available_copies=copies, **fields)
+
+
+class ReconcileInventoryTests(TestCase):
+    def setUp(self):
+        self.book = make_book(copies=3)
+        # An open loan the counter never heard of
+        self.loan = IssuedBook.objects.create(
+            student=make_student("alice"), book=self.book, due_date=timezone.now() + timedelta(days=14)
+        )
+
+    def test_dry_run_reports_without_writing(self):
+        out = StringIO()
+        call_command("reconcile_inventory", "--dry-run", stdout=out)
+        self.assertIn("available 3 -> 2", out.getvalue())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 3)
+
+    def test_fixes_counter_and_records_adjustment(self):
+        call_command("reconcile_inventory", stdout=StringIO())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 2)
+        self.assertTrue(CirculationEvent.objects.filter(note="reconcile_inventory", quantity=-1).exists())
+
+    def test_recounts_at_write_time(self):
+        # The loan comes back between the scan and the write: the counter is right again and stays so
+        IssuedBook.objects.filter(pk=self.loan.pk).update(return_date=timezone.now())
+        self.assertEqual(ReconcileInventory.fix([self.book.pk]), 0)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 3)
+
+
+class SimilarBooksTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(RECOMMENDER_DIR=directory.name))
+        self.kernels = make_book("Linux Kernel Internals", description="process scheduling and memory")
+        self.scheduling = make_book("Scheduling in Linux", description="process scheduling")
+        self.poems = make_book("Collected Poems", author="Frost", category="Math", description="verse")
+        similarity.rebuild()
+
+    def test_built_book_without_neighbours_skips_the_index(self):
+        with mock.patch.object(similarity, "load_index") as load_index:
+            self.assertEqual(similarity.similar_books(self.poems), [])
+            self.assertEqual(similarity.similar_books(self.poems), [])
+        load_index.assert_not_called()
+
+    def test_stored_neighbours(self):
+        self.assertEqual(similarity.similar_books(self.kernels), [self.scheduling])
+
+    def test_previous_build_survives_a_rebuild(self):
+        first = similarity._current_build()
+        similarity.rebuild()
+        similarity.rebuild()
+        builds = {name for name in os.listdir(settings.RECOMMENDER_DIR) if name.startswith("content-")}
+        self.assertEqual(len(builds), 2)
+        self.assertNotIn(first, builds)
+
+    def test_build_deleted_under_the_reader_is_retried(self):
+        similarity.rebuild()
+        current = similarity._current_build()
+        stale = iter(["content-gone"])
+        with mock.patch.object(similarity, "_current_build", side_effect=lambda: next(stale, current)):
+            self.assertIsNotNone(similarity.load_index())
+        with mock.patch.object(similarity, "_current_build", return_value="content-gone"):
+            self.assertIsNone(similarity.load_index())
+
+    def test_new_book_is_scored_live_once(self):
+        new = make_book("Linux Process Scheduling", description="scheduling")
+        with mock.patch.object(similarity, "load_index", wraps=similarity.load_index) as load_index:
+            first = similarity.similar_books(new)
+            self.assertEqual(similarity.similar_books(new), first)
+        self.assertIn(self.scheduling, first)
+        self.assertEqual(load_index.call_count, 1)
+
+
+class IssueReturnTests(TestCase):
+    def setUp(self):
+        self.alice = make_student("alice")
+        self.book = make_book(copies=2)
+
+    def test_issue_claims_a_copy_and_records_it(self):
+        [loan] = circulation.issue_books(self.alice, [self.book])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 1)
+        self.assertEqual(BookCopy.objects.get(pk=loan.copy_id).status, BookCopy.ON_LOAN)
+        self.assertTrue(CirculationEvent.objects.filter(kind=CirculationEvent.ISSUE, loan_id=loan.pk).exists())
+
+    def test_failed_batch_writes_nothing(self):
+        circulation.issue_books(self.alice, [self.book])
+        other = make_book("Networks", copies=1)
+        with self.assertRaises(circulation.CirculationError) as raised:
+            circulation.issue_books(self.alice, [other, self.book])
+        self.assertIn(self.book.pk, raised.exception.errors)
+        other.refresh_from_db()
+        self.assertEqual(other.available_copies, 1)
+        self.assertFalse(IssuedBook.objects.filter(book=other).exists())
+
+    def test_return_puts_the_copy_back(self):
+        [loan] = circulation.issue_books(self.alice, [self.book])
+        circulation.return_loans([loan])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 2)
+        self.assertEqual(BookCopy.objects.get(pk=loan.copy_id).status, BookCopy.AVAILABLE)
+        with self.assertRaises(circulation.CirculationError):
+            circulation.return_loans([loan])
+
+
+class HoldQueueTests(TestCase):
+    def setUp(self):
+        self.alice, self.bob = make_student("alice"), make_student("bob")
+        self.book = make_book(copies=1)
+        [self.loan] = circulation.issue_books(self.alice, [self.book])
+
+    def test_returned_copy_goes_to_the_head_of_the_queue(self):
+        hold = circulation.place_hold(self.bob, self.book)
+        circulation.return_loans([self.loan])
+        hold.refresh_from_db()
+        self.assertEqual((hold.status, hold.copy_id), (Hold.READY, self.loan.copy_id))
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 0)
+
+        [loan] = circulation.issue_books(self.bob, [self.book])
+        self.assertEqual(loan.copy_id, self.loan.copy_id)
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, Hold.FULFILLED)
+
+    def test_no_hold_on_a_book_on_the_shelf(self):
+        with self.assertRaises(circulation.CirculationError):
+            circulation.place_hold(self.bob, make_book("Networks"))
+
+    def test_renewal_blocked_while_readers_wait(self):
+        circulation.place_hold(self.bob, self.book)
+        with self.assertRaises(circulation.CirculationError) as raised:
+            circulation.renew_loans([self.loan])
+        self.assertIn(self.loan.pk, raised.exception.errors)
+
+    def test_renewal_pushes_the_due_date(self):
+        later = timezone.now() + timedelta(days=7)
+        [loan] = circulation.renew_loans([self.loan], renewed_at=later)
+        self.assertEqual(loan.due_date, later + circulation.LOAN_PERIOD)
+
+
+class ClassSetTests(TestCase):
+    def setUp(self):
+        self.students = [make_student(f"s{i}") for i in range(3)]
+        self.book = make_book(copies=2)
+
+    def test_shortfall_lists_students_left_without_a_copy(self):
+        circulation.issue_books(self.students[0], [self.book])
+        result = circulation.issue_class_set(self.students, [self.book])
+        self.assertEqual(result.already, {self.book: [self.students[0]]})
+        self.assertEqual(result.shortfall, {self.book: [self.students[2]]})
+        self.assertEqual([loan.student for loan in result.issued], [self.students[1]])
+        self.assertTrue(all(loan.pk for loan in result.issued))
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 0)
+
+    def test_all_or_nothing(self):
+        result = circulation.issue_class_set(self.students, [self.book], allow_partial=False)
+        self.assertEqual(result.shortfall, {self.book: [self.students[2]]})
+        self.assertFalse(IssuedBook.objects.exists())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 2)
+
+
+class DeskApiIdempotencyTests(TestCase):
+    def setUp(self):
+        self.alice = make_student("alice")
+        self.book = make_book(isbn="9780000000001")
+        self.body = {"library_card": self.alice.library_card, "isbns": [self.book.isbn]}
+        self.librarian = CustomUser.objects.create_user(username="lib", password="x", role="librarian")
+
+    def issue(self):
+        return self.client.post(
+            reverse("books:desk_issue"), self.body, content_type="application/json", HTTP_IDEMPOTENCY_KEY="scan-1"
+        )
+
+    def test_forbidden_request_claims_no_key(self):
+        self.assertEqual(self.issue().status_code, 403)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_librarian_retry_is_replayed(self):
+        self.client.force_login(self.librarian)
+        first, retry = self.issue(), self.issue()
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertNotIn("Idempotent-Replayed", first)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(IssuedBook.objects.count(), 1)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api
 app_name = "books"
 urlpatterns = [
     path('browse/', views.browse_books, name='browse_books'),
@@ -12,9 +12,19 @@ urlpatterns = [
     path("issued-books/", views.issued_books_dashboard, name="issued_books_dashboard"),
     path("return-book/<int:issue_id>/", views.return_book, name="return_book"),
     path("my-issued-books/", views.my_issued_books, name="my_issued_books"),
+    path("renew/<int:issue_id>/", views.renew_book, name="renew_book"),
+    path("reports/", views.circulation_reports, name="circulation_reports"),
     path('student/<int:student_id>/history/', views.student_book_history, name='student_book_history'),
+    path("my-holds/", views.my_holds, name="my_holds"),
+    path("holds/<int:hold_id>/cancel/", views.cancel_hold_view, name="cancel_hold"),
+
+    # Circulation desk API (barcode scanners)
+    path('api/desk/borrower/<str:library_card>/', api.desk_lookup, name='desk_lookup'),
+    path('api/desk/issue/', api.desk_issue, name='desk_issue'),
+    path('api/desk/return/', api.desk_return, name='desk_return'),
 
     path('<slug:slug>/', views.book_detail, name='book_detail'),
+    path('<slug:slug>/hold/', views.place_hold_view, name='place_hold'),
 
 ]
 
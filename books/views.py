@@ -1,10 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from .forms import BookForm, ManualBulkBookFormSet, IssueBookForm
 from django.contrib.auth.decorators import login_required, user_passes_test
-from .models import Book, IssuedBook
+from .models import Book, Hold, IssuedBook
+from .archive import loan_history
+from .recommendations import also_borrowed
+from .similarity import similar_books
+from .reports import REPORTS, last_rollup_day
 from django.core.paginator import Paginator
 from django.contrib import messages
-from django.db.models import Q
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 #import csv, io, zipfile, os
 #from django.core.files.base import ContentFile
 from django.views.decorators.http import require_http_methods
@@ -16,6 +21,9 @@ from django.utils.timezone import now
 from .models import CustomUser
 from django.http import HttpResponse
 import csv
+from core.facets import get_facets
+from core.idempotency import idempotent
+from .circulation import CirculationError, cancel_hold, issue_books, place_hold, renew_loans, return_loans
 
 def browse_books(request):
     books = Book.objects.filter(available=True).order_by('-uploaded_at')  # Filter only available books
@@ -32,7 +40,7 @@ def browse_books(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
-    categories = Book.CATEGORY_CHOICES
+    categories = get_facets()['category']  # [(code, label, available book count)]
 
     return render(request, 'books/browse_books.html', {
         'page_obj': page_obj,
@@ -64,7 +72,62 @@ def add_book(request):
 @login_required
 def book_detail(request, slug):
     book = get_object_or_404(Book, slug=slug)
-    return render(request, 'books/book_detail.html', {'book': book})
+    borrowed = also_borrowed(book)
+    context = {
+        'book': book,
+        'also_borrowed': borrowed,
+        'similar_books': [b for b in similar_books(book) if b not in borrowed],
+    }
+    if book.available_copies == 0:
+        context['queue_length'] = book.holds.filter(status=Hold.WAITING).count()
+        context['my_hold'] = book.holds.filter(student=request.user, status__in=Hold.ACTIVE).first()
+    return render(request, 'books/book_detail.html', context)
+
+
+# ---------- Holds ----------
+@login_required
+@require_http_methods(["POST"])
+def place_hold_view(request, slug):
+    book = get_object_or_404(Book, slug=slug)
+    if request.user.is_librarian():
+        messages.error(request, "Librarians cannot place holds.")
+        return redirect(book.get_absolute_url())
+    try:
+        hold = place_hold(request.user, book)
+    except CirculationError as e:
+        messages.warning(request, str(e))
+    else:
+        messages.success(request, f"✅ You are #{hold.position} in line for '{book.title}'. We'll email you when a copy is set aside.")
+    return redirect(book.get_absolute_url())
+
+
+@login_required
+@require_http_methods(["POST"])
+def cancel_hold_view(request, hold_id):
+    hold = get_object_or_404(Hold, id=hold_id, student=request.user)
+    try:
+        cancel_hold(hold)
+    except CirculationError as e:
+        messages.warning(request, str(e))
+    else:
+        messages.success(request, f"Hold on '{hold.book.title}' cancelled.")
+    return redirect("books:my_holds")
+
+
+@login_required
+def my_holds(request):
+    # Readers ahead in the queue, counted in the same query
+    ahead = (
+        Hold.objects.filter(book=OuterRef("book"), status=Hold.WAITING, position__lt=OuterRef("position"))
+        .order_by().values("book").annotate(n=Count("pk")).values("n")
+    )
+    holds = (
+        Hold.objects.filter(student=request.user, status__in=Hold.ACTIVE)
+        .select_related("book")
+        .annotate(ahead=Coalesce(Subquery(ahead), 0))
+        .order_by("status", "created_at")  # ready before waiting
+    )
+    return render(request, "books/my_holds.html", {"holds": holds})
 
 '''   
 # ---------- CSV + ZIP (covers) bulk upload ----------
@@ -177,6 +240,7 @@ def bulk_upload_books(request):
 
 # ---------- Manual bulk add via formset ----------
 @require_http_methods(["GET", "POST"])
+@idempotent
 def manual_bulk_add_books(request):
     """
     Add multiple books manually at once (with cover images; PDFs remain manual per book).
@@ -253,19 +317,20 @@ def get_absolute_url(self):
         return reverse("books:book_detail", kwargs={"slug": self.slug})
 
 @user_passes_test(is_librarian)
+@idempotent
 def issue_book(request):
     if request.method == "POST":
         form = IssueBookForm(request.POST)
         if form.is_valid():
-            issued_book = form.save(commit=False)
-            # reduce available copies
-            issued_book.book.available_copies -= 1
-            issued_book.book.save()
-            issued_book.issue_date = timezone.now().date()
-            issued_book.due_date = timezone.now().date() + timedelta(days=14)
-            issued_book.save()
-            messages.success(request,f'Book "{issued_book.book.title}" issued successfully to {issued_book.student.get_full_name()}!')
-            return redirect('librarian_dashboard')
+            try:
+                # claims a physical copy and adjusts stock in one transaction
+                issued_book, = issue_books(form.cleaned_data['student'], [form.cleaned_data['book']])
+            except CirculationError as e:
+                for error in e.errors.values() or [str(e)]:
+                    messages.error(request, error)
+            else:
+                messages.success(request,f'Book "{issued_book.book.title}" issued successfully to {issued_book.student.get_full_name()}!')
+                return redirect('librarian_dashboard')
     else:
         form = IssueBookForm()
     return render(request, 'books/issue_book.html',{'form': form, 'today': timezone.now().date() , 'due_date': timezone.now() + timedelta(days=14)})
@@ -296,22 +361,23 @@ def issued_books_dashboard(request):
 
     context = {
         "issues": issues,
+        # New loans are pushed into the table only when the view isn't narrowed to other rows
+        "live_inserts": not query and filter_option in ("", "not_returned"),
     }
     return render(request, "books/issued_book.html", context)
 
 
+@idempotent
 def return_book(request, issue_id):
     issue = get_object_or_404(IssuedBook, id=issue_id)
 
     if request.method == "POST":
-        if not issue.return_date:
-            issue.return_date = now().date()
-            issue.book.available_copies += 1
-            issue.book.save()
-            issue.save()
-            messages.success(request, f"Book '{issue.book.title}' returned successfully! Fine: ₹{issue.fine}")
-        else:
+        try:
+            issue, = return_loans([issue])
+        except CirculationError:
             messages.warning(request, "This book has already been returned.")
+        else:
+            messages.success(request, f"Book '{issue.book.title}' returned successfully! Fine: ₹{issue.fine}")
         return redirect("books:issued_books_dashboard")  # redirect to issued books dashboard
 
     return render(request, "books/return_book.html", {"issue": issue})
@@ -331,9 +397,23 @@ def my_issued_books(request):
         "student": student,
     })
 
+
+@login_required
+@require_http_methods(["POST"])
+def renew_book(request, issue_id):
+    issue = get_object_or_404(IssuedBook, id=issue_id, student=request.user)
+    try:
+        issue, = renew_loans([issue])
+    except CirculationError as e:
+        for error in e.errors.values() or [str(e)]:
+            messages.warning(request, error)
+    else:
+        messages.success(request, f"✅ '{issue.book.title}' renewed. New due date: {issue.due_date:%d %b %Y}.")
+    return redirect("books:my_issued_books")
+
 def student_book_history(request, student_id):
     student = get_object_or_404(CustomUser, id=student_id, role='student')
-    issued_books = IssuedBook.objects.filter(student=student).select_related('book')
+    issued_books = loan_history(student)
 
     # 🔹 CSV Export
     if request.GET.get("export") == "csv":
@@ -356,8 +436,8 @@ def student_book_history(request, student_id):
         return response
 
     # 🔹 Stats
-    returned_count = issued_books.filter(return_date__isnull=False).count()
-    pending_count = issued_books.filter(return_date__isnull=True).count()
+    returned_count = sum(1 for b in issued_books if b.return_date)
+    pending_count = len(issued_books) - returned_count
     total_fine = sum(b.fine for b in issued_books)
 
     context = {
@@ -368,4 +448,46 @@ def student_book_history(request, student_id):
         "total_fine": total_fine,
         "today": now().date(),
     }
-    return render(request, "books/books_history.html", context)
\ No newline at end of file
+    return render(request, "books/books_history.html", context)
+
+# ---------- Reports ----------
+def _report_range(request):
+    today = timezone.localdate()
+    try:
+        start = date.fromisoformat(request.GET.get("start", ""))
+    except ValueError:
+        start = today - timedelta(days=30)
+    try:
+        end = date.fromisoformat(request.GET.get("end", ""))
+    except ValueError:
+        end = today
+    return (start, end) if start <= end else (end, start)
+
+
+@login_required
+@user_passes_test(is_librarian)
+def circulation_reports(request):
+    start, end = _report_range(request)
+
+    # 🔹 CSV Export of a single report
+    export = request.GET.get("export")
+    if export in REPORTS:
+        title, report = REPORTS[export]
+        headers, rows = report(start, end)
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="{export}_{start}_{end}.csv"'
+        writer = csv.writer(response)
+        writer.writerow(headers)
+        writer.writerows(rows)
+        return response
+
+    reports = []
+    for key, (title, report) in REPORTS.items():
+        headers, rows = report(start, end)
+        reports.append({"key": key, "title": title, "headers": headers, "rows": rows})
+    return render(request, "books/reports.html", {
+        "reports": reports,
+        "start": start,
+        "end": end,
+        "last_day": last_rollup_day(),
+    })
@@ -1,101 +1,111 @@
-from datetime import date
-from django.conf import settings
-from books.models import IssuedBook, Book
-from accounts.models import CustomUser
-from django.utils.timezone import now
-# ---------- Simple rule-based intent detection ----------
-def detect_intent(text: str):
-    """Return an intent tag and optional params."""
-    t = text.lower().strip()
-
-    if any(k in t for k in ("my books", "issued", "books i have", "my issued")):
-        return "check_issued_books", {}
-
-    if "fine" in t or "fines" in t or "due" in t:
-        return "check_fines", {}
-
-    if any(k in t for k in ("search book", "find", "do you have", "available")):
-        title = ""
-        if "search book" in t:
-            title = t.replace("search book", "").strip(" ?")
-        elif "find" in t:
-            title = t.replace("find", "").strip(" ?")
-        elif "do you have" in t:
-            title = t.split("do you have", 1)[-1].strip(" ?")
-        elif "available" in t:
-            title = t.replace("available", "").strip(" ?")
-
-        return "search_book", {"title": title}
-
-    if any(k in t for k in ("hello", "hi", "hey")):
-        return "greeting", {}
-
-    return "unknown", {}
+from asgiref.sync import sync_to_async
+from books.models import Book
+from .context import acached_search, aget_context, cached_search, get_context
+from .intents import detect_intent
+from . import llm
+
+STATIC_REPLIES = {
+    "greeting": "Hello! 👋 I can help with checking your issued books, fines, searching books, and more. Just ask me.",
+    "help": (
+        "Try asking:\n- \"Show my issued books\"\n- \"Do I have any fines?\"\n"
+        "- \"Do you have Clean Code?\""
+    ),
+    "developer": "Ankush Nandgouli is the developer of this Library Management System.",
+}
+UNKNOWN_REPLY = "Sorry, I didn’t understand that. Try asking about your books, fines, or searching for a title."
+STUDENTS_ONLY = {
+    "check_issued_books": "I can show issued books only for students. Please login as a student and try again.",
+    "check_fines": "I can check fines for students. Please login as a student.",
+}
+ASK_FOR_TITLE = "Please tell me the title or part of the title to search for."
 
 # ---------- Helpers: build reply for each intent ----------
-def reply_check_issued_books(user):
-    if not user or not getattr(user, "is_student", None) or not user.is_student():
-        return "I can show issued books only for students. Please login as a student and try again."
+def _is_student(user):
+    return bool(user and getattr(user, "is_student", None) and user.is_student())
 
-    issued = IssuedBook.objects.filter(student=user, return_date__isnull=True).select_related("book")
-    if not issued.exists():
+def format_issued_books(context):
+    loans = context["loans"]
+    if not loans:
         return "You currently have no books issued. ✅"
 
-    lines = []
-    today = date.today()
-    for i in issued:
-        fine = 0
-        if i.due_date and today > i.due_date:
-            fine = (today - i.due_date).days * getattr(settings, "LIB_FINE_RATE", 10)
-        lines.append(f"- {i.book.title} | Issued: {i.issue_date} | Due: {i.due_date} | Fine: ₹{fine}")
+    lines = [
+        f"- {l['title']} | Issued: {l['issue_date']} | Due: {l['due_date']} | Fine: ₹{l['fine']}"
+        for l in loans
+    ]
     return "Here are your issued books:\n" + "\n".join(lines)
 
-def reply_check_fines(user):
-    if not user or not getattr(user, "is_student", None) or not user.is_student():
-        return "I can check fines for students. Please login as a student."
-
-    issued = IssuedBook.objects.filter(student=user, return_date__isnull=True)
-    total = 0
-    today = now()
-    for i in issued:
-        if i.due_date and today > i.due_date:
-            total += (today - i.due_date).days * getattr(settings, "LIB_FINE_RATE", 10)
-
+def format_fines(context):
+    total = context["fine"]
     if total == 0:
         return "You have no fines. ✅"
     return f"Your total fine is ₹{total}."
 
-def reply_search_book(title: str):
-    if not title:
-        return "Please tell me the title or part of the title to search for."
-
+def _book_query(title):
     qs = Book.objects.filter(title__icontains=title) | Book.objects.filter(author__icontains=title)
-    qs = qs.distinct()[:10]
+    return qs.distinct().only("title", "author", "available")[:10]
 
-    if not qs.exists():
+def format_search(title, books):
+    if not books:
         return f"No books found for '{title}'."
 
     lines = []
-    for b in qs:
+    for b in books:
         lines.append(f"- {b.title} by {b.author or 'Unknown'} | Available: {'Yes' if getattr(b,'available',True) else 'No'}")
     return "Search results:\n" + "\n".join(lines)
 
-# ---------- main router ----------
-def handle_user_message(text, user=None):
-    intent, params = detect_intent(text)
+def _search_books(title):
+    return format_search(title, list(_book_query(title)))
 
-    if intent == "check_issued_books":
-        return reply_check_issued_books(user)
+async def _asearch_books(title):
+    return format_search(title, [b async for b in _book_query(title)])
 
-    if intent == "check_fines":
-        return reply_check_fines(user)
+CONTEXT_REPLIES = {"check_issued_books": format_issued_books, "check_fines": format_fines}
 
+# ---------- main router ----------
+def _reply(intent, params, context, search):
+    """The rule-based reply, from the context and search already fetched."""
+    if intent in CONTEXT_REPLIES:
+        return STUDENTS_ONLY[intent] if context is None else CONTEXT_REPLIES[intent](context)
     if intent == "search_book":
-        return reply_search_book(params.get("title"))
-
-    if intent == "greeting":
-        return "Hello! 👋 I can help with checking your issued books, fines, searching books, and more. Just ask me."
+        return search or ASK_FOR_TITLE
+    return STATIC_REPLIES.get(intent, UNKNOWN_REPLY)
+
+def _facts(intent, context, search):
+    """What a generative reply may draw on (see chatbot.llm)."""
+    facts = []
+    if context is not None:
+        facts += [format_issued_books(context), format_fines(context)]
+    if search:
+        facts.append(search)
+    if intent in STATIC_REPLIES:
+        facts.append(STATIC_REPLIES[intent])
+    elif intent in STUDENTS_ONLY and context is None:
+        facts.append(STUDENTS_ONLY[intent])
+    return facts
+
+def _needs_context(intent, user):
+    return _is_student(user) and (intent in CONTEXT_REPLIES or llm.enabled())
 
-    if intent == "developer" or "developed" or "who coded you":
-        return "Ankush Nandgouli is the developer of this Library Management System."
-    return "Sorry, I didn’t understand that. Try asking about your books, fines, or searching for a title."
+def handle_user_message(text, user=None):
+    intent, params = detect_intent(text)
+    context = get_context(user) if _needs_context(intent, user) else None
+    title = params.get("title") if intent == "search_book" else None
+    search = cached_search(title, _search_books) if title else None
+
+    reply = _reply(intent, params, context, search)
+    if llm.enabled():
+        return llm.generate(text, _facts(intent, context, search), fallback=reply)
+    return reply
+
+async def ahandle_user_message(text, user=None):
+    """``handle_user_message`` for async views: same replies, via the async ORM and cache API."""
+    # Classifying is numpy work (and trains the model on first use); keep it off the event loop
+    intent, params = await sync_to_async(detect_intent, thread_sensitive=False)(text)
+    context = await aget_context(user) if _needs_context(intent, user) else None
+    title = params.get("title") if intent == "search_book" else None
+    search = await acached_search(title, _asearch_books) if title else None
+
+    reply = _reply(intent, params, context, search)
+    if llm.enabled():
+        return await llm.agenerate(text, _facts(intent, context, search), fallback=reply)
+    return reply
@@ -0,0 +1,108 @@
+"""
+Cached per-user chat context and search replies.
+
+A student's open loans and fine total are loaded with one query when a
+conversation starts and kept under ``chat:context`` for every message that
+follows. ``books.circulation`` calls ``invalidate_context`` once an issue,
+return or renewal commits. Keys carry the date because fines grow daily.
+
+Search replies are cached by normalised query ("  Clean CODE? " and "clean
+code" share an entry) for ``SEARCH_TTL``, which bounds how stale their
+availability flags get.
+
+Every reader has an ``a``-prefixed twin for the async views, going through
+the async ORM and cache API instead.
+
+As with ``core.facets``, the TTLs bound staleness when the cache is
+per-process and another worker made the change.
+"""
+import hashlib
+import re
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from books.models import IssuedBook
+
+CONTEXT_TTL = 10 * 60
+SEARCH_TTL = 2 * 60
+NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+def _context_key(user_id):
+    return f"chat:context:v1:{user_id}:{timezone.localdate().isoformat()}"
+
+
+def _open_loans(user):
+    return (
+        IssuedBook.objects.filter(student=user, return_date__isnull=True)
+        .select_related("book").only("book__title", "issue_date", "due_date", "return_date")
+        .order_by("due_date")
+    )
+
+
+def _build_context(loans):
+    loans = [
+        {"title": loan.book.title, "issue_date": loan.issue_date, "due_date": loan.due_date, "fine": loan.fine}
+        for loan in loans
+    ]
+    return {"loans": loans, "fine": sum(loan["fine"] for loan in loans)}
+
+
+def get_context(user):
+    """``{"loans": [...], "fine": total}`` for a student's open loans, from the cache when possible."""
+    key = _context_key(user.pk)
+    context = cache.get(key)
+    if context is None:
+        context = preload_context(user)
+    return context
+
+
+def preload_context(user):
+    context = _build_context(_open_loans(user))
+    cache.set(_context_key(user.pk), context, CONTEXT_TTL)
+    return context
+
+
+async def aget_context(user):
+    context = await cache.aget(_context_key(user.pk))
+    if context is None:
+        context = await apreload_context(user)
+    return context
+
+
+async def apreload_context(user):
+    context = _build_context([loan async for loan in _open_loans(user)])
+    await cache.aset(_context_key(user.pk), context, CONTEXT_TTL)
+    return context
+
+
+def invalidate_context(user_ids):
+    cache.delete_many([_context_key(user_id) for user_id in set(user_ids)])
+
+
+def normalize_query(text):
+    return " ".join(NON_WORD_RE.sub(" ", (text or "").lower()).split())
+
+
+def _search_key(query):
+    return f"chat:search:v1:{hashlib.sha1(normalize_query(query).encode()).hexdigest()}"
+
+
+def cached_search(query, search):
+    """``search(query)`` with its reply cached per normalised query."""
+    key = _search_key(query)
+    reply = cache.get(key)
+    if reply is None:
+        reply = search(query)
+        cache.set(key, reply, SEARCH_TTL)
+    return reply
+
+
+async def acached_search(query, search):
+    key = _search_key(query)
+    reply = await cache.aget(key)
+    if reply is None:
+        reply = await search(query)
+        await cache.aset(key, reply, SEARCH_TTL)
+    return reply
@@ -0,0 +1,75 @@
+"""
+Keyset pagination for conversations and their messages.
+
+Pages are ordered newest first on ``(timestamp, id)`` and a cursor is the
+position of the last row served, so fetching the next page is an index
+range scan however deep the history goes, and rows inserted meanwhile
+don't shift the pages. Cursors are opaque URL-safe strings.
+
+Conversation lists carry only the latest ``LATEST_MESSAGES`` of each
+conversation, fetched with one windowed prefetch; older messages are paged
+through ``message_page``.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Prefetch, Q
+
+from .models import Message
+
+LATEST_MESSAGES = 20
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(timestamp, pk):
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{pk}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """``(timestamp, pk)`` from a cursor; raises ``ValueError`` if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def page_size(value, default=PAGE_SIZE):
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def keyset_page(queryset, time_field, cursor=None, limit=PAGE_SIZE):
+    """Return ``(rows, next_cursor)``: up to ``limit`` rows older than ``cursor``, newest first."""
+    queryset = queryset.order_by(f"-{time_field}", "-pk")
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{f"{time_field}__lt": timestamp}) | Q(**{time_field: timestamp, "pk__lt": pk}))
+
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], time_field), rows[-1].pk)
+    return rows, next_cursor
+
+
+def with_latest_messages(conversations, limit=LATEST_MESSAGES):
+    """Prefetch each conversation's latest messages (newest first) into ``latest_messages``."""
+    latest = Message.objects.order_by("-created_at", "-id").only(
+        "id", "conversation_id", "role", "text", "created_at"
+    )[:limit]
+    return conversations.prefetch_related(Prefetch("messages", queryset=latest, to_attr="latest_messages"))
+
+
+def message_page(conversation, cursor=None, limit=PAGE_SIZE):
+    """Messages of ``conversation`` older than ``cursor``; returned oldest first, with the next cursor."""
+    rows, next_cursor = keyset_page(
+        conversation.messages.only("id", "role", "text", "created_at"), "created_at", cursor, limit
+    )
+    return rows[::-1], next_cursor
@@ -0,0 +1,158 @@
+"""
+Local intent classifier for the chatbot.
+
+Trained at first use from the utterances bundled in ``data/intents.json``
+(templates with a ``{title}`` slot are filled with the sample titles), then
+kept for the life of the worker. Messages become TF-IDF vectors over words,
+word pairs and character 3/4-grams, so typos and inflections still match.
+A batch of messages is scored against every training utterance with one
+sparse matrix product; each intent scores as its closest utterance, and a
+best score under ``MIN_CONFIDENCE`` is "unknown". Nothing leaves the process.
+
+Slots come from the same templates: the matching ``search_book`` template
+is turned into a regex and its ``{title}`` group is the title. A message
+no template matches ("harry potter") is taken as the slot value whole.
+"""
+import json
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+UNKNOWN = "unknown"
+MIN_CONFIDENCE = 0.35
+WORD_RE = re.compile(r"[a-z0-9']+")
+SLOT_RE = re.compile(r"\{(\w+)\}")
+TRIM = " \t?!.,:;\"'"
+
+
+def _features(text):
+    words = WORD_RE.findall(text.lower())
+    features = [f"w:{w}" for w in words]
+    features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        for n in (3, 4):
+            features += [padded[i:i + n] for i in range(len(padded) - n + 1)]
+    return features
+
+
+def _slot_pattern(template):
+    """``"is {title} available"`` -> regex with a lazy ``title`` group, anchored at the end."""
+    parts = []
+    for i, piece in enumerate(SLOT_RE.split(template)):
+        if i % 2:
+            parts.append(f"(?P<{piece}>.+?)")
+        elif piece.strip():
+            parts.append(r"\s+".join(re.escape(w) for w in piece.split()))
+    return re.compile(r"(?:^|\b)" + r"\s*".join(parts) + r"[\s?!.]*$", re.IGNORECASE)
+
+
+class IntentModel:
+    def __init__(self, intents, slot_values):
+        import numpy as np
+
+        labels, texts, self.slot_patterns, self.slot_names = [], [], {}, {}
+        for intent, templates in intents.items():
+            for template in templates:
+                slots = SLOT_RE.findall(template)
+                if slots:
+                    self.slot_names[intent] = slots[0]
+                    self.slot_patterns.setdefault(intent, []).append(_slot_pattern(template))
+                    fills = [template.replace(f"{{{slots[0]}}}", value) for value in slot_values[slots[0]]]
+                else:
+                    fills = [template]
+                texts += fills
+                labels += [intent] * len(fills)
+        for patterns in self.slot_patterns.values():
+            # Longest literal first, so "is the book {title} available" wins over "is {title} available"
+            patterns.sort(key=lambda p: -len(SLOT_RE.sub("", p.pattern)))
+
+        # Training rows grouped by intent, so a max over each column range scores an intent
+        order = sorted(range(len(texts)), key=lambda i: labels[i])
+        texts = [texts[i] for i in order]
+        labels = [labels[i] for i in order]
+        self.intents = sorted(set(labels))
+        self.starts = np.array([labels.index(intent) for intent in self.intents])
+
+        features = [_features(t) for t in texts]
+        self.vocab = {}
+        for fs in features:
+            for f in fs:
+                self.vocab.setdefault(f, len(self.vocab))
+        df = Counter(f for fs in features for f in set(fs))
+        self.idf = np.array(
+            [math.log((1 + len(texts)) / (1 + df[f])) + 1 for f in self.vocab], dtype=np.float32
+        )
+        self.utterances_t = self.transform(texts).T.tocsr()
+
+    def transform(self, texts):
+        """L2-normalised TF-IDF rows (CSR) for ``texts``; unseen features are dropped."""
+        import numpy as np
+        from scipy import sparse
+
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            counts = Counter(self.vocab[f] for f in _features(text) if f in self.vocab)
+            weights = [(1 + math.log(n)) * self.idf[column] for column, n in counts.items()]
+            norm = math.sqrt(sum(w * w for w in weights)) or 1.0
+            indices += counts.keys()
+            data += [w / norm for w in weights]
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr)),
+            shape=(len(texts), len(self.vocab)),
+        )
+
+    def classify(self, texts):
+        """Return ``[(intent, score)]`` for a batch of messages, with one matrix product."""
+        import numpy as np
+
+        if not texts:
+            return []
+        similarity = (self.transform(texts) @ self.utterances_t).toarray()
+        per_intent = np.maximum.reduceat(similarity, self.starts, axis=1)
+        best = per_intent.argmax(axis=1)
+        scores = per_intent[np.arange(len(texts)), best]
+        return [
+            (self.intents[b] if s >= MIN_CONFIDENCE else UNKNOWN, float(s))
+            for b, s in zip(best, scores)
+        ]
+
+    def slots(self, intent, text):
+        for pattern in self.slot_patterns.get(intent, ()):
+            match = pattern.search(text.strip())
+            if match:
+                return {name: value.strip(TRIM) for name, value in match.groupdict().items()}
+        if intent in self.slot_names:
+            return {self.slot_names[intent]: text.strip(TRIM)}
+        return {}
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """The worker's classifier, trained on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                with open(DATA_DIR / "intents.json", encoding="utf-8") as f:
+                    data = json.load(f)
+                _model = IntentModel(data["intents"], data["slot_values"])
+    return _model
+
+
+def detect_intents(texts):
+    """Classify a batch of messages; return ``[(intent, params)]``."""
+    model = get_model()
+    return [(intent, model.slots(intent, text)) for text, (intent, score) in zip(texts, model.classify(texts))]
+
+
+def detect_intent(text: str):
+    """Return an intent tag and its slots (``{"title": ...}`` for searches)."""
+    return detect_intents([text])[0]
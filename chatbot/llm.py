@@ -0,0 +1,237 @@
+"""
+Optional generative replies for the chatbot.
+
+Off unless ``CHATBOT_LLM_PROVIDER`` names a provider: ``"openai"`` (chat
+completions through the ``openai`` client) or ``"local"``, a deterministic
+stand-in that answers from the facts it is given and needs no network, for
+tests and development. A dotted path to any class with ``complete`` and
+``acomplete`` works too.
+
+The model never sees the database. ``ai_utils`` retrieves the facts first
+(the student's open loans and fines, the search results for a book query,
+the canned answer for the detected intent) and the model only rephrases
+them into a reply. Completions are cached in an in-process LRU keyed by the
+normalised question together with those facts, so a repeated FAQ-style
+question is answered without a call while one student's loans never answer
+another's.
+
+At most ``CHATBOT_LLM_MAX_CONCURRENCY`` completions run at once per worker.
+A call that can't get a slot, or doesn't finish, within
+``CHATBOT_LLM_TIMEOUT`` seconds (or that fails) falls back to the
+rule-based reply, so chat keeps working when the provider doesn't.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .context import normalize_query
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = {
+    "openai": "chatbot.llm.OpenAIProvider",
+    "local": "chatbot.llm.LocalProvider",
+}
+SYSTEM_PROMPT = (
+    "You are the assistant of a college library. Answer the user's message using only the facts below. "
+    "If they don't cover it, say so briefly and suggest asking about issued books, fines, or a book title. "
+    "Keep replies under 80 words; amounts are in rupees (₹).\n\nFacts:\n{facts}"
+)
+
+
+def _setting(name, default):
+    return getattr(settings, f"CHATBOT_LLM_{name}", default)
+
+
+# ---------------------
+# Providers
+# ---------------------
+class OpenAIProvider:
+    def __init__(self, model=None):
+        from openai import AsyncOpenAI, OpenAI
+
+        self.model = model or _setting("MODEL", "gpt-4o-mini")
+        # Timeouts are enforced per call; a retry would only spend the caller's budget twice
+        self.client = OpenAI(max_retries=0)
+        self.aclient = AsyncOpenAI(max_retries=0)
+
+    def _params(self, messages):
+        return {"model": self.model, "messages": messages, "max_tokens": 300, "temperature": 0.2}
+
+    def complete(self, messages, timeout):
+        response = self.client.chat.completions.create(**self._params(messages), timeout=timeout)
+        return response.choices[0].message.content.strip()
+
+    async def acomplete(self, messages, timeout):
+        response = await self.aclient.chat.completions.create(**self._params(messages), timeout=timeout)
+        return response.choices[0].message.content.strip()
+
+
+class LocalProvider:
+    """Answers with the facts it was given, after ``delay`` seconds of pretend inference."""
+
+    def __init__(self, delay=None):
+        self.delay = _setting("LOCAL_DELAY", 0) if delay is None else delay
+        self.calls = 0
+
+    def _reply(self, messages):
+        self.calls += 1
+        facts = messages[0]["content"].split("Facts:\n", 1)[-1].strip()
+        return facts or "I don't have anything on that yet."
+
+    def complete(self, messages, timeout):
+        if self.delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Local model timed out.")
+        time.sleep(self.delay)
+        return self._reply(messages)
+
+    async def acomplete(self, messages, timeout):
+        await asyncio.sleep(self.delay)
+        return self._reply(messages)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """The configured provider, created on first use; None when generative mode is off."""
+    global _provider
+    name = _setting("PROVIDER", None)
+    if not name:
+        return None
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = import_string(PROVIDERS.get(name, name))()
+    return _provider
+
+
+def enabled():
+    return bool(_setting("PROVIDER", None))
+
+
+# ---------------------
+# Completion cache
+# ---------------------
+class LRUCache:
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+
+completions = LRUCache(_setting("CACHE_SIZE", 1024))
+
+
+def _cache_key(text, facts):
+    digest = hashlib.sha1(normalize_query(text).encode())
+    for fact in facts:
+        digest.update(b"\0" + fact.encode())
+    return digest.hexdigest()
+
+
+def _messages(text, facts):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT.format(facts="\n\n".join(facts))},
+        {"role": "user", "content": text},
+    ]
+
+
+# ---------------------
+# Bounded, timed calls
+# ---------------------
+_slots = None
+_async_slots = weakref.WeakKeyDictionary()
+
+
+def _sync_slots():
+    global _slots
+    if _slots is None:
+        with _provider_lock:
+            if _slots is None:
+                _slots = threading.BoundedSemaphore(_setting("MAX_CONCURRENCY", 4))
+    return _slots
+
+
+def _loop_slots():
+    # asyncio semaphores belong to one event loop
+    loop = asyncio.get_running_loop()
+    if loop not in _async_slots:
+        _async_slots[loop] = asyncio.Semaphore(_setting("MAX_CONCURRENCY", 4))
+    return _async_slots[loop]
+
+
+def _keep(key, reply, fallback):
+    """Cache and return a non-empty model reply; an empty one gets ``fallback`` and isn't cached."""
+    reply = (reply or "").strip()
+    if not reply:
+        logger.warning("Chatbot LLM returned an empty reply; answered with the rule-based reply.")
+        return fallback
+    completions.set(key, reply)
+    return reply
+
+
+def generate(text, facts, fallback):
+    """A model reply to ``text`` grounded in ``facts``; ``fallback`` if none arrives in time."""
+    key = _cache_key(text, facts)
+    reply = completions.get(key)
+    if reply is not None:
+        return reply
+
+    timeout = _setting("TIMEOUT", 8)
+    deadline = time.monotonic() + timeout
+    slots = _sync_slots()
+    if not slots.acquire(timeout=timeout):
+        logger.warning("Chatbot LLM busy; answered with the rule-based reply.")
+        return fallback
+    try:
+        reply = get_provider().complete(_messages(text, facts), max(0.1, deadline - time.monotonic()))
+    except Exception as e:
+        logger.error(f"Chatbot LLM error: {e}")
+        return fallback
+    finally:
+        slots.release()
+
+    return _keep(key, reply, fallback)
+
+
+async def agenerate(text, facts, fallback):
+    key = _cache_key(text, facts)
+    reply = completions.get(key)
+    if reply is not None:
+        return reply
+
+    async def call():
+        async with _loop_slots():
+            return await get_provider().acomplete(_messages(text, facts), _setting("TIMEOUT", 8))
+
+    try:
+        reply = await asyncio.wait_for(call(), _setting("TIMEOUT", 8))
+    except Exception as e:
+        logger.error(f"Chatbot LLM error: {e!r}")
+        return fallback
+
+    return _keep(key, reply, fallback)
@@ -0,0 +1,58 @@
+import json
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from chatbot import intents
+from core.bench import format_stats, measure
+
+TARGET_ACCURACY = 0.9
+
+
+class Command(BaseCommand):
+    help = "Measure the chatbot intent classifier's accuracy on the bundled eval set, and its latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200, help="Timed single-message classifications")
+        parser.add_argument("--batch", type=int, default=256, help="Messages per timed batch")
+        parser.add_argument("--show-errors", action="store_true")
+
+    def handle(self, *args, **options):
+        with open(intents.DATA_DIR / "intents_eval.json", encoding="utf-8") as f:
+            examples = json.load(f)
+        texts = [text for text, label in examples]
+
+        started = time.perf_counter()
+        intents.get_model()
+        self.stdout.write(f"Trained in {(time.perf_counter() - started) * 1000:.1f} ms.")
+
+        predicted = intents.detect_intents(texts)
+        correct, confusions = 0, Counter()
+        for (text, label), (intent, params) in zip(examples, predicted):
+            if intent == label:
+                correct += 1
+            else:
+                confusions[(label, intent)] += 1
+                if options["show_errors"]:
+                    self.stdout.write(f"  {text!r}: expected {label}, got {intent}")
+        for (label, intent), n in confusions.most_common():
+            self.stdout.write(f"  {label} -> {intent}: {n}")
+
+        state = {"n": 0}
+
+        def one():
+            intents.detect_intent(texts[state["n"] % len(texts)])
+            state["n"] += 1
+
+        batch = (texts * (options["batch"] // len(texts) + 1))[:options["batch"]]
+        self.stdout.write(format_stats("single message", measure(one, options["repeat"])))
+        batch_stats = measure(lambda: intents.detect_intents(batch), max(options["repeat"] // 10, 5))
+        self.stdout.write(format_stats(f"batch of {len(batch)}", batch_stats))
+
+        accuracy = correct / len(examples)
+        style = self.style.SUCCESS if accuracy >= TARGET_ACCURACY else self.style.WARNING
+        self.stdout.write(style(
+            f"Accuracy {accuracy:.1%} ({correct}/{len(examples)}) against a {TARGET_ACCURACY:.0%} target; "
+            f"{batch_stats['median'] * 1000 / len(batch):.1f} µs per message batched."
+        ))
@@ -0,0 +1,39 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from chatbot import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete idle anonymous and closed conversations past their TTL, then compact signed-in "
+        "users' idle conversations into one summary message. Meant to run daily; --limit caps "
+        "each step so a run has a bounded cost, and the next run carries on."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--anonymous-days", type=int, default=retention.ANONYMOUS_TTL.days)
+        parser.add_argument("--inactive-days", type=int, default=retention.INACTIVE_TTL.days)
+        parser.add_argument("--compact-days", type=int, default=retention.COMPACT_AFTER.days)
+        parser.add_argument("--batch-size", type=int, default=retention.BATCH_SIZE)
+        parser.add_argument("--limit", type=int, default=None, help="Most conversations each step touches")
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between batches")
+        parser.add_argument("--skip-compaction", action="store_true")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        batching = {"batch_size": options["batch_size"], "limit": options["limit"], "pause": options["pause"]}
+        deleted = retention.delete_expired(
+            anonymous_ttl=timedelta(days=options["anonymous_days"]),
+            inactive_ttl=timedelta(days=options["inactive_days"]),
+            **batching,
+        )
+        compacted = 0
+        if not options["skip_compaction"]:
+            compacted = retention.compact_idle(compact_after=timedelta(days=options["compact_days"]), **batching)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} and compacted {compacted} conversation(s) in {elapsed:.1f}s."
+        ))
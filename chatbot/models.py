@@ -10,6 +10,10 @@ class Conversation(models.Model):
     title = models.CharField(max_length=255, blank=True)
     active = models.BooleanField(default=True)
 
+    class Meta:
+        # Keyset pages (chatbot.history) walk these newest first
+        indexes = [models.Index(fields=["user", "started_at", "id"])]
+
     def __str__(self):
         return f"Conversation #{self.pk} - {self.user or 'anon'}"
 
@@ -27,5 +31,8 @@ class Message(models.Model):
     book = models.ForeignKey("books.Book", on_delete=models.SET_NULL, null=True, blank=True)
     issued_book = models.ForeignKey("books.IssuedBook", on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["conversation", "created_at", "id"])]
+
     def __str__(self):
         return f"{self.role}: {self.text[:80]}"
@@ -0,0 +1,135 @@
+"""
+Retention for chat history.
+
+Run daily by ``cleanup_chats``. Conversations are "idle" once they have no
+message newer than a cutoff (an idle conversation also started before it,
+which keeps the candidate scan on an index). In order:
+
+* idle anonymous conversations are deleted after ``ANONYMOUS_TTL``;
+* closed (``active=False``) conversations are deleted after ``INACTIVE_TTL``;
+* signed-in users' conversations idle for ``COMPACT_AFTER`` have their
+  messages replaced by one ``system`` message summarising them (span, what
+  was asked, titles searched), with one classifier call per batch.
+
+Every step works in batches of ids walked by primary key, each in its own
+short transaction, and stops after ``limit`` conversations so a run has a
+bounded cost. Messages that arrive while a conversation is being compacted
+are newer than the cutoff and are left alone.
+"""
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, Count, Max, Q, When
+from django.utils import timezone
+
+from .intents import UNKNOWN, detect_intents
+from .models import Conversation, Message
+
+ANONYMOUS_TTL = timedelta(days=7)
+INACTIVE_TTL = timedelta(days=30)
+COMPACT_AFTER = timedelta(days=30)
+BATCH_SIZE = 200
+MAX_TITLES = 10
+INTENT_LABELS = {
+    "check_issued_books": "issued books",
+    "check_fines": "fines",
+    "search_book": "book search",
+    "greeting": "greetings",
+    "help": "help",
+    "developer": "the developer",
+}
+
+
+def _idle(conversations, cutoff):
+    return (
+        conversations.filter(started_at__lt=cutoff)
+        .annotate(last_message_at=Max("messages__created_at"))
+        .filter(Q(last_message_at__lt=cutoff) | Q(last_message_at__isnull=True))
+    )
+
+
+def _batches(queryset, batch_size, limit, pause):
+    """Yield lists of ids in primary key order until the queryset or ``limit`` runs out."""
+    last, done = 0, 0
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        ids = list(queryset.filter(pk__gt=last).order_by("pk").values_list("pk", flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        last, done = ids[-1], done + len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+def delete_expired(anonymous_ttl=ANONYMOUS_TTL, inactive_ttl=INACTIVE_TTL,
+                   batch_size=BATCH_SIZE, limit=None, pause=0, now=None):
+    """Delete idle anonymous and closed conversations past their TTL; return how many."""
+    now = now or timezone.now()
+    expired = [
+        _idle(Conversation.objects.filter(user__isnull=True), now - anonymous_ttl),
+        _idle(Conversation.objects.filter(active=False), now - inactive_ttl),
+    ]
+    deleted = 0
+    for queryset in expired:
+        for ids in _batches(queryset, batch_size, None if limit is None else limit - deleted, pause):
+            with transaction.atomic():
+                Message.objects.filter(conversation_id__in=ids).delete()
+                Conversation.objects.filter(pk__in=ids).delete()
+            deleted += len(ids)
+    return deleted
+
+
+def summarize(messages, intents):
+    """The text of a compacted conversation. ``messages`` are (role, text, created_at), oldest first."""
+    first, last = messages[0][2], messages[-1][2]
+    text = f"Summary of {len(messages)} earlier messages ({first:%d %b %Y} – {last:%d %b %Y})."
+    asked = Counter(intent for intent, params in intents if intent != UNKNOWN)
+    if asked:
+        text += " Asked about: " + ", ".join(
+            f"{INTENT_LABELS.get(intent, intent)} ×{n}" for intent, n in asked.most_common()
+        ) + "."
+    titles = list(dict.fromkeys(
+        params["title"] for intent, params in intents if intent == "search_book" and params.get("title")
+    ))
+    if titles:
+        text += " Searched for: " + ", ".join(f"'{t}'" for t in titles[:MAX_TITLES]) + "."
+    return text
+
+
+def compact_idle(compact_after=COMPACT_AFTER, batch_size=BATCH_SIZE, limit=None, pause=0, now=None):
+    """Collapse idle signed-in conversations into one summary message each; return how many."""
+    cutoff = (now or timezone.now()) - compact_after
+    candidates = (
+        _idle(Conversation.objects.filter(user__isnull=False), cutoff)
+        .annotate(n=Count("messages")).filter(n__gt=1)
+    )
+    compacted = 0
+    for ids in _batches(candidates, batch_size, limit, pause):
+        old = Message.objects.filter(conversation_id__in=ids, created_at__lt=cutoff)
+        history = defaultdict(list)
+        for conversation_id, role, text, created_at in (
+            old.order_by("conversation_id", "created_at", "id").values_list("conversation_id", "role", "text", "created_at")
+        ):
+            history[conversation_id].append((role, text, created_at))
+
+        # Classify every user message of the batch at once, then hand the results back out
+        asked = [(cid, text) for cid, messages in history.items() for role, text, at in messages if role == "user"]
+        intents = defaultdict(list)
+        for (cid, text), detected in zip(asked, detect_intents([text for cid, text in asked])):
+            intents[cid].append(detected)
+
+        summaries = {cid: summarize(messages, intents[cid]) for cid, messages in history.items()}
+        with transaction.atomic():
+            old.delete()
+            Message.objects.bulk_create([
+                Message(conversation_id=cid, role="system", text=text) for cid, text in summaries.items()
+            ])
+            # created_at is auto_now_add; date each summary at the last message it replaces
+            Message.objects.filter(conversation_id__in=list(summaries), role="system", created_at__gte=cutoff).update(
+                created_at=Case(*[When(conversation_id=cid, then=history[cid][-1][2]) for cid in summaries])
+            )
+        compacted += len(summaries)
+    return compacted
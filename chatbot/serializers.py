@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .history import LATEST_MESSAGES, encode_cursor
 from .models import Conversation, Message
 
 class MessageSerializer(serializers.ModelSerializer):
@@ -7,7 +8,26 @@ class MessageSerializer(serializers.ModelSerializer):
         fields = ["id", "role", "text", "created_at"]
 
 class ConversationSerializer(serializers.ModelSerializer):
-    messages = MessageSerializer(many=True, read_only=True)
+    # Only the latest messages (oldest first); older ones are paged from
+    # the history endpoint starting at older_messages_cursor
+    messages = serializers.SerializerMethodField()
+    older_messages_cursor = serializers.SerializerMethodField()
+
     class Meta:
         model = Conversation
-        fields = ["id", "user", "title", "started_at", "active", "messages"]
+        fields = ["id", "user", "title", "started_at", "active", "messages", "older_messages_cursor"]
+
+    def _latest(self, conv):
+        latest = getattr(conv, "latest_messages", None)
+        if latest is None:
+            conv.latest_messages = latest = list(conv.messages.order_by("-created_at", "-id")[:LATEST_MESSAGES])
+        return latest
+
+    def get_messages(self, conv):
+        return MessageSerializer(self._latest(conv)[::-1], many=True).data
+
+    def get_older_messages_cursor(self, conv):
+        latest = self._latest(conv)
+        if len(latest) < LATEST_MESSAGES:
+            return None
+        return encode_cursor(latest[-1].created_at, latest[-1].pk)
@@ -1,3 +1,116 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from . import llm
+from .models import Conversation, Message
+
+FACTS = ["Open loans: Operating Systems, due 3 Nov."]
+
+
+@override_settings(CHATBOT_LLM_PROVIDER="local", CHATBOT_LLM_TIMEOUT=0.05)
+class GenerativeReplyTests(TestCase):
+    def use(self, provider):
+        self.enterContext(mock.patch.object(llm, "_provider", provider))
+        self.enterContext(mock.patch.object(llm, "completions", llm.LRUCache(8)))
+        return provider
+
+    def test_reply_is_grounded_and_cached(self):
+        provider = self.use(llm.LocalProvider(delay=0))
+        self.assertEqual(llm.generate("What do I have?", FACTS, "fallback"), FACTS[0])
+        self.assertEqual(llm.generate("what do i have", FACTS, "fallback"), FACTS[0])
+        self.assertEqual(provider.calls, 1)
+        # Someone else's facts are a different question
+        llm.generate("What do I have?", ["Open loans: none."], "fallback")
+        self.assertEqual(provider.calls, 2)
+
+    def test_slow_model_falls_back(self):
+        self.use(llm.LocalProvider(delay=1))
+        with self.assertLogs("chatbot.llm", "ERROR"):
+            self.assertEqual(llm.generate("What do I have?", FACTS, "fallback"), "fallback")
+            self.assertEqual(asyncio.run(llm.agenerate("What do I have?", FACTS, "fallback")), "fallback")
+
+    def test_failing_model_falls_back(self):
+        provider = self.use(llm.LocalProvider(delay=0))
+        with mock.patch.object(provider, "complete", side_effect=RuntimeError("quota")), self.assertLogs("chatbot.llm"):
+            self.assertEqual(llm.generate("What do I have?", FACTS, "fallback"), "fallback")
+        # A fallback is not cached as the model's answer
+        self.assertEqual(llm.generate("What do I have?", FACTS, "fallback"), FACTS[0])
+
+    def test_empty_reply_falls_back_uncached(self):
+        provider = self.use(llm.LocalProvider(delay=0))
+        with mock.patch.object(provider, "complete", return_value="  \n"), self.assertLogs("chatbot.llm", "WARNING"):
+            self.assertEqual(llm.generate("What do I have?", FACTS, "fallback"), "fallback")
+        with mock.patch.object(provider, "acomplete", return_value=""), self.assertLogs("chatbot.llm", "WARNING"):
+            self.assertEqual(asyncio.run(llm.agenerate("What do I have?", FACTS, "fallback")), "fallback")
+        self.assertEqual(llm.generate("What do I have?", FACTS, "fallback"), FACTS[0])
+
+
+class ConversationOwnerTests(TestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username="alice", password="x", role="student")
+
+    def test_anonymous_start_ignores_user_id(self):
+        with mock.patch("chatbot.views.preload_context") as preload:
+            response = self.client.post(reverse("chat_start"), {"user_id": self.alice.pk}, content_type="application/json")
+        self.assertIsNone(Conversation.objects.get(pk=response.json()["conversation_id"]).user)
+        preload.assert_not_called()
+
+    def test_someone_elses_conversation_is_not_found(self):
+        conv = Conversation.objects.create(user=self.alice, title="Theirs")
+        response = self.client.post(
+            reverse("chat_message"), {"conversation_id": conv.pk, "text": "my fines"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(conv.messages.exists())
+
+
+class ChatStreamTests(TestCase):
+    async def events(self, **body):
+        response = await self.async_client.post(
+            reverse("chat_message_stream"), json.dumps(body), content_type="application/json"
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        raw = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        return [
+            (event.split("\n")[0].removeprefix("event: "), json.loads(event.split("data: ", 1)[1]))
+            for event in raw.strip().split("\n\n")
+        ]
+
+    async def test_reply_streams_and_is_saved(self):
+        events = await self.events(text="hello")
+        kinds = [kind for kind, _ in events]
+        self.assertEqual((kinds[0], kinds[-1]), ("start", "done"))
+        self.assertTrue(set(kinds[1:-1]) <= {"delta"})
+
+        done = events[-1][1]
+        self.assertEqual("".join(data["text"] for kind, data in events if kind == "delta"), done["reply"])
+        saved = await Message.objects.aget(pk=done["message_id"])
+        self.assertEqual((saved.role, saved.text), ("bot", done["reply"]))
+        self.assertEqual(await Message.objects.filter(conversation_id=events[0][1]["conversation_id"]).acount(), 2)
+
+    async def test_intent_detection_runs_off_the_event_loop(self):
+        threads = []
+
+        def detect_intent(text):
+            threads.append(threading.current_thread())
+            return "greeting", {}
+
+        with mock.patch("chatbot.ai_utils.detect_intent", detect_intent):
+            await self.events(text="hello")
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    async def test_someone_elses_conversation_is_not_found(self):
+        owner = await CustomUser.objects.acreate_user(username="alice", password="x", role="student")
+        conv = await Conversation.objects.acreate(user=owner, title="Theirs")
+        response = await self.async_client.post(
+            reverse("chat_message_stream"), json.dumps({"conversation_id": conv.pk, "text": "hi"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 404)
@@ -4,5 +4,8 @@ from . import views
 urlpatterns = [
     path("start/", views.start_conversation, name="chat_start"),
     path("message/", views.chat_message, name="chat_message"),
-
+    path("async/start/", views.start_conversation_async, name="chat_start_async"),
+    path("async/message/", views.chat_message_stream, name="chat_message_stream"),
+    path("conversations/", views.conversation_list, name="chat_conversations"),
+    path("conversations/<int:pk>/messages/", views.conversation_messages, name="chat_conversation_messages"),
 ]
@@ -1,36 +1,39 @@
+import json
+
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from django.contrib.auth import get_user_model
-
-from .models import Conversation, Message
-from .serializers import ConversationSerializer
-from .ai_utils import handle_user_message
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
 
-User = get_user_model()
+from core.bulk import abulk_create_with_pks, bulk_create_with_pks
+from core.ratelimit import rate_limit
 
+from .models import Conversation, Message
+from .serializers import ConversationSerializer, MessageSerializer
+from .history import keyset_page, message_page, page_size, with_latest_messages
+from .ai_utils import ahandle_user_message, handle_user_message
+from .context import apreload_context, preload_context
 
+@rate_limit("chat_start", key="user")
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def start_conversation(request):
     """
-    Start a new conversation.
-    Body: { "user_id": <optional>, "title": <optional> }
+    Start a new conversation for the logged-in user (or anonymously).
+    Body: { "title": <optional> }
     """
-    user = None
-    user_id = request.data.get("user_id")
-
-    if request.user.is_authenticated:
-        user = request.user
-    elif user_id:
-        user = User.objects.filter(pk=user_id).first()
+    # The owner is whoever is logged in, never an id from the body: a conversation's replies quote its owner's loans
+    user = request.user if request.user.is_authenticated else None
 
     conv = Conversation.objects.create(
         user=user,
         title=request.data.get("title", "Chat Session")
     )
+    if user and user.is_student():
+        preload_context(user)  # loans and fines for the replies that follow
 
     return Response(
         {"conversation_id": conv.id, "message": "✅ Conversation started"},
@@ -38,6 +41,7 @@ def start_conversation(request):
     )
 
 
+@rate_limit("chat", key="user")
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def chat_message(request):
@@ -49,23 +53,20 @@ def chat_message(request):
     if not text:
         return Response({"error": "Empty message"}, status=status.HTTP_400_BAD_REQUEST)
 
+    owner = request.user if request.user.is_authenticated else None
     conv_id = request.data.get("conversation_id")
     if conv_id:
-        conv = get_object_or_404(Conversation, pk=conv_id)
+        conv = get_object_or_404(Conversation.objects.select_related("user"), pk=conv_id, user=owner)
     else:
-        conv = Conversation.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            title="Quick Chat"
-        )
-
-    # Save user message
-    Message.objects.create(conversation=conv, role="user", text=text)
+        conv = Conversation.objects.create(user=owner, title="Quick Chat")
 
-    # Generate reply using rule-based logic
     reply = handle_user_message(text, user=conv.user)
 
-    # Save bot message
-    bot_msg = Message.objects.create(conversation=conv, role="bot", text=reply)
+    # Save both messages in one insert where the backend returns the new ids
+    user_msg, bot_msg = bulk_create_with_pks(Message, [
+        Message(conversation=conv, role="user", text=text),
+        Message(conversation=conv, role="bot", text=reply),
+    ])
 
     return Response({
         "reply": reply,
@@ -74,3 +75,122 @@ def chat_message(request):
     }, status=status.HTTP_200_OK)
 
 
+# ---------- History (keyset-paged, see chatbot.history) ----------
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def conversation_list(request):
+    """
+    The user's conversations, newest first, each with its latest messages.
+    Query: ?cursor=<next_cursor>&limit=<n>
+    """
+    try:
+        conversations, next_cursor = keyset_page(
+            with_latest_messages(Conversation.objects.filter(user=request.user)),
+            "started_at", request.GET.get("cursor"), page_size(request.GET.get("limit")),
+        )
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        "results": ConversationSerializer(conversations, many=True).data,
+        "next_cursor": next_cursor,
+    })
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def conversation_messages(request, pk):
+    """
+    One page of a conversation's messages older than ``before``, oldest first.
+    Query: ?before=<cursor>&limit=<n>
+    """
+    conv = get_object_or_404(Conversation, pk=pk, user=request.user)
+    try:
+        messages, next_cursor = message_page(conv, request.GET.get("before"), page_size(request.GET.get("limit")))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        "results": MessageSerializer(messages, many=True).data,
+        "next_cursor": next_cursor,
+    })
+
+
+# ---------- Async endpoints (served through SCEP_LMS/asgi.py) ----------
+# Same conversations and replies, but through the async ORM and cache, and
+# the reply is streamed as Server-Sent Events, so one ASGI worker can hold
+# many open chats without a thread each.
+def _json_body(request):
+    try:
+        body = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@rate_limit("chat_start", key="user")
+@require_POST
+async def start_conversation_async(request):
+    """
+    Start a new conversation for the logged-in user (or anonymously).
+    Body: { "title": <optional> }
+    """
+    body = _json_body(request)
+    if body is None:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    user = await request.auser()
+    user = user if user.is_authenticated else None
+    conv = await Conversation.objects.acreate(user=user, title=body.get("title", "Chat Session"))
+    if user and user.is_student():
+        await apreload_context(user)
+
+    return JsonResponse({"conversation_id": conv.id, "message": "✅ Conversation started"}, status=201)
+
+
+@rate_limit("chat", key="user")
+@require_POST
+async def chat_message_stream(request):
+    """
+    Send a message; the reply comes back as an event stream:
+    ``start`` {conversation_id}, one ``delta`` {text} per line, then ``done`` {message_id, reply}.
+    Body: { "conversation_id": <id>, "text": "..." }
+    """
+    body = _json_body(request)
+    if body is None:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    text = str(body.get("text", "")).strip()
+    if not text:
+        return JsonResponse({"error": "Empty message"}, status=400)
+
+    user = await request.auser()
+    owner_id = user.pk if user.is_authenticated else None
+    conv_id = body.get("conversation_id")
+    if conv_id:
+        conv = await Conversation.objects.select_related("user").filter(pk=conv_id, user_id=owner_id).afirst()
+        if conv is None:
+            return JsonResponse({"error": "Conversation not found"}, status=404)
+    else:
+        conv = await Conversation.objects.acreate(user_id=owner_id, title="Quick Chat")
+
+    async def events():
+        yield _sse("start", {"conversation_id": conv.id})
+        reply = await ahandle_user_message(text, user=conv.user if conv.user_id else None)
+        for line in reply.splitlines(keepends=True):
+            yield _sse("delta", {"text": line})
+
+        user_msg, bot_msg = await abulk_create_with_pks(Message, [
+            Message(conversation=conv, role="user", text=text),
+            Message(conversation=conv, role="bot", text=reply),
+        ])
+        yield _sse("done", {"message_id": bot_msg.pk, "reply": reply})
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # let nginx pass events through as they come
+    return response
+
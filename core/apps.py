@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        configure_cloudinary()
+
+
+def configure_cloudinary():
+    # The models' CloudinaryField has imported the SDK by the time apps are ready, so this costs nothing extra
+    import cloudinary
+
+    credentials = settings.CLOUDINARY_STORAGE
+    cloudinary.config(
+        cloud_name=credentials.get('CLOUD_NAME'),
+        api_key=credentials.get('API_KEY'),
+        api_secret=credentials.get('API_SECRET'),
+    )
@@ -0,0 +1,39 @@
+"""
+Small helpers for the ``bench_*`` management commands.
+
+Benchmarks seed synthetic rows inside a transaction that is always rolled
+back, so they can be pointed at a staging database without leaving data
+behind. Never run them against production during opening hours.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction and discard everything it wrote."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(fn, repeat=20):
+    """Call ``fn`` ``repeat`` times and return timing stats in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "median": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "max": timings[-1],
+    }
+
+
+def format_stats(label, stats):
+    return f"{label:<40} median {stats['median']:8.2f} ms   p95 {stats['p95']:8.2f} ms   max {stats['max']:8.2f} ms"
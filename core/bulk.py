@@ -0,0 +1,48 @@
+"""
+``bulk_create`` that always hands back primary keys.
+
+PostgreSQL, SQLite and MariaDB return the ids of a multi-row ``INSERT``;
+MySQL does not, so ``bulk_create`` leaves ``pk`` unset there. Callers
+name a ``key``: fields that identify each new row among the rows matching
+``within`` (e.g. a loan's copy among open loans, a user's username). After
+the insert, one query maps key values back to ids and sets them on the
+instances the caller already holds, so loaded relations stay cached.
+Rows with no such key (chat messages) are saved one by one on MySQL, each
+``INSERT`` reporting its own id; a "latest row" lookup could pick up
+another request's row. That path calls ``save()``, so keep it to models
+without custom ``save()`` logic or ``post_save`` receivers.
+"""
+from asgiref.sync import sync_to_async
+from django.db import connections, router
+
+
+def bulk_create_with_pks(model, objs, key=None, within=None, batch_size=None):
+    """``model.objects.bulk_create(objs)``, with every instance's ``pk`` set afterwards."""
+    objs = list(objs)
+    features = connections[router.db_for_write(model)].features
+    if not objs or features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=batch_size)
+
+    if key is None:
+        for obj in objs:
+            obj.save(force_insert=True)
+        return objs
+
+    model.objects.bulk_create(objs, batch_size=batch_size)
+    attnames = [model._meta.get_field(name).attname for name in key]
+    values = lambda row: tuple(getattr(row, name) for name in attnames)
+    ids = {}
+    rows = model.objects.filter(**(within or {})).filter(
+        **{f"{attnames[0]}__in": {getattr(obj, attnames[0]) for obj in objs}}
+    )
+    for *row_key, pk in rows.values_list(*attnames, "pk").iterator():
+        row_key = tuple(row_key)
+        if row_key in ids:
+            raise model.MultipleObjectsReturned(f"{key}={row_key} matches more than one new {model.__name__}.")
+        ids[row_key] = pk
+    for obj in objs:
+        obj.pk = ids[values(obj)]
+    return objs
+
+
+abulk_create_with_pks = sync_to_async(bulk_create_with_pks)
@@ -0,0 +1,8 @@
+import uuid
+
+from django.utils.functional import SimpleLazyObject
+
+
+def idempotency(request):
+    """Fresh key for the hidden ``idempotency_key`` field of mutating forms."""
+    return {"idempotency_key": SimpleLazyObject(lambda: uuid.uuid4().hex)}
@@ -0,0 +1,74 @@
+"""
+Cached facet lists (distinct values with counts) for filter dropdowns.
+
+User facets (academic session, branch, role) and book facets (category of
+browsable books) live under separate cache keys, so a book change does not
+throw away the user aggregates and vice versa. Both are read back with a
+single ``get_many`` and recomputed lazily after invalidation. Receivers in
+``core.signals`` invalidate on saves and deletes; bulk writers that bypass
+signals call ``invalidate_user_facets``/``invalidate_book_facets`` directly.
+
+The TTL bounds staleness when the cache is per-process (the default
+LocMemCache) and another worker made the change.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+
+from accounts.models import CustomUser
+from books.models import Book
+
+USER_FACETS_KEY = "facets:users:v1"
+BOOK_FACETS_KEY = "facets:books:v1"
+FACETS_TTL = 10 * 60
+
+USER_FACET_FIELDS = ("academic_session", "branch", "role")
+BOOK_FACET_FIELDS = ("category", "available")
+
+
+def _value_counts(queryset, field):
+    rows = (
+        queryset.exclude(**{f"{field}__isnull": True})
+        .exclude(**{field: ""})
+        .values_list(field)
+        .annotate(n=Count("pk"))
+        .order_by(field)
+    )
+    return [(value, n) for value, n in rows]
+
+
+def _compute_user_facets():
+    users = CustomUser.objects.filter(is_deleted=False)
+    return {field: _value_counts(users, field) for field in USER_FACET_FIELDS}
+
+
+def _compute_book_facets():
+    counts = dict(_value_counts(Book.objects.filter(available=True), "category"))
+    # Keep the declared category order and show empty categories too
+    return {
+        "category": [(code, label, counts.get(code, 0)) for code, label in Book.CATEGORY_CHOICES],
+    }
+
+
+def get_facets():
+    """Return ``{facet: [(value, count), ...]}`` for users and books in one cache round trip."""
+    cached = cache.get_many([USER_FACETS_KEY, BOOK_FACETS_KEY])
+
+    user_facets = cached.get(USER_FACETS_KEY)
+    if user_facets is None:
+        user_facets = _compute_user_facets()
+        cache.set(USER_FACETS_KEY, user_facets, FACETS_TTL)
+
+    book_facets = cached.get(BOOK_FACETS_KEY)
+    if book_facets is None:
+        book_facets = _compute_book_facets()
+        cache.set(BOOK_FACETS_KEY, book_facets, FACETS_TTL)
+
+    return {**user_facets, **book_facets}
+
+
+def invalidate_user_facets():
+    cache.delete(USER_FACETS_KEY)
+
+
+def invalidate_book_facets():
+    cache.delete(BOOK_FACETS_KEY)
@@ -0,0 +1,143 @@
+"""
+Idempotent POSTs for flaky connections.
+
+Clients send a key with each mutating request: API clients in an
+``Idempotency-Key`` header, HTML forms in a hidden ``idempotency_key`` field
+(``core.context_processors.idempotency`` provides a fresh value on every
+render). The first request with a key runs the view and stores its response;
+a retry with the same key replays that response without running the view
+again, so a double-submitted issue form can't take a second copy off the
+shelf.
+
+Keys are hashed together with the user and path, so one client's key never
+matches another's. Reusing a key for a different payload is rejected.
+
+On DRF views ``idempotent`` goes below ``@api_view``/``@permission_classes``:
+it then sees the authenticated DRF user, and a request that fails
+authentication or permissions is turned away before it can claim a key.
+"""
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+FORM_FIELD = "idempotency_key"
+IN_FLIGHT_TIMEOUT = timedelta(minutes=2)
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_TTL_SECONDS", 60 * 60))
+
+
+def _client_key(request):
+    key = request.headers.get(HEADER)
+    if not key and request.content_type in ("application/x-www-form-urlencoded", "multipart/form-data"):
+        key = request.POST.get(FORM_FIELD)
+    return (key or "").strip()[:255]
+
+
+def _key_hash(request, user, client_key):
+    user_id = user.pk if user.is_authenticated else "anon"
+    return hashlib.sha256(f"{user_id}:{request.path}:{client_key}".encode()).hexdigest()
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256()
+    if request.content_type in ("application/x-www-form-urlencoded", "multipart/form-data"):
+        for name in sorted(request.POST):
+            if name in ("csrfmiddlewaretoken", FORM_FIELD):
+                continue
+            digest.update(f"{name}={request.POST.getlist(name)}\n".encode())
+        for name in sorted(request.FILES):
+            digest.update(f"{name}:{[(f.name, f.size) for f in request.FILES.getlist(name)]}\n".encode())
+    else:
+        digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _claim(key_hash, fingerprint):
+    """Insert an in-flight row for ``key_hash``; return (row, created)."""
+    now = timezone.now()
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    key_hash=key_hash,
+                    request_fingerprint=fingerprint,
+                    expires_at=now + IN_FLIGHT_TIMEOUT,
+                ), True
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(key_hash=key_hash).first()
+            if existing is None:
+                continue
+            if existing.expires_at <= now:
+                existing.delete()
+                continue
+            return existing, False
+    raise IntegrityError("Could not claim idempotency key.")
+
+
+def _rendered(request, response):
+    """``response`` with its content ready to store; DRF responses are finalised by their view first."""
+    if hasattr(request, "parser_context") and not hasattr(response, "accepted_renderer"):
+        response = request.parser_context["view"].finalize_response(request, response)
+    if hasattr(response, "render") and not getattr(response, "is_rendered", True):
+        response.render()
+    return response
+
+
+def _replay(record):
+    response = HttpResponse(bytes(record.body), status=record.status_code, content_type=record.content_type or None)
+    if record.location:
+        response["Location"] = record.location
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(view):
+    """Replay the stored response for a retried POST that carries the same idempotency key."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != "POST":
+            return view(request, *args, **kwargs)
+        # Under DRF: headers and body from the Django request, the user from DRF's authentication
+        http_request = getattr(request, "_request", request)
+        client_key = _client_key(http_request)
+        if not client_key:
+            return view(request, *args, **kwargs)
+
+        fingerprint = _fingerprint(http_request)
+        record, created = _claim(_key_hash(http_request, request.user, client_key), fingerprint)
+        if not created:
+            if record.request_fingerprint != fingerprint:
+                return JsonResponse({"error": "Idempotency key was already used for a different request."}, status=422)
+            if record.status_code is None:
+                return JsonResponse({"error": "This request is still being processed."}, status=409)
+            return _replay(record)
+
+        try:
+            response = _rendered(request, view(request, *args, **kwargs))
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500 or getattr(response, "streaming", False):
+            record.delete()
+            return response
+
+        record.status_code = response.status_code
+        record.content_type = response.get("Content-Type", "")
+        record.location = response.get("Location", "")[:500]
+        record.body = response.content
+        record.expires_at = timezone.now() + _ttl()
+        record.save(update_fields=["status_code", "content_type", "location", "body", "expires_at"])
+        return response
+
+    return wrapper
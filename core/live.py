@@ -0,0 +1,232 @@
+"""
+Live feed for the librarian dashboards, streamed as server-sent events.
+
+Each process runs one feed task (started by the first subscriber, stopped
+after the last leaves) that tails ``CirculationEvent`` through
+``books.ledger`` and new ``CustomUser`` rows, turns them into small JSON
+payloads with a few batched queries, and fans them out to every open
+stream's queue. However many librarians are watching, a change costs one
+read, not one dashboard render each.
+
+The feed is woken by ``notify``, which ``books.ledger.record`` and the
+user signals schedule on commit, so changes made in this process show up
+at once. Changes made by other workers are picked up by polling every
+``POLL_INTERVAL`` seconds. Rows younger than ``ledger.SETTLE`` may still
+be joined by lower ids committing late, so the feed keeps its position at
+the settled prefix and remembers the ids it already sent past it; nothing
+is sent twice or skipped.
+
+A client that falls ``QUEUE_SIZE`` events behind gets a ``resync`` event
+and reloads instead of receiving a partial history.
+
+Streams are only served through ASGI (``core.views.live_events`` answers
+204 under WSGI, and the page then goes without live updates). Each stream
+ends after ``MAX_STREAM_SECONDS``; the browser reconnects on its own, so
+a forgotten tab can't hold a connection open indefinitely.
+"""
+import asyncio
+import json
+import threading
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from books import ledger
+from books.models import Book, CirculationEvent, IssuedBook
+
+POLL_INTERVAL = 5
+HEARTBEAT = 15
+QUEUE_SIZE = 256
+BATCH_SIZE = 200
+MAX_STREAM_SECONDS = 30 * 60
+RECONNECT_MS = 3000
+
+
+class _Tail:
+    """Rows of ``model`` newer than the settled position, each returned once."""
+
+    def __init__(self, model, fetch, stamp):
+        self.model, self.fetch, self.stamp = model, fetch, stamp
+        self.position, self.sent = None, set()
+
+    def poll(self, now):
+        if self.position is None:
+            # Start at the present; the page that subscribed already shows the past
+            self.position = self.model.objects.aggregate(last=Max("pk"))["last"] or 0
+            return []
+        rows = self.fetch(self.position)
+        fresh = [row for row in rows if row.pk not in self.sent]
+        cutoff = now - ledger.SETTLE
+        for row in rows:
+            if self.stamp(row) > cutoff:
+                break
+            self.position = row.pk
+        self.sent = {row.pk for row in rows if row.pk > self.position}
+        return fresh
+
+
+def _circulation_rows(after_id):
+    return ledger.tail(after_id, limit=BATCH_SIZE, settle=timedelta(0))
+
+
+def _registration_rows(after_id):
+    return list(
+        CustomUser.objects.filter(pk__gt=after_id).order_by("pk")
+        .only("username", "first_name", "last_name", "role", "is_approved", "academic_session", "date_joined")
+        [:BATCH_SIZE]
+    )
+
+
+def circulation_payloads(events):
+    """One dict per ledger event, with the loan, book and student it refers to."""
+    loans = IssuedBook.objects.select_related("student", "book").only(
+        "issue_date", "due_date", "return_date", "student__username", "book__title"
+    ).in_bulk([e.loan_id for e in events if e.loan_id])
+    books = Book.objects.only("title").in_bulk({e.book_id for e in events})
+    students = CustomUser.objects.only("username").in_bulk({e.student_id for e in events if e.student_id})
+
+    payloads = []
+    for e in events:
+        book, student, loan = books.get(e.book_id), students.get(e.student_id), loans.get(e.loan_id)
+        payload = {
+            "id": e.pk,
+            "kind": e.kind,
+            "occurred_at": e.occurred_at,
+            "book": book.title if book else "",
+            "student": student.username if student else "",
+            "amount": e.amount,
+        }
+        if loan:
+            payload["loan"] = {
+                "id": loan.pk,
+                "issue_date": loan.issue_date,
+                "due_date": loan.due_date,
+                "return_date": loan.return_date,
+                "fine": loan.fine,
+                "return_url": reverse("books:return_book", args=[loan.pk]),
+            }
+        payloads.append(payload)
+    return payloads
+
+
+def registration_payloads(users):
+    return [
+        {
+            "id": user.pk,
+            "username": user.username,
+            "name": user.get_full_name() or user.username,
+            "role": user.role,
+            "approved": user.is_approved,
+            "academic_session": user.academic_session or "",
+        }
+        for user in users
+    ]
+
+
+def today_counts():
+    """Starting values for the dashboard's live counters: today's issues, returns and registrations."""
+    start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    counts = dict(
+        CirculationEvent.objects.filter(occurred_at__gte=start)
+        .values_list("kind").annotate(n=Count("pk")).order_by()
+    )
+    return {
+        "issue": counts.get(CirculationEvent.ISSUE, 0),
+        "return": counts.get(CirculationEvent.RETURN, 0),
+        "registration": CustomUser.objects.filter(date_joined__gte=start).count(),
+    }
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+class Feed:
+    def __init__(self):
+        self.subscribers = set()
+        self.loop = self.task = self.wake = None
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        """A queue of ready-to-send SSE chunks; call from the event loop serving the stream."""
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self.subscribers.add(queue)
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.task is None or self.task.done() or self.loop is not loop:
+                self.loop, self.wake = loop, asyncio.Event()
+                self.task = loop.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def notify(self):
+        """Poll now instead of at the next tick. Safe from any thread; a no-op with no subscribers."""
+        loop, wake = self.loop, self.wake
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wake.set)
+
+    def _poll(self, tails):
+        now = timezone.now()
+        circulation, registrations = tails
+        chunks = [sse("circulation", p) for p in circulation_payloads(circulation.poll(now))]
+        chunks += [sse("registration", p) for p in registration_payloads(registrations.poll(now))]
+        return chunks
+
+    def _fan_out(self, chunks):
+        for queue in list(self.subscribers):
+            for chunk in chunks:
+                try:
+                    queue.put_nowait(chunk)
+                except asyncio.QueueFull:
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(sse("resync", {}))
+                    break
+
+    async def _run(self):
+        tails = (
+            _Tail(CirculationEvent, _circulation_rows, lambda e: e.occurred_at),
+            _Tail(CustomUser, _registration_rows, lambda u: u.date_joined),
+        )
+        while self.subscribers:
+            self.wake.clear()
+            chunks = await sync_to_async(self._poll)(tails)
+            if chunks:
+                self._fan_out(chunks)
+            try:
+                await asyncio.wait_for(self.wake.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+feed = Feed()
+
+
+def notify():
+    feed.notify()
+
+
+async def stream(max_seconds=MAX_STREAM_SECONDS):
+    """
+    SSE chunks for one client: feed events as they come, a comment as
+    heartbeat when idle. Ends after ``max_seconds``; the client reconnects.
+    """
+    queue = feed.subscribe()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    try:
+        yield f"retry: {RECONNECT_MS}\n: connected\n\n"
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                yield await asyncio.wait_for(queue.get(), min(HEARTBEAT, remaining))
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+    finally:
+        feed.unsubscribe(queue)
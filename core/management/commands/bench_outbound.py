@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+import httpx
+import requests
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+
+from core import views
+
+QUOTE = json.dumps([{"q": "Bench quote.", "a": "Bench"}]).encode()
+
+
+class FakeUpstream:
+    """A local quote API that answers every request after ``delay`` seconds, on its own thread."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.calls = 0
+
+    async def _handle(self, reader, writer):
+        # HTTP/1.1 keep-alive: serve requests on the connection until the client closes it
+        while await self._read(reader):
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(QUOTE)}\r\n\r\n".encode() + QUOTE
+            )
+            await writer.drain()
+        writer.close()
+
+    @staticmethod
+    async def _read(reader):
+        try:
+            return await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return b""
+
+    def start(self):
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+            self.ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        self.ready.wait()
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/api/random"
+
+    def stop(self):
+        # The thread is a daemon; leave open connections to die with the process
+        self.loop.call_soon_threadsafe(self.server.close)
+
+
+class Command(BaseCommand):
+    help = (
+        "Show that a slow quote upstream no longer ties up workers: serve concurrent home page "
+        "requests through the ASGI app against a local fake upstream and compare with the blocking "
+        "requests call the home view used to make, which held a thread for every wait in flight."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="Concurrent home page requests")
+        parser.add_argument("--delay", type=float, default=0.5, help="Upstream latency in seconds")
+
+    def handle(self, *args, **options):
+        upstream = FakeUpstream(options["delay"])
+        url = upstream.start()
+        try:
+            with override_settings(ALLOWED_HOSTS=["testserver"], QUOTE_API_URL=url):
+                asyncio.run(self.compare(url, upstream, options["requests"]))
+        finally:
+            upstream.stop()
+
+    @staticmethod
+    def waiting_threads():
+        """Threads currently inside a blocking HTTP call (urllib3, under requests)."""
+        waiting = 0
+        for frame in sys._current_frames().values():
+            while frame is not None:
+                if f"{os.sep}urllib3{os.sep}" in frame.f_code.co_filename:
+                    waiting += 1
+                    break
+                frame = frame.f_back
+        return waiting
+
+    async def peak_waiting(self, done):
+        peak = 0
+        while not done.is_set():
+            peak = max(peak, self.waiting_threads())
+            await asyncio.sleep(0.01)
+        return peak
+
+    async def timed(self, calls):
+        done = asyncio.Event()
+        sampler = asyncio.create_task(self.peak_waiting(done))
+        started = time.perf_counter()
+        results = await asyncio.gather(*calls)
+        elapsed = time.perf_counter() - started
+        done.set()
+        return results, elapsed, await sampler
+
+    async def compare(self, url, upstream, n):
+        transport = httpx.ASGITransport(app=get_asgi_application())
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            await client.get(reverse("login"))  # warm up URL resolvers and templates
+
+            await cache.adelete(views.QUOTE_CACHE_KEY)
+            calls = upstream.calls
+            pages, elapsed, blocked = await self.timed([client.get("/") for _ in range(n)])
+            quoted = sum("Bench quote." in page.text for page in pages)
+            self.stdout.write(
+                f"async home:     {n} pages in {elapsed:5.2f}s, {quoted} with the quote, "
+                f"{upstream.calls - calls} upstream call(s), {blocked} thread(s) blocked on it at peak"
+            )
+
+            # What the old sync view did: a blocking call on the thread ASGI lends each sync request
+            async def blocking_get():
+                async with ThreadSensitiveContext():
+                    await sync_to_async(requests.get)(url, timeout=30)
+
+            calls = upstream.calls
+            _, elapsed, blocked = await self.timed([blocking_get() for _ in range(n)])
+            self.stdout.write(
+                f"blocking fetch: {n} calls in {elapsed:5.2f}s, "
+                f"{upstream.calls - calls} upstream call(s), {blocked} thread(s) blocked on it at peak"
+            )
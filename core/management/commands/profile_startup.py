@@ -0,0 +1,111 @@
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+PROJECT_PACKAGES = {"SCEP_LMS", "core", "accounts", "books", "chatbot", "faculty"}
+PHASES = ["settings", "apps", "handler", "warmup", "first_request", "second_request"]
+
+
+def parse_importtime(stderr):
+    """``-X importtime`` lines -> ``{module: (self µs, cumulative µs)}``."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = (int(own), int(cumulative))
+    return imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile a cold start: in fresh interpreters, time settings, each app's import, models and "
+        "ready(), the WSGI handler, the warm-up hooks and the first request, with and without warm-up, "
+        "and list the heaviest imports and the phase that pays for them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Cold starts per mode; medians are reported")
+        parser.add_argument("--path", help="Path of the first request (default: the login page)")
+        parser.add_argument("--top", type=int, default=12, help="Packages and modules to list")
+        parser.add_argument("--no-compare", action="store_true", help="Only profile with warm-up on")
+
+    def probe(self, path, warm):
+        script = f"from core.startup import main; main({path!r}, {warm!r})"
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", script],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"Startup probe failed:\n{result.stderr[-3000:]}")
+        return json.loads(result.stdout), parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        path = options["path"] or reverse("login")
+        modes = [True] if options["no_compare"] else [False, True]
+        runs = {warm: [self.probe(path, warm) for _ in range(options["runs"])] for warm in modes}
+
+        self.stdout.write(f"Cold start, median of {options['runs']} run(s), first request GET {path}")
+        self.phase_table(runs)
+        report, imports = runs[modes[-1]][0]
+        self.app_table(report)
+        self.import_tables(report, imports, options["top"])
+
+    @staticmethod
+    def _median(reports, phase):
+        values = [report["phases"][phase] for report, _ in reports if phase in report["phases"]]
+        return statistics.median(values) if values else None
+
+    def phase_table(self, runs):
+        labels = {False: "no warm-up", True: "warm-up"}
+        self.stdout.write(f"\n{'phase':<16}" + "".join(f"{labels[warm]:>14}" for warm in runs))
+        for phase in PHASES:
+            cells = [self._median(reports, phase) for reports in runs.values()]
+            self.stdout.write(f"{phase:<16}" + "".join(f"{'-' if c is None else f'{c:.0f} ms':>14}" for c in cells))
+        # What a request landing on a just-started worker waits for: startup plus its own response
+        totals = [
+            statistics.median(
+                sum(v for k, v in report["phases"].items() if k != "second_request") for report, _ in reports
+            )
+            for reports in runs.values()
+        ]
+        self.stdout.write(f"{'to 1st response':<16}" + "".join(f"{t:>11.0f} ms" for t in totals))
+        statuses = {report["status"] for reports in runs.values() for report, _ in reports}
+        self.stdout.write(f"(response status: {', '.join(sorted(statuses))})")
+
+        hooks = runs[list(runs)[-1]][0][0]["hooks"]
+        for name, ms in hooks.items():
+            self.stdout.write(f"  warm-up {name:<38} {ms:6.0f} ms")
+
+    def app_table(self, report):
+        self.stdout.write(f"\n{'app':<20}{'import':>10}{'models':>10}{'ready':>10}")
+        for label, cost in sorted(report["apps"].items(), key=lambda item: -sum(item[1].values())):
+            self.stdout.write(
+                f"{label:<20}" + "".join(f"{cost.get(step, 0):>7.1f} ms" for step in ("import", "models", "ready"))
+            )
+
+    def import_tables(self, report, imports, top):
+        phase_of = {module: phase for phase, modules in report["modules"].items() for module in modules}
+
+        packages, package_phase = defaultdict(int), {}
+        for module, (own, _) in imports.items():
+            package = module.split(".")[0]
+            packages[package] += own
+            package_phase.setdefault(package, phase_of.get(module, "?"))
+        self.stdout.write(f"\n{'package (self time, all modules)':<44}{'ms':>8}  first loaded in")
+        for package, own in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"{package:<44}{own / 1000:>8.1f}  {package_phase[package]}")
+
+        project = [
+            (module, cumulative) for module, (_, cumulative) in imports.items()
+            if module.split(".")[0] in PROJECT_PACKAGES
+        ]
+        self.stdout.write(f"\n{'project module (incl. what it imports)':<44}{'ms':>8}  loaded in")
+        for module, cumulative in sorted(project, key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"{module:<44}{cumulative / 1000:>8.1f}  {phase_of.get(module, '?')}")
@@ -1,3 +1,22 @@
 from django.db import models
 
 # Create your models here.
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of a mutating POST, keyed by a hash of (user, path, client key).
+
+    A row with ``status_code`` NULL is still in flight. See core.idempotency.
+    """
+    key_hash = models.CharField(max_length=64, unique=True)
+    request_fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    location = models.CharField(max_length=500, blank=True)
+    body = models.BinaryField(blank=True, default=b"")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key_hash[:12]}… ({self.status_code or 'in flight'})"
@@ -0,0 +1,137 @@
+"""
+Shared async client for outbound HTTP calls (quotes, metadata lookups).
+
+Served through ASGI, an async view awaiting a slow upstream holds no
+worker thread, where a blocking ``requests`` call in a sync view holds the
+thread every sync view shares. Every call runs on one background event
+loop per process, which owns a single pooled ``httpx.AsyncClient``, so
+connections and TLS sessions are reused across requests whichever loop
+the caller is on. That matters under WSGI, where Django gives each async
+view an event loop of its own that is closed when the request ends; the
+caller's loop only waits for the result.
+
+Every call has a deadline (``TIMEOUT`` by default) covering the wait for a
+slot and the request itself. At most ``PER_HOST_LIMIT`` requests run
+against one host at a time, so a slow upstream can't take every pooled
+connection. ``get_json`` is what views use: it returns ``default`` instead
+of raising when the upstream is slow, down or returns garbage, and folds
+concurrent identical GETs into one.
+
+``httpx`` is imported on the first call, not with this module: the URLconf
+imports ``core.views``, and a cold-started worker shouldn't pay for it
+before anything is fetched. The background loop is started then too, in
+the process making the call, so a worker forked after the import gets
+its own.
+"""
+import asyncio
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = 5.0
+CONNECT_TIMEOUT = 2.0
+PER_HOST_LIMIT = 10
+LIMITS = {"max_connections": 100, "max_keepalive_connections": 20, "keepalive_expiry": 30}
+HEADERS = {"User-Agent": "BookNuk-LMS/1.0"}
+
+# Owned by the background loop; only touched from its thread
+_client = None
+_host_slots = {}
+_in_flight = {}
+
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+
+
+# ---------------------
+# Background loop
+# ---------------------
+def _background_loop():
+    """The process's outbound event loop, started on first use on a daemon thread."""
+    global _loop, _loop_pid, _client
+    if _loop_pid != os.getpid():
+        with _loop_lock:
+            if _loop_pid != os.getpid():
+                # A forked child inherits the parent's loop object but not its thread
+                _client = None
+                _host_slots.clear()
+                _in_flight.clear()
+                _loop = asyncio.new_event_loop()
+                threading.Thread(target=_loop.run_forever, name="outbound", daemon=True).start()
+                _loop_pid = os.getpid()
+    return _loop
+
+
+async def _on_background_loop(coro):
+    """Await ``coro`` on the background loop; cancelling the caller cancels it there too."""
+    loop = _background_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+def get_client():
+    """The pooled client, created on first use. Call on the background loop."""
+    global _client
+    import httpx
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT), limits=httpx.Limits(**LIMITS), headers=HEADERS,
+        )
+    return _client
+
+
+def _slots(host):
+    if host not in _host_slots:
+        _host_slots[host] = asyncio.Semaphore(PER_HOST_LIMIT)
+    return _host_slots[host]
+
+
+async def _send(method, url, **kwargs):
+    async with _slots(urlsplit(url).hostname):
+        return await get_client().request(method, url, **kwargs)
+
+
+# ---------------------
+# Calls
+# ---------------------
+async def request(method, url, timeout=TIMEOUT, **kwargs):
+    """Send a request through the shared client; raises ``httpx.HTTPError`` or ``asyncio.TimeoutError``."""
+    return await _on_background_loop(asyncio.wait_for(_send(method, url, **kwargs), timeout))
+
+
+async def _get_json(url, default, timeout, **kwargs):
+    import httpx
+
+    try:
+        response = await request("GET", url, timeout=timeout, **kwargs)
+        response.raise_for_status()
+        return response.json()
+    except (httpx.HTTPError, asyncio.TimeoutError, ValueError) as e:
+        logger.error(f"Outbound GET {url} failed: {e!r}")
+        return default
+
+
+async def _shared_get_json(url, default, timeout):
+    call = _in_flight.get(url)
+    if call is None:
+        call = _in_flight[url] = asyncio.ensure_future(_get_json(url, default, timeout))
+        call.add_done_callback(lambda _: _in_flight.pop(url, None))
+    # Shielded: one caller going away mustn't cancel the call for the others
+    return await asyncio.shield(call)
+
+
+async def get_json(url, default=None, timeout=TIMEOUT, **kwargs):
+    """
+    Decoded JSON from ``url``, or ``default`` when the call fails or outlives
+    ``timeout``. Concurrent plain GETs of one URL share a single request, so a
+    burst of page views missing the same cache entry costs the upstream one call.
+    """
+    if kwargs:
+        return await _get_json(url, default, timeout, **kwargs)
+    return await _on_background_loop(_shared_get_json(url, default, timeout))
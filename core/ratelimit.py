@@ -0,0 +1,198 @@
+"""
+Per-client rate limits for public and login endpoints.
+
+Each (scope, client) pair has a token bucket: it holds up to ``N`` tokens,
+refills at ``N`` per period and every request takes one; an empty bucket
+means 429 with ``Retry-After``. Scopes are configured in
+``settings.RATE_LIMITS`` as ``"N/period"`` strings (``s``, ``m``, ``h``,
+``d``); ``None`` switches a scope off, and a scope missing from the
+setting is an ``ImproperlyConfigured`` error when the view is decorated.
+Clients are keyed by IP, by user (falling back to IP for anonymous
+requests) or by the submitted username.
+
+``rate_limit`` goes outermost on a view, above ``@api_view``, so a
+throttled request never reaches DRF parsing, the ORM or the password
+hasher. Only the methods it is given are counted; GETs of a login form
+are free.
+
+Buckets live in the backend named by ``RATELIMIT_BACKEND``:
+``LocalBackend`` keeps them in this process (exact, but each worker counts
+on its own); ``CacheBackend`` keeps them in the ``RATELIMIT_CACHE`` cache,
+shared by every worker. A cache read and write are not atomic, so
+concurrent requests in different workers can occasionally spend the same
+token; the overshoot is bounded by how many race at once.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+MAX_LOCAL_KEYS = 10_000
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """``"30/m"`` -> ``(capacity, tokens per second)``."""
+    count, _, period = rate.partition("/")
+    count = int(count)
+    return count, count / PERIODS[period.strip()[0].lower()]
+
+
+def _take(state, now, capacity, refill):
+    """Spend a token from ``state``; return ``(new_state, retry_after)``, 0 when allowed."""
+    tokens, stamp = state or (capacity, now)
+    tokens = min(capacity, tokens + (now - stamp) * refill)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / refill
+
+
+# ---------------------
+# Backends
+# ---------------------
+class LocalBackend:
+    """Buckets in this process's memory, the least recently used dropped past ``MAX_LOCAL_KEYS``."""
+
+    def __init__(self, max_keys=MAX_LOCAL_KEYS):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def hit(self, key, capacity, refill):
+        with self.lock:
+            self.buckets[key], retry_after = _take(self.buckets.get(key), time.monotonic(), capacity, refill)
+            self.buckets.move_to_end(key)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return retry_after
+
+    async def ahit(self, key, capacity, refill):
+        return self.hit(key, capacity, refill)
+
+
+class CacheBackend:
+    """Buckets in a Django cache shared by every worker."""
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or getattr(settings, "RATELIMIT_CACHE", "default")]
+
+    @staticmethod
+    def _timeout(capacity, refill):
+        # An entry that expires has refilled completely, which is what a missing entry means
+        return int(capacity / refill) + 1
+
+    def hit(self, key, capacity, refill):
+        state, retry_after = _take(self.cache.get(key), time.time(), capacity, refill)
+        self.cache.set(key, state, self._timeout(capacity, refill))
+        return retry_after
+
+    async def ahit(self, key, capacity, refill):
+        state, retry_after = _take(await self.cache.aget(key), time.time(), capacity, refill)
+        await self.cache.aset(key, state, self._timeout(capacity, refill))
+        return retry_after
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = import_string(getattr(settings, "RATELIMIT_BACKEND", "core.ratelimit.LocalBackend"))()
+    return _backend
+
+
+# ---------------------
+# Client keys
+# ---------------------
+def client_ip(request, user):
+    """
+    The caller's address. Behind ``RATELIMIT_PROXY_COUNT`` proxies it is the
+    entry that many hops from the right of X-Forwarded-For, the part the
+    proxies appended and a client can't forge.
+    """
+    proxies = getattr(settings, "RATELIMIT_PROXY_COUNT", 0)
+    forwarded = [ip.strip() for ip in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if ip.strip()]
+    if proxies and forwarded:
+        return forwarded[-min(proxies, len(forwarded))]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def user_or_ip(request, user):
+    return f"user:{user.pk}" if user.is_authenticated else f"ip:{client_ip(request, user)}"
+
+
+def submitted_username(request, user):
+    return (request.POST.get("username") or "").strip().lower()
+
+
+KEYS = {"ip": client_ip, "user": user_or_ip, "username": submitted_username}
+
+
+# ---------------------
+# Decorator
+# ---------------------
+def _bucket(scope, key_func, methods, request, user):
+    """``(bucket key, capacity, refill)`` for this request, or None when it isn't limited."""
+    rate = settings.RATE_LIMITS[scope]
+    if not rate or request.method not in methods:
+        return None
+    ident = hashlib.sha1(key_func(request, user).encode()).hexdigest()
+    return (f"ratelimit:{scope}:{ident}", *parse_rate(rate))
+
+
+def _too_many_requests(request, retry_after):
+    return JsonResponse({"error": f"Too many requests. Try again in {retry_after} seconds."}, status=429)
+
+
+def rate_limit(scope, key="ip", methods=("POST",), on_limit=None):
+    """
+    Throttle a view (sync or async) per client under ``scope``. ``key`` is a
+    name from ``KEYS`` or a ``(request, user) -> str`` callable; ``on_limit``
+    builds the rejection from ``(request, retry_after)``.
+    """
+    if scope not in getattr(settings, "RATE_LIMITS", {}):
+        raise ImproperlyConfigured(f"Rate limit scope {scope!r} is not in settings.RATE_LIMITS.")
+    key_func = KEYS[key] if isinstance(key, str) else key
+    on_limit = on_limit or _too_many_requests
+
+    def rejected(request, retry_after):
+        retry_after = max(1, round(retry_after))
+        response = on_limit(request, retry_after)
+        response["Retry-After"] = str(retry_after)
+        return response
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                bucket = _bucket(scope, key_func, methods, request, await request.auser())
+                if bucket:
+                    retry_after = await get_backend().ahit(*bucket)
+                    if retry_after:
+                        return rejected(request, retry_after)
+                return await view(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                bucket = _bucket(scope, key_func, methods, request, request.user)
+                if bucket:
+                    retry_after = get_backend().hit(*bucket)
+                    if retry_after:
+                        return rejected(request, retry_after)
+                return view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import CustomUser
+from books.models import Book
+from . import facets, live
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(set(update_fields) & set(fields))
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Logins save last_login only; don't throw the facets away for that
+    if created or _touches(update_fields, facets.USER_FACET_FIELDS + ("is_deleted",)):
+        facets.invalidate_user_facets()
+    if created:
+        transaction.on_commit(live.notify)
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_deleted(sender, instance, **kwargs):
+    facets.invalidate_user_facets()
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or _touches(update_fields, facets.BOOK_FACET_FIELDS):
+        facets.invalidate_book_facets()
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    facets.invalidate_book_facets()
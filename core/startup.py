@@ -0,0 +1,127 @@
+"""
+Cold-start probe for ``manage.py profile_startup``.
+
+Run in a fresh interpreter (``python -X importtime -c ...``), it goes
+through what a worker does between process start and its first response:
+load settings, import and ready each app, build the WSGI handler,
+optionally warm up (``core.warmup``), then serve one request and a second
+for comparison. It prints one JSON document with the time of each phase,
+the per-app import and ``ready()`` cost, and which modules were first
+imported in which phase, so ``-X importtime`` lines on stderr can be
+attributed to a phase by the parent.
+
+Nothing here is imported by the running site.
+"""
+import io
+import json
+import sys
+import time
+
+
+class _Phases:
+    def __init__(self):
+        self.timings, self.modules = {}, {}
+        self.seen = set(sys.modules)
+
+    def run(self, name, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        self.timings[name] = (time.perf_counter() - started) * 1000
+        loaded = set(sys.modules) - self.seen
+        self.modules[name] = sorted(loaded)
+        self.seen |= loaded
+        return result
+
+
+def _time_apps(apps):
+    """Wrap ``AppConfig`` so each app's module import, model import and ready() is timed."""
+    from django.apps import AppConfig
+
+    create, import_models = AppConfig.create.__func__, AppConfig.import_models
+
+    def timed_create(cls, entry):
+        started = time.perf_counter()
+        config = create(cls, entry)
+        apps[config.label] = {"import": (time.perf_counter() - started) * 1000}
+
+        ready = config.ready
+
+        def timed_ready():
+            started = time.perf_counter()
+            ready()
+            apps[config.label]["ready"] = (time.perf_counter() - started) * 1000
+
+        config.ready = timed_ready
+        return config
+
+    def timed_import_models(self):
+        started = time.perf_counter()
+        import_models(self)
+        apps[self.label]["models"] = (time.perf_counter() - started) * 1000
+
+    AppConfig.create = classmethod(timed_create)
+    AppConfig.import_models = timed_import_models
+
+
+def _environ(path, host):
+    return {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": host,
+        "SERVER_PORT": "443",
+        "HTTP_HOST": host,
+        "REMOTE_ADDR": "127.0.0.1",
+        "wsgi.url_scheme": "https",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.version": (1, 0),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+
+
+def _request(application, path, host):
+    statuses = []
+    body = application(_environ(path, host), lambda status, headers, *_: statuses.append(status))
+    b"".join(body)
+    if hasattr(body, "close"):
+        body.close()
+    return statuses[0]
+
+
+def main(path, warm):
+    phases, apps = _Phases(), {}
+
+    import django
+    from django.conf import settings
+
+    phases.run("settings", lambda: settings.INSTALLED_APPS)
+    _time_apps(apps)
+    phases.run("apps", django.setup, False)
+
+    from django.core.handlers.wsgi import WSGIHandler
+
+    application = phases.run("handler", WSGIHandler)
+    if warm:
+        from core import warmup
+
+        hooks = phases.run("warmup", warmup.warm_up)
+    else:
+        hooks = {}
+
+    host = next((h for h in settings.ALLOWED_HOSTS if h not in ("*", "") and not h.startswith(".")), "localhost")
+    status = phases.run("first_request", _request, application, path, host)
+    phases.run("second_request", _request, application, path, host)
+
+    json.dump(
+        {
+            "phases": phases.timings,
+            "modules": phases.modules,
+            "apps": apps,
+            "hooks": {name: seconds * 1000 for name, seconds in hooks.items()},
+            "status": status,
+        },
+        sys.stdout,
+    )
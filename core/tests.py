@@ -1,3 +1,186 @@
-from django.test import TestCase
+import asyncio
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.core.cache import cache
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from books.models import Book, BookCopy, IssuedBook
+from chatbot.models import Conversation, Message
+from . import live, outbound, views
+from .bulk import bulk_create_with_pks
+from .idempotency import idempotent
+from .ratelimit import LocalBackend, _take, rate_limit
+
+
+def without_returned_ids():
+    """Make the test database behave like MySQL: no ids back from a multi-row INSERT."""
+    return mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False)
+
+
+class BulkCreateWithPksTests(TestCase):
+    def setUp(self):
+        self.student = CustomUser.objects.create_user(username="alice", password="x", role="student")
+        self.book = Book.objects.create(title="Compilers", author="Aho", total_copies=3, available_copies=3)
+        self.copies = list(BookCopy.objects.filter(book=self.book).order_by("pk"))
+
+    def loans(self, copies):
+        now = timezone.now()
+        return [
+            IssuedBook(student=self.student, book=self.book, copy=c, issue_date=now, due_date=now + timedelta(days=14))
+            for c in copies
+        ]
+
+    def test_keyed_rows_get_their_own_ids(self):
+        # An older, returned loan of the same copy must not be picked up
+        old = self.loans(self.copies[:1])[0]
+        old.return_date = timezone.now()
+        old.save()
+        with without_returned_ids():
+            loans = bulk_create_with_pks(
+                IssuedBook, self.loans(self.copies), key=("copy",), within={"return_date__isnull": True}
+            )
+        stored = dict(IssuedBook.objects.filter(return_date__isnull=True).values_list("copy_id", "pk"))
+        self.assertEqual({loan.copy_id: loan.pk for loan in loans}, stored)
+        self.assertNotIn(old.pk, stored.values())
+
+    def test_ambiguous_key_is_an_error(self):
+        with without_returned_ids(), self.assertRaises(IssuedBook.MultipleObjectsReturned):
+            bulk_create_with_pks(IssuedBook, self.loans(self.copies[:1]) + self.loans(self.copies[:1]), key=("copy",))
+
+    def test_keyless_rows_are_inserted_one_by_one(self):
+        conversation = Conversation.objects.create(title="Quick Chat")
+        with without_returned_ids():
+            user_msg, bot_msg = bulk_create_with_pks(Message, [
+                Message(conversation=conversation, role="user", text="hi"),
+                Message(conversation=conversation, role="bot", text="hello"),
+            ])
+        self.assertEqual(Message.objects.get(pk=bot_msg.pk).text, "hello")
+        self.assertEqual(Message.objects.get(pk=user_msg.pk).text, "hi")
+
+
+class OutboundClientTests(TestCase):
+    def test_client_is_shared_across_request_loops(self):
+        async def on_background_loop():
+            return threading.current_thread().name, outbound.get_client()
+
+        async def fetch_client():
+            return await outbound._on_background_loop(on_background_loop())
+
+        # What Django does for an async view under WSGI, a fresh loop per request, and what a script does
+        calls = [async_to_sync(fetch_client)(), async_to_sync(fetch_client)(), asyncio.run(fetch_client())]
+
+        self.assertEqual({thread for thread, _ in calls}, {"outbound"})
+        client = calls[0][1]
+        self.assertTrue(all(other is client for _, other in calls))
+        self.assertFalse(client.is_closed)
+
+
+class HomeViewTests(TestCase):
+    def setUp(self):
+        cache.set(views.QUOTE_CACHE_KEY, "Read more. — Someone")
+        self.addCleanup(cache.delete, views.QUOTE_CACHE_KEY)
+
+    async def test_renders_for_a_logged_in_user_under_asgi(self):
+        librarian = await CustomUser.objects.acreate_user(username="lib", password="x", role="librarian")
+        await self.async_client.aforce_login(librarian)
+        response = await self.async_client.get("/")
+        self.assertContains(response, "Read more.")
+
+
+class LiveEventsTests(TestCase):
+    def setUp(self):
+        self.librarian = CustomUser.objects.create_user(username="lib", password="x", role="librarian")
+
+    def test_no_stream_under_wsgi(self):
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse("live_events"))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+    async def test_streams_under_asgi(self):
+        await self.async_client.aforce_login(self.librarian)
+        response = await self.async_client.get(reverse("live_events"))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+    async def test_stream_ends_after_its_lifetime(self):
+        chunks = [chunk async for chunk in live.stream(max_seconds=0.05)]
+        self.assertTrue(chunks[0].startswith("retry: "))
+        self.assertEqual(live.feed.subscribers, set())
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.calls = 0
+
+        @idempotent
+        def issue(request):
+            self.calls += 1
+            return HttpResponse(f"issued #{self.calls}", status=201)
+
+        self.view = issue
+
+    def post(self, key="k1", **data):
+        request = RequestFactory().post("/issue/", data or {"book": "1"}, HTTP_IDEMPOTENCY_KEY=key)
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def test_retry_replays_the_first_response(self):
+        first, retry = self.post(), self.post()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual((retry.status_code, retry.content), (201, b"issued #1"))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertNotIn("Idempotent-Replayed", first)
+
+    def test_new_key_runs_the_view_again(self):
+        self.post("k1")
+        self.post("k2")
+        self.assertEqual(self.calls, 2)
+
+    def test_key_reused_for_another_payload_is_rejected(self):
+        self.post()
+        self.assertEqual(self.post(book="2").status_code, 422)
+        self.assertEqual(self.calls, 1)
+
+
+class RateLimitTests(TestCase):
+    def test_bucket_refills_over_time(self):
+        state, retry_after = _take(None, 0, 2, 1)
+        state, retry_after = _take(state, 0, 2, 1)
+        self.assertEqual(retry_after, 0)
+        state, retry_after = _take(state, 0.5, 2, 1)
+        self.assertEqual(retry_after, 0.5)
+        self.assertEqual(_take(state, 1, 2, 1)[1], 0)
+
+    @override_settings(RATE_LIMITS={"test_login": "2/m"})
+    def test_third_request_in_a_minute_is_rejected(self):
+        @rate_limit("test_login")
+        def login(request):
+            return HttpResponse("ok")
+
+        with mock.patch("core.ratelimit.get_backend", return_value=LocalBackend()):
+            responses = [login(self.request("10.0.0.1")) for _ in range(3)]
+            other_client = login(self.request("10.0.0.2"))
+        self.assertEqual([r.status_code for r in responses], [200, 200, 429])
+        self.assertEqual(responses[-1]["Retry-After"], "30")
+        self.assertEqual(other_client.status_code, 200)
+
+    def test_unknown_scope_fails_loudly(self):
+        with self.assertRaises(ImproperlyConfigured):
+            rate_limit("no_such_scope")
+
+    @staticmethod
+    def request(ip):
+        request = RequestFactory().post("/login/", REMOTE_ADDR=ip)
+        request.user = AnonymousUser()
+        return request
@@ -8,4 +8,5 @@ urlpatterns = [
     path("librarians/<slug:slug>/edit/", views.edit_librarian, name="edit_librarian"),
     path("librarians/<slug:slug>/delete/", views.delete_librarian, name="delete_librarian"),
     path("librarians/<slug:slug>/toggle-status/", views.toggle_librarian_status, name="toggle_librarian_status"),
+    path("live/events/", views.live_events, name="live_events"),
 ]
@@ -1,50 +1,66 @@
+import asyncio
 import datetime
 import logging
 import random
-import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import user_passes_test
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 
-from books.models import Book, IssuedBook
+from books.models import Book, IssuedBook, IssuedBookArchive
 from accounts.models import CustomUser
 from accounts.forms import LibrarianCreationForm
+from . import live, outbound
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+DEFAULT_THOUGHT = "Keep learning, keep growing."
+QUOTE_CACHE_KEY = "home:quote:v1"
+QUOTE_TTL = 60
 
-def home(request):
-    year = datetime.datetime.now().year
-    thought = "Keep learning, keep growing."
 
-    try:
-        response = requests.get("https://zenquotes.io/api/random", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if isinstance(data, list):
-                thought = f"{data[0]['q']} — {data[0]['a']}"
-    except Exception as e:
-        logger.error(f"Quote API Error: {e}")
+async def _thought():
+    """A random quote, shared by every page view for ``QUOTE_TTL`` so the upstream isn't hit per visit."""
+    thought = await cache.aget(QUOTE_CACHE_KEY)
+    if thought is None:
+        data = await outbound.get_json(settings.QUOTE_API_URL)
+        quote = data[0] if isinstance(data, list) and data else None
+        if not isinstance(quote, dict) or not quote.get("q"):
+            return DEFAULT_THOUGHT
+        thought = f"{quote['q']} — {quote.get('a', 'Unknown')}"
+        await cache.aset(QUOTE_CACHE_KEY, thought, QUOTE_TTL)
+    return thought
 
+
+async def _featured_books(count=3):
     # Fetch 3 random books efficiently
-    book_count = Book.objects.count()
-    if book_count > 0:
-        random_indexes = random.sample(range(book_count), min(3, book_count))
-        featured_books = [Book.objects.all()[i] for i in random_indexes]
-    else:
-        featured_books = []
+    book_count = await Book.objects.acount()
+    featured_books = []
+    for i in random.sample(range(book_count), min(count, book_count)):
+        featured_books += [book async for book in Book.objects.all()[i:i + 1]]
+    return featured_books
+
+
+async def home(request):
+    # The quote and the books load concurrently; waiting on the quote upstream holds no worker thread
+    thought, featured_books = await asyncio.gather(_thought(), _featured_books())
 
     context = {
         'thought': thought,
-        'year': year,
+        'year': datetime.datetime.now().year,
         'featured_books': featured_books,
     }
-    return render(request, 'core/home.html', context)
+    # Rendering reads the session and request.user (navbar, messages), which query the database
+    return await sync_to_async(render)(request, 'core/home.html', context)
 
 
 def admin_required(user):
@@ -64,7 +80,7 @@ def librarians_dashboard(request):
     active = librarians_list.filter(is_active=True).count()
     inactive = total - active
     total_books = Book.objects.count()
-    total_books_issued = IssuedBook.objects.count()
+    total_books_issued = IssuedBook.objects.count() + IssuedBookArchive.objects.count()
 
     context = {
         "librarians": librarians,
@@ -132,3 +148,20 @@ def toggle_librarian_status(request, slug):
     messages.success(request, f"⚡ Librarian {status} successfully!")
     logger.info(f"Librarian {librarian.username} {status} by {request.user.username}")
     return redirect("librarians_dashboard")
+
+
+# ---------- Live dashboard feed (served through SCEP_LMS/asgi.py) ----------
+async def live_events(request):
+    """Circulation and registration events for librarians' dashboards, as server-sent events (see core.live)."""
+    user = await request.auser()
+    if not (user.is_authenticated and user.role == "librarian"):
+        return HttpResponseForbidden()
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI an open stream pins a worker thread for as long as the tab stays open.
+        # 204 tells EventSource not to reconnect; the dashboard stays usable without live updates.
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(live.stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # let nginx pass events through as they come
+    return response
@@ -0,0 +1,86 @@
+"""
+Work a worker does once before taking traffic, instead of on its first request.
+
+On Render an idle instance is put to sleep and the next request starts a
+fresh process; without warm-up that request also pays for importing every
+view module (through the URLconf) and compiling the templates it renders.
+``warm_up`` runs
+the hooks listed in ``settings.WARMUP_HOOKS`` (dotted paths to callables
+taking no arguments) right after the WSGI/ASGI application is created, so
+that cost lands while the platform is still waiting for the port to open.
+
+Warm-up is best effort: a failing hook is logged and skipped, never raised,
+so it can't keep a worker from starting. Set ``DJANGO_WARMUP=0`` to turn it
+off (e.g. for a one-off ``manage.py`` process importing the WSGI module).
+"""
+import logging
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.urls import get_resolver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def enabled():
+    return os.getenv("DJANGO_WARMUP", "1").lower() not in ("0", "false", "no")
+
+
+# ---------------------
+# Hooks
+# ---------------------
+def load_urlconf():
+    """Import the URLconf, and with it every view module, and build the reverse lookup tables."""
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+    return len(resolver.reverse_dict)
+
+
+def _template_names(directory):
+    root = Path(directory)
+    return [path.relative_to(root).as_posix() for path in sorted(root.rglob("*.html"))]
+
+
+def compile_templates():
+    """
+    Compile every project template. With the cached loader (the default when
+    DEBUG is off) they stay compiled for the life of the worker.
+    """
+    compiled = 0
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            # Skip the admin's and other third-party apps' templates; only ours are rendered per request
+            if not str(directory).startswith(str(settings.BASE_DIR)):
+                continue
+            for name in _template_names(directory):
+                try:
+                    engine.get_template(name)
+                    compiled += 1
+                except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+                    logger.warning(f"Warm-up skipped template {name}: {e}")
+    return compiled
+
+
+# ---------------------
+# Runner
+# ---------------------
+def warm_up(hooks=None):
+    """Run each hook once; return ``{hook: seconds}``. Errors are logged, not raised."""
+    timings = {}
+    for path in settings.WARMUP_HOOKS if hooks is None else hooks:
+        started = time.perf_counter()
+        try:
+            import_string(path)()
+        except Exception:
+            logger.exception(f"Warm-up hook {path} failed")
+            continue
+        timings[path] = time.perf_counter() - started
+    if timings:
+        steps = ", ".join(f"{path.rsplit('.', 1)[-1]} {seconds * 1000:.0f} ms" for path, seconds in timings.items())
+        logger.info(f"Warm-up done in {sum(timings.values()) * 1000:.0f} ms ({steps})")
+    return timings
@@ -3,6 +3,8 @@ from books.models import IssuedBook
 from django.contrib.auth import get_user_model
 User = get_user_model()
 from books.models import Book
+from accounts.search import search_users
+from core.facets import get_facets
 
 class TeacherIssueBookForm(forms.ModelForm):
     student = forms.ModelChoiceField(
@@ -37,3 +39,41 @@ class TeacherIssueBookForm(forms.ModelForm):
                 )
 
         return cleaned_data
+
+
+class ClassSetIssueForm(forms.Form):
+    books = forms.ModelMultipleChoiceField(
+        queryset=Book.objects.order_by("title"),
+        label="Books",
+        widget=forms.SelectMultiple(attrs={"size": 8}),
+    )
+    academic_session = forms.ChoiceField(label="Academic Session")
+    branch = forms.ChoiceField(label="Branch", required=False)
+    q = forms.CharField(label="Name or roll number", required=False)
+    allow_partial = forms.BooleanField(
+        label="Issue as many as stock allows when a book runs short",
+        required=False,
+        initial=True,
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        facets = get_facets()
+        self.fields["academic_session"].choices = [
+            (value, f"{value} ({n})") for value, n in facets["academic_session"]
+        ]
+        self.fields["branch"].choices = [("", "All branches")] + [
+            (value, f"{value} ({n})") for value, n in facets["branch"]
+        ]
+
+    def students(self):
+        """The selected student group, in roll-number order."""
+        data = self.cleaned_data
+        students = User.objects.filter(
+            role="student", is_active=True, academic_session=data["academic_session"]
+        )
+        if data["branch"]:
+            students = students.filter(branch=data["branch"])
+        if data["q"]:
+            students = search_users(students, data["q"])
+        return students.order_by("roll_number", "id")
@@ -7,4 +7,5 @@ urlpatterns = [
     path("students/<slug:slug>/profile/", views.students_profile, name="students_profile"),
     path("students/<slug:slug>/suspend/", views.suspend_students, name="suspend_students"),
     path("issue-book/", views.teacher_issue_book, name="teacher_issue_book"),
+    path("issue-class-set/", views.teacher_issue_class_set, name="teacher_issue_class_set"),
 ]
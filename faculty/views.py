@@ -6,15 +6,17 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import user_passes_test
 from django.utils import timezone
 from datetime import timedelta
-from django.db import transaction
-from django.db.models import F
 from django.db.models import Sum
 from threading import Thread
 
 from accounts.views import is_teacher
 from accounts.models import CustomUser
+from accounts.search import search_users
 from books.models import IssuedBook, Book
-from .forms import TeacherIssueBookForm
+from books.archive import loan_history
+from books.circulation import CirculationError, MAX_CLASS_SET_STUDENTS, issue_books, issue_class_set
+from core.idempotency import idempotent
+from .forms import ClassSetIssueForm, TeacherIssueBookForm
 
 logger = logging.getLogger(__name__)
 
@@ -63,12 +65,12 @@ def student_list(request):
 
     students = CustomUser.objects.filter(role="student").order_by("id")
     if q:
-        students = students.filter(Q(username__icontains=q) | Q(email__icontains=q))
+        students = search_users(students, q)
     if cursor:
         students = students.filter(id__gt=cursor)
 
-    students = students[:limit+1]
-    next_cursor = students.last().id if len(students) > limit else None
+    students = list(students[:limit+1])
+    next_cursor = students[limit - 1].id if len(students) > limit else None
     students = students[:limit]
 
     return render(request, "faculty/student_list.html", {
@@ -84,7 +86,7 @@ def student_list(request):
 @user_passes_test(is_teacher)
 def students_profile(request, slug):
     student = get_object_or_404(CustomUser, slug=slug, role="student")
-    issued_books = student.issuedbook_set.select_related("book").order_by("-issue_date")
+    issued_books = loan_history(student)
 
 
     total_fine = sum([book.fine for book in issued_books])
@@ -132,23 +134,12 @@ def teacher_issue_book(request):
                 return render(request, "faculty/teacher_issue_book.html", {"form": form, "today": today, "due_date": due_date})
 
             try:
-                with transaction.atomic():
-                    # Lock the book row
-                    locked_book = Book.objects.select_for_update().get(pk=book.pk)
-                    if locked_book.available_copies <= 0:
-                        messages.error(request, f"❌ '{locked_book.title}' has no available copies to issue.")
-                        return render(request, "faculty/teacher_issue_book.html", {"form": form, "today": today, "due_date": due_date})
-
-                    # Save issued book
-                    issued_book = form.save(commit=False)
-                    issued_book.issue_date = today
-                    issued_book.due_date = due_date
-                    issued_book.issued_by = request.user
-                    issued_book.save()
-
-                    # Decrement copies
-                    Book.objects.filter(pk=locked_book.pk).update(available_copies=F("available_copies") - 1)
-
+                # Locks the book, claims a copy and decrements stock in one transaction
+                issued_book, = issue_books(student, [book])
+            except CirculationError as e:
+                for error in e.errors.values() or [str(e)]:
+                    messages.error(request, f"❌ {error}")
+                return render(request, "faculty/teacher_issue_book.html", {"form": form, "today": today, "due_date": due_date})
             except Exception as e:
                 logger.error(f"Error issuing book: {str(e)}")
                 messages.error(request, "❌ Unexpected error occurred. Check logs.")
@@ -165,3 +156,50 @@ def teacher_issue_book(request):
         form = TeacherIssueBookForm()
 
     return render(request, "faculty/teacher_issue_book.html", {"form": form, "today": today, "due_date": due_date})
+
+
+# -------------------------
+# Teacher Issue Class Set
+# -------------------------
+@user_passes_test(is_teacher)
+@idempotent
+def teacher_issue_class_set(request):
+    today = timezone.now().date()
+    context = {"today": today, "due_date": today + timedelta(days=14), "max_students": MAX_CLASS_SET_STUDENTS}
+
+    form = ClassSetIssueForm(request.POST or None)
+    if request.method == "POST" and form.is_valid():
+        students = list(form.students()[:MAX_CLASS_SET_STUDENTS + 1])
+        books = list(form.cleaned_data["books"])
+        context["students"] = students
+
+        if request.POST.get("action") == "issue":
+            try:
+                result = issue_class_set(students, books, allow_partial=form.cleaned_data["allow_partial"])
+            except CirculationError as e:
+                for error in e.errors.values() or [str(e)]:
+                    messages.error(request, f"❌ {error}")
+            else:
+                context["result"] = result
+                if result.issued:
+                    messages.success(
+                        request,
+                        f"✅ Issued {len(result.issued)} loan(s): {len(books)} book(s) to {len(students)} student(s).",
+                    )
+                for book, already in result.already.items():
+                    messages.info(request, f"ℹ️ {len(already)} student(s) already had '{book.title}'.")
+                for book, short in result.shortfall.items():
+                    messages.warning(request, f"⚠️ '{book.title}' ran out: {len(short)} student(s) did not get a copy.")
+                if result.shortfall and not result.issued:
+                    messages.error(request, "❌ Nothing was issued because stock ran short. Tick the partial option to issue what is available.")
+                logger.info(
+                    f"Teacher {request.user.username} issued class set of {len(result.issued)} loans "
+                    f"({sum(len(v) for v in result.shortfall.values())} short)"
+                )
+    elif request.method == "POST":
+        for field, errors in form.errors.items():
+            for err in errors:
+                messages.error(request, f"{field}: {err}")
+
+    context["form"] = form
+    return render(request, "faculty/teacher_issue_class_set.html", context)
@@ -7,6 +7,8 @@ document.addEventListener("DOMContentLoaded", function () {
   const send = document.getElementById("chat-send");
 
   let conversationId = null;
+  let olderCursor = null; // where the next page of older messages starts
+  let loadingOlder = false;
 
   //  Get CSRF token
   function getCookie(name) {
@@ -23,32 +25,106 @@ document.addEventListener("DOMContentLoaded", function () {
     }
     return cookieValue;
   }
-  const csrftoken = getCookie("csrftoken");
+  // The widget renders {% csrf_token %}, which also sets the cookie for later pages
+  const csrftoken =
+    getCookie("csrftoken") ||
+    document.querySelector("#chat-root [name=csrfmiddlewaretoken]")?.value;
 
-  //  Append a chat message
-  function appendMessage(role, text) {
+  //  Build a chat message row
+  function buildMessage(role, text) {
     const wrapper = document.createElement("div");
-    wrapper.className = "flex " + (role === "user" ? "justify-end" : "justify-start");
+    wrapper.className =
+      "flex " + (role === "user" ? "justify-end" : role === "system" ? "justify-center" : "justify-start");
 
+    //  "system" rows summarise older messages compacted by cleanup_chats
     const el = document.createElement("div");
     el.className =
       role === "bot"
         ? "bg-indigo-50 text-gray-800 p-2 rounded-md max-w-[75%]"
+        : role === "system"
+        ? "text-xs italic text-gray-500 p-2 text-center max-w-[90%]"
         : "bg-gray-100 text-gray-900 p-2 rounded-md max-w-[75%]";
     el.innerText = text;
 
     wrapper.appendChild(el);
+    return wrapper;
+  }
+
+  //  Append a chat message; returns the bubble so a streamed reply can grow it
+  function appendMessage(role, text) {
+    const wrapper = buildMessage(role, text);
     body.appendChild(wrapper);
     body.scrollTop = body.scrollHeight;
+    return wrapper.firstChild;
+  }
+
+  //  Logged-in users pick up their latest conversation (its newest messages only)
+  async function resumeConversation() {
+    try {
+      const res = await fetch("/api/chatbot/conversations/?limit=1");
+      if (!res.ok) return false; // anonymous
+      const conv = (await res.json()).results[0];
+      if (!conv || !conv.active) return false;
+      conversationId = conv.id;
+      olderCursor = conv.older_messages_cursor;
+      conv.messages.forEach((m) => appendMessage(m.role, m.text));
+      return true;
+    } catch (err) {
+      return false;
+    }
+  }
+
+  //  Scrolling to the top loads the previous page of messages
+  body?.addEventListener("scroll", async () => {
+    if (body.scrollTop > 40 || !olderCursor || loadingOlder) return;
+    loadingOlder = true;
+    try {
+      const res = await fetch(
+        `/api/chatbot/conversations/${conversationId}/messages/?before=${encodeURIComponent(olderCursor)}`
+      );
+      if (!res.ok) return;
+      const data = await res.json();
+      const previousHeight = body.scrollHeight;
+      const first = body.firstChild;
+      data.results.forEach((m) => body.insertBefore(buildMessage(m.role, m.text), first));
+      olderCursor = data.next_cursor;
+      body.scrollTop += body.scrollHeight - previousHeight; // keep the view where it was
+    } finally {
+      loadingOlder = false;
+    }
+  });
+
+  //  Read a text/event-stream response, calling onEvent(name, data) per event
+  async function readEvents(res, onEvent) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let end;
+      while ((end = buffer.indexOf("\n\n")) !== -1) {
+        const frame = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        let name = "message";
+        let data = "";
+        for (const line of frame.split("\n")) {
+          if (line.startsWith("event: ")) name = line.slice(7);
+          else if (line.startsWith("data: ")) data += line.slice(6);
+        }
+        onEvent(name, data ? JSON.parse(data) : {});
+      }
+    }
   }
 
   //  Show widget & hide bubble
-  toggle?.addEventListener("click", () => {
+  toggle?.addEventListener("click", async () => {
     widget.classList.remove("hidden");
     toggle.classList.add("hidden");
 
-    if (!conversationId) {
-      fetch("/api/chatbot/start/", {
+    if (!conversationId && !(await resumeConversation())) {
+      fetch("/api/chatbot/async/start/", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -92,7 +168,7 @@ document.addEventListener("DOMContentLoaded", function () {
     body.scrollTop = body.scrollHeight;
 
     try {
-      const res = await fetch("/api/chatbot/message/", {
+      const res = await fetch("/api/chatbot/async/message/", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -100,10 +176,26 @@ document.addEventListener("DOMContentLoaded", function () {
         },
         body: JSON.stringify({ conversation_id: conversationId, text }),
       });
+      if (!res.ok) throw new Error(res.status);
 
-      const data = await res.json();
-      typingWrapper.remove();
-      appendMessage("bot", data.reply || "I didn’t get that.");
+      // Reply lines arrive as "delta" events; show them as they come
+      let bubble = null;
+      await readEvents(res, (name, data) => {
+        if (name === "start") {
+          conversationId = data.conversation_id;
+        } else if (name === "delta") {
+          if (!bubble) {
+            typingWrapper.remove();
+            bubble = appendMessage("bot", "");
+          }
+          bubble.innerText += data.text;
+          body.scrollTop = body.scrollHeight;
+        }
+      });
+      if (!bubble) {
+        typingWrapper.remove();
+        appendMessage("bot", "I didn’t get that.");
+      }
     } catch (err) {
       typingWrapper.remove();
       appendMessage("bot", "⚠️ Sorry — network error.");
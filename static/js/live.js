@@ -0,0 +1,107 @@
+//  Live dashboard updates over server-sent events (core.live).
+//  Pages opt in with #live-dashboard[data-live-url]; counters, the activity
+//  feed and the issued-books table are patched in place as events arrive.
+(function () {
+  const root = document.getElementById("live-dashboard");
+  if (!root || !window.EventSource) return;
+
+  const status = root.querySelector("[data-live-status]");
+  const feed = root.querySelector("[data-live-feed]");
+  const loans = root.querySelector("[data-live-loans]");
+  const rowTemplate = root.querySelector("template[data-live-row]");
+  const VERBS = { issue: "issued", return: "returned", renew: "renewed", fine_assessed: "fined for", stock_adjust: "restocked" };
+  const MAX_FEED_ITEMS = 50;
+
+  function setStatus(text) {
+    if (status) status.textContent = text;
+  }
+
+  function formatDate(iso) {
+    return iso ? new Date(iso).toLocaleDateString("en-GB", { day: "2-digit", month: "short", year: "numeric" }) : "";
+  }
+
+  function bump(kind) {
+    const counter = root.querySelector(`[data-live-count="${kind}"]`);
+    if (counter) counter.textContent = Number(counter.textContent) + 1;
+  }
+
+  function log(text) {
+    if (!feed) return;
+    const item = document.createElement("li");
+    item.textContent = `${new Date().toLocaleTimeString()} — ${text}`;
+    feed.prepend(item);
+    while (feed.children.length > MAX_FEED_ITEMS) feed.lastElementChild.remove();
+  }
+
+  function fineCell(cell, fine) {
+    const badge = document.createElement("span");
+    badge.className = fine ? "text-red-600 font-bold" : "text-green-600 font-semibold";
+    badge.textContent = fine ? `₹${fine}` : "0";
+    cell.replaceChildren(badge);
+  }
+
+  function addRow(event) {
+    const row = rowTemplate.content.firstElementChild.cloneNode(true);
+    const field = (name) => row.querySelector(`[data-field="${name}"]`);
+    row.dataset.loanId = event.loan.id;
+    field("student").textContent = event.student;
+    field("book").textContent = event.book;
+    field("issue_date").textContent = formatDate(event.loan.issue_date);
+    field("due_date").textContent = formatDate(event.loan.due_date);
+    field("action").querySelector("a").href = event.loan.return_url;
+    loans.querySelector("[data-live-empty]")?.remove();
+    loans.prepend(row);
+  }
+
+  function patchRow(row, event) {
+    const field = (name) => row.querySelector(`[data-field="${name}"]`);
+    if (event.kind === "renew") {
+      field("due_date").textContent = formatDate(event.loan.due_date);
+      field("due_date").classList.remove("text-red-600", "font-semibold");
+    } else if (event.kind === "return") {
+      field("return_date").textContent = formatDate(event.loan.return_date);
+      fineCell(field("fine"), event.loan.fine);
+      const badge = document.createElement("span");
+      badge.className = "px-3 py-1 text-xs bg-gray-200 rounded-full";
+      badge.textContent = "Returned";
+      field("action").replaceChildren(badge);
+    }
+  }
+
+  function patchLoans(event) {
+    if (!loans || !event.loan) return;
+    const row = loans.querySelector(`tr[data-loan-id="${event.loan.id}"]`);
+    if (row) patchRow(row, event);
+    else if (event.kind === "issue" && rowTemplate && loans.dataset.liveInsert === "true") addRow(event);
+  }
+
+  const source = new EventSource(root.dataset.liveUrl);
+  source.onopen = () => setStatus("● Live");
+  //  EventSource retries dropped and expired streams by itself; CLOSED means the server said no
+  //  (204 when not served through ASGI, 403 when logged out), so stop there
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED) {
+      source.close();
+      setStatus("Live updates off");
+    } else {
+      setStatus("Reconnecting…");
+    }
+  };
+
+  source.addEventListener("circulation", (e) => {
+    const event = JSON.parse(e.data);
+    bump(event.kind);
+    const amount = event.kind === "fine_assessed" ? ` ₹${event.amount}` : "";
+    log(`${event.student || "Library"} ${VERBS[event.kind] || event.kind}${amount} “${event.book}”`);
+    patchLoans(event);
+  });
+
+  source.addEventListener("registration", (e) => {
+    const user = JSON.parse(e.data);
+    bump("registration");
+    log(`${user.name} registered as ${user.role}${user.approved ? "" : " (awaiting approval)"}`);
+  });
+
+  //  Fell too far behind: the server dropped our backlog, so start over from a fresh render
+  source.addEventListener("resync", () => window.location.reload());
+})();